@@ -1,12 +1,27 @@
 import asyncio
 import json
 
+from actor import wire
+from actor.codec import UnknownMessageType, decode as decode_message, encode as encode_message, load_message_modules
+from actor.mailbox import Mailbox, is_control
+from actor.outbox import PeerOutbox
+from actor.tcp_transport import (
+    ConnectionPool, FRAME_BATCH, FRAME_BINARY, FRAME_HELLO, FRAME_JSON, hello_frame, negotiate_codec, read_frames,
+    unpack_batch,
+)
+
 
 class Actor:
+    # mailbox defaults for this actor type (None = use the ActorSystem default)
+    mailbox_capacity = None
+    mailbox_policy = None
+    mailbox_key = None
+
     def __init__(self, name, system):
         self.name = name
         self.system = system
-        self.mailbox = asyncio.Queue()
+        new_mailbox = getattr(system, "new_mailbox", None)
+        self.mailbox = new_mailbox(name, self) if new_mailbox is not None else Mailbox()
         self.behavior = self.default_behavior
         self.alive = True
 
@@ -34,14 +49,38 @@ class Actor:
 
 
 class ActorSystem:
-    def __init__(self, host: str = "127.0.0.1", port: int = 0, transport: str = "tcp"):
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, transport: str = "tcp", tcp_pool_size: int = 1,
+                 codec: str = wire.CODEC_BINARY, wire_float32: bool = False,
+                 grpc_keepalive_ms: int = 30000, grpc_compression: str | None = None,
+                 batch_max: int = 256, batch_max_delay_ms: float = 2.0,
+                 mailbox_capacity: int = 0, mailbox_policy: str = "block", inbound_backlog: int = 256):
         self.actors = {}
         self.host = host
         self.port = port
         self.transport = transport  # "tcp" or "grpc"
         self._server = None
         self._grpc_server = None
+        self._grpc_client = None  # created on first gRPC send
+        self.grpc_keepalive_ms = int(grpc_keepalive_ms)
+        self.grpc_compression = grpc_compression
         self._peers = {}  # logical actor name -> (host, port, transport)
+        # long-lived outbound TCP connections, one framed stream per peer
+        # body codec: "binary" (raw numpy buffers) or "json"; negotiated per connection
+        self.codec = codec
+        self._pool = ConnectionPool(max_per_peer=tcp_pool_size, codec=codec, float32=wire_float32)
+        self._inbound = {}  # writer -> handler task of accepted connections (closed on stop_network)
+        # per-peer outbound queues, each drained by one sender task in micro-batches
+        self._outboxes = {}  # (host, port, transport) -> PeerOutbox
+        self.batch_max = int(batch_max)
+        self.batch_max_delay_ms = float(batch_max_delay_ms)
+        # mailbox bounds: system default, overridden per actor class and per actor name
+        self.mailbox_capacity = int(mailbox_capacity)
+        self.mailbox_policy = mailbox_policy
+        self.mailbox_configs = {}  # actor name -> {"capacity", "policy", "key"}
+        # network receive path: messages waiting for room in a full "block" mailbox, per target actor
+        self.inbound_backlog = max(1, int(inbound_backlog))
+        self._waiting = {}  # actor name -> asyncio.Queue drained by one forwarder task
+        load_message_modules()
 
     async def start_network(self):
         if self.transport == "grpc":
@@ -49,7 +88,9 @@ class ActorSystem:
                 from rpc.grpc_transport import GrpcServer
             except Exception as e:
                 raise RuntimeError("gRPC transport selected, but rpc/grpc_transport.py or dependencies are missing. Install grpcio and generate stubs from proto/actor.proto") from e
-            self._grpc_server = GrpcServer(self.host, self.port, self._handle_envelope)
+            self._grpc_server = GrpcServer(self.host, self.port, self._handle_envelope,
+                                           keepalive_ms=self.grpc_keepalive_ms, compression=self.grpc_compression,
+                                           deliver=self.deliver)
             self.host, self.port = await self._grpc_server.start()
             print(f"[ActorSystem] listening (gRPC) on {self.host}:{self.port}")
         else:
@@ -58,20 +99,60 @@ class ActorSystem:
             self.host, self.port = sock[0], sock[1]
             print(f"[ActorSystem] listening on {self.host}:{self.port}")
 
-    def register_peer(self, name: str, host: str, port: int, transport: str | None = None):
+    async def stop_network(self):
+        for outbox in list(self._outboxes.values()):
+            await outbox.close()
+        self._outboxes.clear()
+        await self._pool.close()
+        if self._grpc_client is not None:
+            await self._grpc_client.close()
+            self._grpc_client = None
+        if self._server is not None:
+            self._server.close()
+            handlers = list(self._inbound.values())
+            for w in list(self._inbound):
+                w.close()
+            if handlers:
+                await asyncio.wait(handlers, timeout=1.0)
+            await self._server.wait_closed()
+            self._server = None
+        if self._grpc_server is not None:
+            await self._grpc_server.stop()
+            self._grpc_server = None
+
+    def register_peer(self, name: str, host: str, port: int, transport: str | None = None, codec: str | None = None):
         tx = transport or self.transport
         self._peers[name] = (host, int(port), tx)
+        if codec:
+            self._pool.set_peer_codec(host, port, codec)
 
     async def _handle_conn(self, reader, writer):
+        # one connection carries many frames; envelopes are handled in arrival order
+        self._inbound[writer] = asyncio.current_task()
         try:
-            data = await reader.readline()
-            if not data:
-                return
-            msg = json.loads(data.decode("utf-8"))
-            await self._handle_envelope(msg)
+            async for kind, body in read_frames(reader):
+                if kind == FRAME_HELLO:
+                    offered = json.loads(body.decode("utf-8")).get("codecs")
+                    writer.write(hello_frame({"codec": negotiate_codec(offered, self.codec)}))
+                    await writer.drain()
+                    continue
+                frames = unpack_batch(body) if kind == FRAME_BATCH else ((kind, body),)
+                for sub_kind, sub_body in frames:
+                    try:
+                        if sub_kind == FRAME_BINARY:
+                            msg = wire.decode_binary(sub_body)
+                        elif sub_kind == FRAME_JSON:
+                            msg = wire.decode_json(sub_body)
+                        else:
+                            print(f"[ActorSystem] unknown frame kind: {sub_kind}")
+                            continue
+                        await self._handle_envelope(msg)
+                    except Exception as e:
+                        print("[ActorSystem] recv error:", e)
         except Exception as e:
-            print("[ActorSystem] recv error:", e)
+            print("[ActorSystem] connection error:", e)
         finally:
+            self._inbound.pop(writer, None)
             try:
                 writer.close()
                 await writer.wait_closed()
@@ -79,136 +160,41 @@ class ActorSystem:
                 pass
 
     async def _handle_envelope(self, msg: dict):
-        target = msg.get("target")
-        mtype = msg.get("type")
-        payload = msg.get("payload", {})
-
-        # Deserialize known message types and forward locally
-        if mtype == "ModelShare":
-            from actor.p2p import ModelShare
-            import numpy as np
-            m = ModelShare(
-                payload["sender"],
-                np.array(payload["coef"], dtype=float),
-                float(payload["intercept"]),
-                payload.get("version"),
-                payload.get("ts_ms"),
-            )
-            self.tell(target, m)
-        elif mtype == "TrainRequest":
-            from actor.aggregator import TrainRequest
-            self.tell(target, TrainRequest())
-        elif mtype == "StartRound":
-            from actor.p2p import StartRound
-            self.tell(target, StartRound())
-        elif mtype == "GiveMeWork":
-            from actor.scheduler import GiveMeWork
-            self.tell(target, GiveMeWork(payload["worker"]))
-        elif mtype == "AssignTeam":
-            from actor.scheduler import AssignTeam
-            self.tell(target, AssignTeam(payload["team_name"]))
-        elif mtype == "NoMoreWork":
-            from actor.scheduler import NoMoreWork
-            self.tell(target, NoMoreWork())
-        elif mtype == "RegisterWorker":
-            from actor.scheduler import RegisterWorker
-            self.tell(target, RegisterWorker(payload["worker"], payload["host"], int(payload["port"])) )
-        elif mtype == "WorkDone":
-            from actor.scheduler import WorkDone
-            self.tell(target, WorkDone(payload["worker"]))
-        elif mtype == "AllDone":
-            from actor.aggregator import AllDone
-            self.tell(target, AllDone())
-        elif mtype == "RoundComplete":
-            from actor.aggregator import RoundComplete
-            self.tell(target, RoundComplete(int(payload["round_idx"]), int(payload["total_rounds"]), float(payload.get("fedprox_mu", 0.0))))
-        elif mtype == "SetGlobalModel":
-            from actor.aggregator import SetGlobalModel
-            import numpy as np
-            coef = np.array(payload["coef"], dtype=float)
-            intercept = float(payload["intercept"])
-            self.tell(target, SetGlobalModel(coef, intercept))
-        elif mtype == "SetClusterModels":
-            from actor.aggregator import SetClusterModels
-            # payload: { cid: {"coef": [...], "intercept": float} }
-            import numpy as np
-            cluster_models = {}
-            for cid, m in (payload or {}).items():
-                cluster_models[cid] = {"coef": np.array(m["coef"], dtype=float).reshape(1, -1), "intercept": float(m["intercept"]) }
-            self.tell(target, SetClusterModels(cluster_models))
-        elif mtype == "SetTeamClusters":
-            from actor.aggregator import SetTeamClusters as AggSetTeamClusters
-            from actor.scheduler import SetTeamClusters as SchSetTeamClusters
-            mapping = dict(payload.get("mapping", {}))
-            # Forward to either actor type
-            if target in self.actors and isinstance(self.actors[target], object):
-                try:
-                    self.tell(target, AggSetTeamClusters(mapping))
-                except Exception:
-                    self.tell(target, SchSetTeamClusters(mapping))
-        elif mtype == "PeerList":
-            from actor.p2p import PeerList
-            self.tell(target, PeerList(payload["peers"], bool(payload.get("is_reporter", False)), payload.get("reporter_name"), int(payload.get("total_rounds", 1))))
-        elif mtype == "PeerReady":
-            from actor.p2p import PeerReady
-            self.tell(target, PeerReady(payload["peer_name"]))
-        elif mtype == "EvalRequest":
-            from actor.evaluator import EvalRequest
-            self.tell(target, EvalRequest(payload.get("pairs"), int(payload.get("best_of", 7)), payload.get("reply_to"), payload.get("round_idx")))
-        elif mtype == "EvalReport":
-            from actor.evaluator import EvalReport
-            self.tell(target, EvalReport(payload.get("results")))
-        elif mtype == "LwwPut":
-            from actor.crdt import LwwPut
-            self.tell(target, LwwPut(payload["key"], payload["value"], int(payload.get("ts")) if payload.get("ts") is not None else None))
-        elif mtype == "LwwGet":
-            from actor.crdt import LwwGet
-            self.tell(target, LwwGet(payload["key"]))
-        elif mtype == "LwwDump":
-            from actor.crdt import LwwDump
-            self.tell(target, LwwDump())
-        elif mtype == "CrdtMerge":
-            from actor.crdt import CrdtMerge
-            self.tell(target, CrdtMerge(payload["delta"]))
-        elif mtype == "Replicate":
-            from actor.crdt import Replicate
-            self.tell(target, Replicate(payload["delta"]))
-        elif mtype == "Attach":
-            from actor.crdt import Attach
-            self.tell(target, Attach(payload["map_actor_name"]))
-        elif mtype == "AddPeer":
-            from actor.crdt import AddPeer
-            self.tell(target, AddPeer(payload["remote_actor_name"], payload["host"], int(payload["port"])) )
-        elif mtype == "HealthPing":
-            from actor.health import HealthPing
-            self.tell(target, HealthPing(payload["monitor_name"]))
-        elif mtype == "HealthAck":
-            from actor.health import HealthAck
-            self.tell(target, HealthAck(payload["actor_name"]))
-        elif mtype == "CrashMe":
-            from actor.health import CrashMe
-            self.tell(target, CrashMe())
-        else:
-            print(f"[ActorSystem] Unknown message type: {mtype}")
+        try:
+            message = decode_message(msg)
+        except UnknownMessageType:
+            print(f"[ActorSystem] Unknown message type: {msg.get('type')}")
+            return
+        await self.deliver(msg.get("target"), message)
 
     async def _send_remote(self, host: str, port: int, envelope: dict, transport: str = "tcp"):
-        if transport == "grpc":
-            try:
-                from rpc.grpc_transport import send_envelope
-                await send_envelope(host, port, envelope)
-                return
-            except Exception as e:
-                print(f"[ActorSystem] gRPC send {host}:{port} failed:", e)
-                return
-        # default tcp
         try:
-            reader, writer = await asyncio.open_connection(host, port)
-            writer.write((json.dumps(envelope) + "\n").encode("utf-8"))
-            await writer.drain()
-            writer.close()
-            await writer.wait_closed()
+            await self._send_batch(host, port, [envelope], transport)
         except Exception as e:
-            print(f"[ActorSystem] send {host}:{port} failed:", e)
+            print(f"[ActorSystem] send {transport}://{host}:{port} failed:", e)
+
+    async def _send_batch(self, host: str, port: int, envelopes: list, transport: str = "tcp"):
+        if transport == "grpc":
+            if self._grpc_client is None:
+                from rpc.grpc_transport import GrpcClient
+                self._grpc_client = GrpcClient(keepalive_ms=self.grpc_keepalive_ms, compression=self.grpc_compression)
+            await self._grpc_client.send_batch(host, port, envelopes)
+            return
+        # default tcp: framed envelopes over a pooled connection (reconnects on failure)
+        await self._pool.send_batch(host, port, envelopes)
+
+    def _outbox(self, host: str, port: int, transport: str) -> PeerOutbox:
+        key = (host, int(port), transport)
+        outbox = self._outboxes.get(key)
+        if outbox is None:
+            async def flush(envelopes, host=host, port=port, transport=transport):
+                await self._send_batch(host, port, envelopes, transport)
+            outbox = PeerOutbox(f"{host}:{port}", flush, max_batch=self.batch_max, max_delay_ms=self.batch_max_delay_ms)
+            self._outboxes[key] = outbox
+        return outbox
+
+    def outbound_stats(self) -> dict:
+        return {f"{t}://{h}:{p}": ob.stats() for (h, p, t), ob in self._outboxes.items()}
 
     def create_actor(self, name, actor_factory):
         actor = actor_factory(name, self)
@@ -216,6 +202,62 @@ class ActorSystem:
         asyncio.create_task(actor.run())
         return actor
 
+    def configure_mailbox(self, actor_name: str, capacity: int | None = None, policy: str | None = None, key=None):
+        # takes effect for actors created after the call
+        self.mailbox_configs[actor_name] = {"capacity": capacity, "policy": policy, "key": key}
+
+    def new_mailbox(self, actor_name: str, actor) -> Mailbox:
+        cfg = self.mailbox_configs.get(actor_name, {})
+
+        def pick(field, default):
+            value = cfg.get(field)
+            if value is None:
+                value = getattr(actor, "mailbox_" + field, None)
+            return default if value is None else value
+
+        return Mailbox(
+            capacity=pick("capacity", self.mailbox_capacity),
+            policy=pick("policy", self.mailbox_policy),
+            key=pick("key", None),
+        )
+
+    def mailbox_stats(self) -> dict:
+        return {name: actor.mailbox.stats() for name, actor in self.actors.items()}
+
+    async def tell_async(self, actor_name: str, message):
+        """Like tell, but waits for room when a local "block" mailbox is full."""
+        actor = self.actors.get(actor_name)
+        if actor is not None:
+            await actor.mailbox.put(message)
+            return
+        self.tell(actor_name, message)
+
+    async def deliver(self, actor_name: str, message):
+        """Network receive path: backpressure per target actor, never on the whole connection.
+
+        Control messages and messages for a mailbox with room go straight to tell(). A message for
+        a full "block" mailbox joins that actor's waiting queue, drained in order by one forwarder
+        task, so messages on the same connection for other actors (and HealthPing, __STOP__, ...)
+        keep flowing. Only when an actor's waiting queue holds inbound_backlog messages does the
+        caller wait, which stops reading the socket and pushes back on the sender via TCP."""
+        actor = self.actors.get(actor_name)
+        waiting = self._waiting.get(actor_name)
+        if actor is None or is_control(message) or (waiting is None and not actor.mailbox.would_block()):
+            self.tell(actor_name, message)
+            return
+        if waiting is None:
+            waiting = self._waiting[actor_name] = asyncio.Queue(maxsize=self.inbound_backlog)
+            asyncio.create_task(self._forward(actor_name, actor.mailbox, waiting))
+        await waiting.put(message)
+
+    async def _forward(self, actor_name: str, mailbox: Mailbox, waiting: asyncio.Queue):
+        while True:
+            await mailbox.put(await waiting.get())
+            if waiting.empty():
+                # caught up: later messages take the direct path again, still behind these ones
+                self._waiting.pop(actor_name, None)
+                return
+
     def tell(self, actor_name: str, message):
         # Local actor
         if actor_name in self.actors:
@@ -225,83 +267,13 @@ class ActorSystem:
         if actor_name in self._peers:
             host, port, tx = self._peers[actor_name]
             envelope = self._serialize(actor_name, message)
-            asyncio.create_task(self._send_remote(host, port, envelope, tx))
+            self._outbox(host, port, tx).put(envelope)
         else:
             print(f"Actor {actor_name} does not exist or is not registered")
 
     def _serialize(self, target: str, message):
-        mname = message.__class__.__name__
-        if mname == "ModelShare":
-            payload = {
-                "sender": message.sender,
-                "coef": list(message.coef),
-                "intercept": float(message.intercept),
-            }
-            if getattr(message, "version", None) is not None:
-                payload["version"] = int(message.version)
-            import time
-            payload["ts_ms"] = getattr(message, "ts_ms", None)
-            if payload["ts_ms"] is None:
-                try:
-                    payload["ts_ms"] = int(time.time() * 1000)
-                except Exception:
-                    payload["ts_ms"] = 0
-            return {"target": target, "type": "ModelShare", "payload": payload}
-        if mname == "TrainRequest":
-            return {"target": target, "type": "TrainRequest"}
-        if mname == "StartRound":
-            return {"target": target, "type": "StartRound"}
-        if mname == "GiveMeWork":
-            return {"target": target, "type": "GiveMeWork", "payload": {"worker": message.worker}}
-        if mname == "AssignTeam":
-            return {"target": target, "type": "AssignTeam", "payload": {"team_name": message.team_name}}
-        if mname == "NoMoreWork":
-            return {"target": target, "type": "NoMoreWork"}
-        if mname == "RegisterWorker":
-            return {"target": target, "type": "RegisterWorker", "payload": {"worker": message.worker, "host": message.host, "port": message.port}}
-        if mname == "WorkDone":
-            return {"target": target, "type": "WorkDone", "payload": {"worker": message.worker}}
-        if mname == "AllDone":
-            return {"target": target, "type": "AllDone"}
-        if mname == "RoundComplete":
-            return {"target": target, "type": "RoundComplete", "payload": {"round_idx": message.round_idx, "total_rounds": message.total_rounds, "fedprox_mu": message.fedprox_mu}}
-        if mname == "SetGlobalModel":
-            return {"target": target, "type": "SetGlobalModel", "payload": {"coef": list(message.coef.ravel()), "intercept": float(message.intercept)}}
-        if mname == "SetClusterModels":
-            payload = {cid: {"coef": list(m["coef"].ravel()), "intercept": float(m["intercept"]) } for cid, m in message.cluster_models.items()}
-            return {"target": target, "type": "SetClusterModels", "payload": payload}
-        if mname == "SetTeamClusters":
-            return {"target": target, "type": "SetTeamClusters", "payload": {"mapping": message.mapping}}
-        if mname == "PeerList":
-            return {"target": target, "type": "PeerList", "payload": {"peers": list(message.peers), "is_reporter": bool(message.is_reporter), "reporter_name": message.reporter_name, "total_rounds": message.total_rounds}}
-        if mname == "PeerReady":
-            return {"target": target, "type": "PeerReady", "payload": {"peer_name": message.peer_name}}
-        if mname == "EvalRequest":
-            return {"target": target, "type": "EvalRequest", "payload": {"pairs": message.pairs, "best_of": message.best_of, "reply_to": message.reply_to, "round_idx": message.round_idx}}
-        if mname == "EvalReport":
-            return {"target": target, "type": "EvalReport", "payload": {"results": message.results}}
-        if mname == "LwwPut":
-            return {"target": target, "type": "LwwPut", "payload": {"key": message.key, "value": message.value, "ts": message.ts}}
-        if mname == "LwwGet":
-            return {"target": target, "type": "LwwGet", "payload": {"key": message.key}}
-        if mname == "LwwDump":
-            return {"target": target, "type": "LwwDump"}
-        if mname == "CrdtMerge":
-            return {"target": target, "type": "CrdtMerge", "payload": {"delta": message.delta}}
-        if mname == "Replicate":
-            return {"target": target, "type": "Replicate", "payload": {"delta": message.delta}}
-        if mname == "Attach":
-            return {"target": target, "type": "Attach", "payload": {"map_actor_name": message.map_actor_name}}
-        if mname == "AddPeer":
-            return {"target": target, "type": "AddPeer", "payload": {"remote_actor_name": message.remote_actor_name, "host": message.host, "port": message.port}}
-        if mname == "HealthPing":
-            return {"target": target, "type": "HealthPing", "payload": {"monitor_name": message.monitor_name}}
-        if mname == "HealthAck":
-            return {"target": target, "type": "HealthAck", "payload": {"actor_name": message.actor_name}}
-        if mname == "CrashMe":
-            return {"target": target, "type": "CrashMe"}
-        # Fallback to class name only
-        return {"target": target, "type": mname}
+        # numpy arrays stay arrays here; the wire codec decides how they are encoded
+        return encode_message(target, message)
 
     def stop_actor(self, actor_name: str):
         if actor_name in self.actors:
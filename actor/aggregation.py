@@ -0,0 +1,177 @@
+"""Aggregation engine for client model updates (FedAvg and robust variants).
+
+Models are rows of a stacked (clients x d+1) float array, coefficients
+followed by the intercept, with an integer cluster id per row.
+aggregate() reduces every cluster at once with segmented reductions over
+the rows sorted by cluster: np.add.reduceat for the (weighted) mean,
+per-column sorts inside the segments plus cumulative sums for the trimmed
+mean and the coordinate-wise median. No Python loop runs over clients or
+clusters.
+
+Strategies:
+- "mean":     plain FedAvg
+- "weighted": FedAvg weighted by the clients' sample counts
+- "trimmed":  per coordinate, drop the `trim` fraction of lowest and highest
+              values of the cluster, average the rest
+- "median":   coordinate-wise median
+
+ClusterAccumulator collects updates as they arrive, keyed by whatever the
+caller adds them under (AggregatorP2P: the sender). For mean/weighted it
+keeps one running-sum row per key and no per-share list: O(d) per update
+and O(keys x d) memory, i.e. O(senders x d) in AggregatorP2P rather than
+O(clusters x d), which is the price of mapping to clusters late. The
+robust strategies need every value, so it appends to a growable stacked
+buffer and reduces it at finalize(). finalize(key_map=...) regroups the
+keys into clusters only then, so the team->cluster mapping in effect at
+aggregation time decides, not the one in effect when a share arrived.
+"""
+
+import numpy as np
+
+STRATEGIES = ("mean", "weighted", "trimmed", "median")
+STREAMING = ("mean", "weighted")
+
+
+def _segments(cluster_ids: np.ndarray):
+    order = np.argsort(cluster_ids, kind="stable")
+    sorted_ids = cluster_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_ids)])
+    return order, sorted_ids, starts, counts
+
+
+def _sorted_within(values: np.ndarray, sorted_ids: np.ndarray) -> np.ndarray:
+    # every column sorted inside its cluster segment (rows already grouped by cluster)
+    out = np.empty_like(values)
+    for j in range(values.shape[1]):
+        out[:, j] = values[np.lexsort((values[:, j], sorted_ids)), j]
+    return out
+
+
+def aggregate(theta, cluster_ids=None, weights=None, strategy: str = "mean", trim: float = 0.1):
+    """Reduce stacked models per cluster.
+
+    theta (n, m), cluster_ids (n,) ints (None = one cluster 0), weights (n,)
+    for "weighted" (None = equal). Returns (unique cluster ids, (k, m) result).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown aggregation strategy {strategy!r} (expected one of {', '.join(STRATEGIES)})")
+    theta = np.asarray(theta, dtype=float)
+    n = len(theta)
+    ids = np.zeros(n, dtype=np.int64) if cluster_ids is None else np.asarray(cluster_ids, dtype=np.int64)
+    if n == 0:
+        return ids[:0], theta.reshape(0, theta.shape[-1] if theta.ndim == 2 else 0)
+    order, sorted_ids, starts, counts = _segments(ids)
+    values = theta[order]
+    if strategy in STREAMING:
+        w = np.ones(n) if strategy == "mean" or weights is None else np.asarray(weights, dtype=float)[order]
+        total = np.add.reduceat(w, starts)
+        total[total == 0] = 1.0
+        return sorted_ids[starts], np.add.reduceat(values * w[:, None], starts, axis=0) / total[:, None]
+
+    ordered = _sorted_within(values, sorted_ids)
+    ends = starts + counts
+    if strategy == "median":
+        lo = starts + (counts - 1) // 2
+        hi = starts + counts // 2
+        return sorted_ids[starts], 0.5 * (ordered[lo] + ordered[hi])
+    # trimmed mean: sum of the kept middle range from prefix sums
+    cut = np.floor(np.clip(trim, 0.0, 0.5) * counts).astype(np.int64)
+    cut = np.minimum(cut, (counts - 1) // 2)
+    csum = np.vstack([np.zeros((1, ordered.shape[1])), np.cumsum(ordered, axis=0)])
+    kept = (csum[ends - cut] - csum[starts + cut]) / (counts - 2 * cut)[:, None]
+    return sorted_ids[starts], kept
+
+
+def blend_prox(theta, previous, mu: float):
+    """FedProx server-side blend (1 - mu) * new + mu * previous."""
+    return (1.0 - mu) * theta + mu * previous
+
+
+class ClusterAccumulator:
+    """Collects (key, coef, intercept, weight) updates for one aggregation window."""
+
+    def __init__(self, strategy: str = "mean", trim: float = 0.1, capacity: int = 64):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown aggregation strategy {strategy!r} (expected one of {', '.join(STRATEGIES)})")
+        self.strategy = strategy
+        self.trim = float(trim)
+        self._capacity = max(1, int(capacity))
+        self._slots = {}  # key -> dense int id
+        self._keys = []
+        self.count = 0
+        self._sums = None    # streaming: (k, m) weighted sums, (k,) total weight, one row per key
+        self._weight = None
+        self._theta = None   # robust: (capacity, m) rows and their cluster slots
+        self._ids = None
+
+    def _slot(self, key) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self._keys)
+            self._keys.append(key)
+        return slot
+
+    def add(self, key, coef, intercept, weight: float = 1.0):
+        row = np.append(np.asarray(coef, dtype=float).ravel(), float(intercept))
+        slot = self._slot(key)
+        if self.strategy in STREAMING:
+            if self.strategy == "mean":
+                weight = 1.0
+            if self._sums is None:
+                self._sums = np.zeros((4, len(row)))
+                self._weight = np.zeros(4)
+            if slot >= len(self._sums):
+                grow = max(slot + 1, 2 * len(self._sums))
+                self._sums = np.vstack([self._sums, np.zeros((grow - len(self._sums), len(row)))])
+                self._weight = np.r_[self._weight, np.zeros(grow - len(self._weight))]
+            self._sums[slot] += weight * row
+            self._weight[slot] += weight
+        else:
+            if self._theta is None:
+                self._theta = np.empty((self._capacity, len(row)))
+                self._ids = np.empty(self._capacity, dtype=np.int64)
+            elif self.count == len(self._theta):
+                self._theta = np.vstack([self._theta, np.empty_like(self._theta)])
+                self._ids = np.r_[self._ids, np.empty_like(self._ids)]
+            self._theta[self.count] = row
+            self._ids[self.count] = slot
+        self.count += 1
+
+    def finalize(self, merged: bool = False, key_map: dict | None = None) -> dict:
+        """group -> (coef (1, d), intercept) for the window; empty when nothing arrived.
+
+        Groups are the keys the updates were added under, or key_map[key] when
+        key_map is given (keys missing from it are dropped). merged=True
+        reduces all updates as one group under the key None."""
+        if self.count == 0:
+            return {}
+        k = len(self._keys)
+        if merged:
+            groups, group_of = [None], np.zeros(k, dtype=np.int64)
+        elif key_map is None:
+            groups, group_of = list(self._keys), np.arange(k)
+        else:
+            # one dict lookup per key (sender), not per update; -1 = dropped
+            index, group_of = {}, np.full(k, -1, dtype=np.int64)
+            for slot, key in enumerate(self._keys):
+                group = key_map.get(key)
+                if group is not None:
+                    group_of[slot] = index.setdefault(group, len(index))
+            groups = list(index)
+        if self.strategy in STREAMING:
+            keep = (group_of >= 0) & (self._weight[:k] > 0)
+            sums = np.zeros((len(groups), self._sums.shape[1]))
+            weight = np.zeros(len(groups))
+            np.add.at(sums, group_of[keep], self._sums[:k][keep])
+            np.add.at(weight, group_of[keep], self._weight[:k][keep])
+            used = weight > 0
+            keys, result = [groups[g] for g in np.flatnonzero(used)], sums[used] / weight[used][:, None]
+        else:
+            rows = group_of[self._ids[:self.count]]
+            keep = rows >= 0
+            if not keep.any():
+                return {}
+            ids, result = aggregate(self._theta[:self.count][keep], rows[keep], strategy=self.strategy, trim=self.trim)
+            keys = [groups[g] for g in ids]
+        return {key: (r[:-1].reshape(1, -1), float(r[-1])) for key, r in zip(keys, result)}
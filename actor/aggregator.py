@@ -1,35 +1,74 @@
 from random import random
 from actor.actor_system import Actor
 import numpy as np
-from sklearn.linear_model import LogisticRegression
+from actor.compute import run_cpu, get_fit_batcher, fit_logreg_rows
+from feature_store import feature_matrix
 from actor.crdt import Increment
+from actor.codec import register_message
+from actor.aggregation import ClusterAccumulator, blend_prox
 
 # Poruke
+@register_message
 class TrainRequest:
     pass
 
+@register_message
 class RegisterTeam:
     def __init__(self, team_actor_name: str, host: str, port: int):
         self.team_actor_name = team_actor_name
         self.host = host
         self.port = int(port)
 
+@register_message
 class ModelUpdate:
-    def __init__(self, coef, intercept):
+    def __init__(self, coef, intercept, n_samples: int | None = None):
         self.coef = coef
         self.intercept = intercept
+        self.n_samples = n_samples  # training rows behind the model (weighted FedAvg)
+
+    def to_payload(self):
+        payload = {"coef": np.asarray(self.coef, dtype=float).ravel(), "intercept": float(self.intercept)}
+        if self.n_samples is not None:
+            payload["n_samples"] = int(self.n_samples)
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(np.asarray(payload["coef"], dtype=float), float(payload["intercept"]), payload.get("n_samples"))
+
+
+def _model_weight(n_samples) -> float:
+    # sample count for the "weighted" strategy; a sender that did not report it counts once
+    return float(n_samples) if n_samples else 1.0
 
+
+@register_message
 class GlobalModel:
     def __init__(self, coef, intercept, round_idx: int | None = None):
         self.coef = coef
         self.intercept = intercept
         self.round_idx = round_idx
 
+    def to_payload(self):
+        return {"coef": np.asarray(self.coef, dtype=float).ravel(), "intercept": float(self.intercept), "round_idx": self.round_idx}
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(np.asarray(payload["coef"], dtype=float).reshape(1, -1), float(payload["intercept"]), payload.get("round_idx"))
+
+@register_message
 class SetGlobalModel:
     def __init__(self, coef, intercept):
         self.coef = coef
         self.intercept = intercept
 
+    def to_payload(self):
+        return {"coef": np.asarray(self.coef, dtype=float).ravel(), "intercept": float(self.intercept)}
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(np.asarray(payload["coef"], dtype=float), float(payload["intercept"]))
+
 # === TeamNode ===
 class TeamNode(Actor):
     def __init__(self, name, system, data, features, imputer):
@@ -46,11 +85,14 @@ class TeamNode(Actor):
             
     async def training_behavior(self, message):
         if isinstance(message, TrainRequest):
-            X = self.imputer.transform(self.data[self.features])
-            y = self.data["home_win"]
-            model = LogisticRegression(max_iter=500)
-            model.fit(X, y)
-            update = ModelUpdate(model.coef_[0], model.intercept_[0])
+            fm = feature_matrix(self.data, self.features, self.imputer)
+            batcher = get_fit_batcher()
+            if batcher is not None:
+                # all TeamNodes of the node get TrainRequest together -> one batched fit
+                coef, intercept, _ = await batcher.fit_logreg(fm)
+            else:
+                coef, intercept = await run_cpu(fit_logreg_rows, fm)
+            update = ModelUpdate(coef, intercept, n_samples=len(fm))
 
             print(f"[{self.name}] završio treniranje, prelazi u stanje FINISHED")
             self.become(self.finished_behavior)
@@ -88,10 +130,12 @@ class TeamNode(Actor):
 
 # === Aggregator ===
 class Aggregator(Actor):
-    def __init__(self, name, system, team_count):
+    def __init__(self, name, system, team_count, strategy: str = "mean", trim: float = 0.1):
         super().__init__(name, system)
         self.team_count = int(team_count)
-        self.received = []
+        self.strategy = strategy
+        self.trim = float(trim)
+        self.acc = ClusterAccumulator(strategy, trim)
         self.registered = set()
         self.expected = None  # expected number of updates for current round
 
@@ -107,7 +151,7 @@ class Aggregator(Actor):
                 self.expected = self.team_count
             else:
                 self.expected = len(targets)
-            self.received = []
+            self.acc = ClusterAccumulator(self.strategy, self.trim)
             print(f"[Aggregator] pokreće TrainRequest ka {len(targets)} timova, očekujem {self.expected} update-a")
             for t in targets:
                 try:
@@ -116,18 +160,15 @@ class Aggregator(Actor):
                     pass
 
         elif isinstance(message, ModelUpdate):
-            self.received.append((message.coef, message.intercept))
+            self.acc.add(None, message.coef, message.intercept, _model_weight(getattr(message, "n_samples", None)))
             exp = self.expected if self.expected is not None else self.team_count
-            if exp and len(self.received) >= exp:
-
-                coefs, intercepts = zip(*self.received)
-                global_coef = np.mean(coefs, axis=0).reshape(1, -1)
-                global_intercept = np.mean(intercepts, axis=0)
+            if exp and self.acc.count >= exp:
+                global_coef, global_intercept = self.acc.finalize()[None]
 
                 self.system.tell("crdt", Increment())
                 self.system.tell("evaluator", GlobalModel(global_coef, global_intercept))
-                print(f"[Aggregator] primljeno {len(self.received)}/{exp} → poslat GlobalModel evaluatoru")
-                self.received = []
+                print(f"[Aggregator] primljeno {self.acc.count}/{exp} → poslat GlobalModel evaluatoru")
+                self.acc = ClusterAccumulator(self.strategy, self.trim)
                 self.expected = None
 
     async def on_start(self):
@@ -135,227 +176,147 @@ class Aggregator(Actor):
 
 
 # P2P Aggregator koji prikuplja ModelShare i na kraju šalje GlobalModel
+@register_message
 class AllDone:
     pass
 
+@register_message
 class RoundComplete:
     def __init__(self, round_idx: int, total_rounds: int, fedprox_mu: float = 0.0):
         self.round_idx = int(round_idx)
         self.total_rounds = int(total_rounds)
         self.fedprox_mu = float(fedprox_mu)
 
+@register_message
+class SetClusterModels:
+    def __init__(self, cluster_models: dict):
+        self.cluster_models = cluster_models
+
+    def to_payload(self):
+        # payload: { cid: {"coef": [...], "intercept": float} }
+        return {cid: {"coef": np.asarray(m["coef"], dtype=float).ravel(), "intercept": float(m["intercept"])}
+                for cid, m in self.cluster_models.items()}
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls({cid: {"coef": np.asarray(m["coef"], dtype=float).reshape(1, -1), "intercept": float(m["intercept"])}
+                    for cid, m in payload.items()})
+
+@register_message
+class SetTeamClusters:
+    def __init__(self, mapping: dict):
+        self.mapping = mapping
+
 class AggregatorP2P(Actor):
-    def __init__(self, name, system, async_mode: bool = False, async_batch: int = 8, fedprox_mu: float = 0.0):
+    def __init__(self, name, system, async_mode: bool = False, async_batch: int = 8, fedprox_mu: float = 0.0,
+                 strategy: str = "mean", trim: float = 0.1):
         super().__init__(name, system)
-        self.received = []
+        # updates of the current window, one slot per sender; mapped to clusters at aggregation (actor.aggregation)
+        self.strategy = strategy
+        self.trim = float(trim)
+        self.acc = ClusterAccumulator(strategy, trim)
         self.last_global = None
         self.team_to_cluster = None
         self.async_mode = bool(async_mode)
         self.async_batch = max(1, int(async_batch))
         self.fedprox_mu = float(fedprox_mu)
 
-class SetClusterModels:
-    def __init__(self, cluster_models: dict):
-        self.cluster_models = cluster_models
+    @property
+    def pending(self) -> int:
+        return self.acc.count
 
-class SetTeamClusters:
-    def __init__(self, mapping: dict):
-        self.mapping = mapping
+    def _clustered(self) -> bool:
+        return isinstance(self.team_to_cluster, dict) and bool(self.team_to_cluster)
 
     async def default_behavior(self, message):
         from actor.p2p import ModelShare
         if isinstance(message, ModelShare):
-            self.received.append((message.sender, message.coef, message.intercept))
-            if getattr(self, "async_mode", False) and len(self.received) >= getattr(self, "async_batch", 8):
+            self._accumulate(message)
+            if getattr(self, "async_mode", False) and self.pending >= getattr(self, "async_batch", 8):
                 await self._flush_async()
         elif isinstance(message, SetTeamClusters):
             self.team_to_cluster = dict(message.mapping) if message.mapping else {}
             print(f"[AggregatorP2P] Učitan mapping team->cluster ({len(self.team_to_cluster)})")
         elif isinstance(message, AllDone):
-            if not self.received:
+            if not self.pending:
                 print("[AggregatorP2P] Nema primljenih modela za agregaciju.")
                 return
-
-            if isinstance(self.team_to_cluster, dict) and self.team_to_cluster:
-                by_cluster = {}
-                for (team, coef, intercept) in self.received:
-                    cid = self.team_to_cluster.get(team)
-                    if cid is None:
-                        continue
-                    by_cluster.setdefault(cid, {"coefs": [], "ints": []})
-                    by_cluster[cid]["coefs"].append(coef)
-                    by_cluster[cid]["ints"].append(intercept)
-                cluster_models = {}
-                for cid, vals in by_cluster.items():
-                    avg_coef = np.mean(vals["coefs"], axis=0).reshape(1, -1)
-                    avg_intercept = float(np.mean(vals["ints"], axis=0))
-                    cluster_models[cid] = {"coef": avg_coef, "intercept": avg_intercept}
-
-                try:
-                    self.system.tell("scheduler", SetClusterModels(cluster_models))
-                except Exception:
-                    pass
-
-                all_coefs = [m["coef"] for m in cluster_models.values()]
-                all_ints = [m["intercept"] for m in cluster_models.values()]
-                if all_coefs and all_ints:
-                    gcoef = np.mean(all_coefs, axis=0)
-                    gint = float(np.mean(all_ints, axis=0))
-                    self.system.tell("evaluator", GlobalModel(gcoef, gint, round_idx=None))
-                print(f"[AggregatorP2P] Poslati per-cluster modeli (final)")
-                self.last_global = {cid: (m["coef"].copy(), m["intercept"]) for cid, m in cluster_models.items()}
-                self.received = []
-                return
-
-            coefs = [c for (_, c, _) in self.received]
-            intercepts = [i for (_, _, i) in self.received]
-            global_coef = np.mean(coefs, axis=0).reshape(1, -1)
-            global_intercept = float(np.mean(intercepts, axis=0))
-            self.system.tell("crdt", Increment())
-            self.system.tell("evaluator", GlobalModel(global_coef, global_intercept, round_idx=None))
-            try:
-                self.system.tell("scheduler", SetGlobalModel(global_coef, global_intercept))
-            except Exception:
-                pass
-            print("[AggregatorP2P] Poslat GlobalModel evaluatoru (finalni)")
-            self.last_global = (global_coef.copy(), global_intercept)
-            self.received = []
+            # final aggregation: no FedProx blend
+            clustered = self._clustered()
+            if self._publish(mu=0.0, round_idx=None, trigger="final"):
+                print("[AggregatorP2P] Poslati per-cluster modeli (final)" if clustered
+                      else "[AggregatorP2P] Poslat GlobalModel evaluatoru (finalni)")
 
         elif isinstance(message, RoundComplete):
-            if not self.received:
+            if not self.pending:
                 print(f"[AggregatorP2P] Round {message.round_idx}: nema primljenih modela")
                 return
-
-            if isinstance(self.team_to_cluster, dict) and self.team_to_cluster:
-                by_cluster = {}
-                for (team, coef, intercept) in self.received:
-                    cid = self.team_to_cluster.get(team)
-                    if cid is None:
-                        continue
-                    by_cluster.setdefault(cid, {"coefs": [], "ints": []})
-                    by_cluster[cid]["coefs"].append(coef)
-                    by_cluster[cid]["ints"].append(intercept)
-                cluster_models = {}
-                for cid, vals in by_cluster.items():
-                    avg_coef = np.mean(vals["coefs"], axis=0).reshape(1, -1)
-                    avg_intercept = float(np.mean(vals["ints"], axis=0))
-                    if isinstance(self.last_global, dict) and message.fedprox_mu > 0.0 and cid in self.last_global:
-                        pcoef, pint = self.last_global[cid]
-                        mu = float(message.fedprox_mu)
-                        gcoef = (1.0 - mu) * avg_coef + mu * pcoef
-                        gint = float((1.0 - mu) * avg_intercept + mu * pint)
-                    else:
-                        gcoef, gint = avg_coef, avg_intercept
-                    cluster_models[cid] = {"coef": gcoef, "intercept": gint}
-
-                self.system.tell("crdt", Increment())
-                try:
-                    self.system.tell("scheduler", SetClusterModels(cluster_models))
-                except Exception:
-                    pass
-
-                all_coefs = [m["coef"] for m in cluster_models.values()]
-                all_ints = [m["intercept"] for m in cluster_models.values()]
-                if all_coefs and all_ints:
-                    gcoef = np.mean(all_coefs, axis=0)
-                    gint = float(np.mean(all_ints, axis=0))
-                    self.system.tell("evaluator", GlobalModel(gcoef, gint, round_idx=message.round_idx))
-                print(f"[AggregatorP2P] Round {message.round_idx}/{message.total_rounds} → poslati per-cluster modeli ({len(cluster_models)})")
-
-                self.last_global = {cid: (m["coef"].copy(), m["intercept"]) for cid, m in cluster_models.items()}
-                self.received = []
-            else:
-                coefs = [c for (_, c, _) in self.received]
-                intercepts = [i for (_, _, i) in self.received]
-                avg_coef = np.mean(coefs, axis=0).reshape(1, -1)
-                avg_intercept = float(np.mean(intercepts, axis=0))
-                if (self.last_global is not None) and (not isinstance(self.last_global, dict)) and message.fedprox_mu > 0.0:
-                    prev_coef, prev_intercept = self.last_global
-                    mu = float(message.fedprox_mu)
-                    global_coef = (1.0 - mu) * avg_coef + mu * prev_coef
-                    global_intercept = float((1.0 - mu) * avg_intercept + mu * prev_intercept)
+            clustered = self._clustered()
+            if self._publish(mu=float(message.fedprox_mu), round_idx=message.round_idx, trigger="round"):
+                if clustered:
+                    print(f"[AggregatorP2P] Round {message.round_idx}/{message.total_rounds} → poslati per-cluster modeli ({len(self.last_global)})")
                 else:
-                    global_coef = avg_coef
-                    global_intercept = avg_intercept
-                self.system.tell("crdt", Increment())
-                self.system.tell("evaluator", GlobalModel(global_coef, global_intercept, round_idx=message.round_idx))
-                try:
-                    self.system.tell("scheduler", SetGlobalModel(global_coef, global_intercept))
-                except Exception:
-                    pass
-                print(f"[AggregatorP2P] Round {message.round_idx}/{message.total_rounds} → poslat GlobalModel evaluatoru")
-                self.last_global = (global_coef.copy(), global_intercept)
-                self.received = []
-
-    async def on_start(self):
-        print("[AggregatorP2P] spreman za prijem lokalnih modela")
-        
-    async def _flush_async(self):
-        if not self.received:
-            return
-        # Per-cluster async aggregation if mapping provided
-        if isinstance(self.team_to_cluster, dict) and self.team_to_cluster:
-            by_cluster = {}
-            for (team, coef, intercept) in self.received:
-                cid = self.team_to_cluster.get(team)
-                if cid is None:
-                    continue
-                by_cluster.setdefault(cid, {"coefs": [], "ints": []})
-                by_cluster[cid]["coefs"].append(coef)
-                by_cluster[cid]["ints"].append(intercept)
+                    print(f"[AggregatorP2P] Round {message.round_idx}/{message.total_rounds} → poslat GlobalModel evaluatoru")
+
+    def _accumulate(self, share):
+        # O(d) per share, kept per sender: shares that arrive before SetTeamClusters still count once it does
+        self.acc.add(share.sender, share.coef, share.intercept, _model_weight(getattr(share, "n_samples", None)))
+
+    def _publish(self, mu: float, round_idx, trigger: str = "async") -> bool:
+        """Aggregate the window with the configured strategy, blend with the previous global
+        model(s) when mu > 0 and send the result; returns False when there was nothing to send.
+
+        trigger is "final" (AllDone), "round" (RoundComplete) or "async" (_flush_async). Without
+        a cluster mapping every trigger sends Increment, GlobalModel and SetGlobalModel. With
+        clusters only "async" also broadcasts SetGlobalModel and "final" sends no Increment."""
+        clustered = self._clustered()
+        # the mapping in effect now decides the clusters; unmapped senders are left out, as before
+        models = self.acc.finalize(key_map=self.team_to_cluster) if clustered else self.acc.finalize(merged=True)
+        self.acc = ClusterAccumulator(self.strategy, self.trim)
+        prev = self.last_global
+        if clustered:
             cluster_models = {}
-            for cid, vals in by_cluster.items():
-                if not vals["coefs"]:
-                    continue
-                avg_coef = np.mean(vals["coefs"], axis=0).reshape(1, -1)
-                avg_intercept = float(np.mean(vals["ints"], axis=0))
-                if isinstance(self.last_global, dict) and self.fedprox_mu > 0.0 and cid in self.last_global:
-                    pcoef, pint = self.last_global[cid]
-                    mu = float(self.fedprox_mu)
-                    gcoef = (1.0 - mu) * avg_coef + mu * pcoef
-                    gint = float((1.0 - mu) * avg_intercept + mu * pint)
-                else:
-                    gcoef, gint = avg_coef, avg_intercept
-                cluster_models[cid] = {"coef": gcoef, "intercept": gint}
-            if cluster_models:
+            for cid, (coef, intercept) in models.items():
+                if mu > 0.0 and isinstance(prev, dict) and cid in prev:
+                    pcoef, pint = prev[cid]
+                    coef, intercept = blend_prox(coef, pcoef, mu), float(blend_prox(intercept, pint, mu))
+                cluster_models[cid] = {"coef": coef, "intercept": intercept}
+            if not cluster_models:
+                return False
+            if trigger != "final":
                 self.system.tell("crdt", Increment())
-                try:
-                    self.system.tell("scheduler", SetClusterModels(cluster_models))
-                except Exception:
-                    pass
-                # derive overall global for evaluator as avg over clusters
-                all_coefs = [m["coef"] for m in cluster_models.values()]
-                all_ints = [m["intercept"] for m in cluster_models.values()]
-                gcoef = np.mean(all_coefs, axis=0)
-                gint = float(np.mean(all_ints, axis=0))
-                self.system.tell("evaluator", GlobalModel(gcoef, gint, round_idx=None))
-                try:
-                    self.system.tell("scheduler", SetGlobalModel(gcoef, gint))
-                except Exception:
-                    pass
-                self.last_global = {cid: (m["coef"].copy(), m["intercept"]) for cid, m in cluster_models.items()}
+            try:
+                self.system.tell("scheduler", SetClusterModels(cluster_models))
+            except Exception:
+                pass
+            # overall model for the evaluator: average over the clusters
+            global_coef = np.mean([m["coef"] for m in cluster_models.values()], axis=0)
+            global_intercept = float(np.mean([m["intercept"] for m in cluster_models.values()]))
+            self.last_global = {cid: (m["coef"].copy(), m["intercept"]) for cid, m in cluster_models.items()}
+            broadcast = trigger == "async"  # per-cluster models already went out via SetClusterModels
         else:
-            coefs = [c for (_, c, _) in self.received]
-            intercepts = [i for (_, _, i) in self.received]
-            if not coefs:
-                self.received = []
-                return
-            avg_coef = np.mean(coefs, axis=0).reshape(1, -1)
-            avg_intercept = float(np.mean(intercepts, axis=0))
-            if (self.last_global is not None) and (not isinstance(self.last_global, dict)) and self.fedprox_mu > 0.0:
-                prev_coef, prev_intercept = self.last_global
-                mu = float(self.fedprox_mu)
-                global_coef = (1.0 - mu) * avg_coef + mu * prev_coef
-                global_intercept = float((1.0 - mu) * avg_intercept + mu * prev_intercept)
-            else:
-                global_coef = avg_coef
-                global_intercept = avg_intercept
+            if None not in models:
+                return False
+            global_coef, global_intercept = models[None]
+            if mu > 0.0 and prev is not None and not isinstance(prev, dict):
+                prev_coef, prev_intercept = prev
+                global_coef = blend_prox(global_coef, prev_coef, mu)
+                global_intercept = float(blend_prox(global_intercept, prev_intercept, mu))
             self.system.tell("crdt", Increment())
-            self.system.tell("evaluator", GlobalModel(global_coef, global_intercept, round_idx=None))
+            self.last_global = (global_coef.copy(), global_intercept)
+            broadcast = True
+        self.system.tell("evaluator", GlobalModel(global_coef, global_intercept, round_idx=round_idx))
+        if broadcast:
             try:
                 self.system.tell("scheduler", SetGlobalModel(global_coef, global_intercept))
             except Exception:
                 pass
-            self.last_global = (global_coef.copy(), global_intercept)
-        # reset buffer
-        self.received = []
+        return True
+
+    async def on_start(self):
+        print(f"[AggregatorP2P] spreman za prijem lokalnih modela (agregacija: {self.strategy})")
+
+    async def _flush_async(self):
+        if not self.pending:
+            return
+        self._publish(mu=self.fedprox_mu, round_idx=None, trigger="async")
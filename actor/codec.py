@@ -0,0 +1,82 @@
+"""Message registry: wire type name <-> message class.
+
+Message classes register themselves with the @register_message decorator.
+By default the payload is the instance __dict__ and decoding calls
+cls(**payload); a class with array fields or extra logic provides
+`to_payload(self)` and a `from_payload(cls, payload)` classmethod instead.
+
+ActorSystem encodes/decodes with one dict lookup; the modules defining the
+built-in messages are imported once by load_message_modules().
+"""
+
+_BY_NAME = {}   # type name -> (cls, encode, decode)
+_BY_CLASS = {}  # cls -> (type name, encode)
+
+# modules whose import registers the built-in message types
+MESSAGE_MODULES = (
+    "actor.aggregator",
+    "actor.p2p",
+    "actor.scheduler",
+    "actor.evaluator",
+    "actor.crdt",
+    "actor.health",
+)
+_loaded = False
+
+
+class UnknownMessageType(LookupError):
+    pass
+
+
+def _default_encode(message):
+    return dict(vars(message))
+
+
+def register_message(cls=None, *, name: str | None = None):
+    def wrap(c):
+        type_name = name or c.__name__
+        encode = getattr(c, "to_payload", None) or _default_encode
+        from_payload = getattr(c, "from_payload", None)
+        decode = from_payload if from_payload is not None else (lambda payload, _c=c: _c(**payload))
+        prev = _BY_NAME.get(type_name)
+        if prev is not None and prev[0] is not c:
+            raise ValueError(f"message type {type_name!r} already registered by {prev[0].__module__}")
+        _BY_NAME[type_name] = (c, encode, decode)
+        _BY_CLASS[c] = (type_name, encode)
+        return c
+
+    return wrap(cls) if cls is not None else wrap
+
+
+def load_message_modules():
+    global _loaded
+    if _loaded:
+        return
+    from importlib import import_module
+    for mod in MESSAGE_MODULES:
+        import_module(mod)
+    _loaded = True
+
+
+def encode(target: str, message) -> dict:
+    entry = _BY_CLASS.get(type(message))
+    if entry is None:
+        # unregistered types travel as a bare type name (receiver reports them as unknown)
+        return {"target": target, "type": type(message).__name__}
+    type_name, enc = entry
+    payload = enc(message)
+    if not payload:
+        return {"target": target, "type": type_name}
+    return {"target": target, "type": type_name, "payload": payload}
+
+
+def decode(envelope: dict):
+    mtype = envelope.get("type")
+    entry = _BY_NAME.get(mtype)
+    if entry is None:
+        raise UnknownMessageType(mtype)
+    return entry[2](envelope.get("payload") or {})
+
+
+def registered_types() -> list[str]:
+    return sorted(_BY_NAME)
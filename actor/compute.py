@@ -0,0 +1,426 @@
+"""CPU-bound model work (fits, scoring) off the asyncio event loop.
+
+Actors `await run_cpu(fn, *args)` instead of calling LogisticRegression.fit
+inline, so networking, health acks and the other actors of the node keep
+running while a model trains. The executor is process-wide and configured
+once from main.py:
+
+- "process": ProcessPoolExecutor (default); fits run in parallel on all cores.
+- "thread":  ThreadPoolExecutor; no pickling, but fits share the GIL with
+             the loop (numpy/sklearn release it only in parts).
+- "inline":  call fn directly on the loop (old behaviour, used by tests).
+
+Functions submitted to a process pool must be picklable, i.e. defined at
+module level; the ones used by the actors live here. FedProx fits default
+to fit_fedprox_newton, which converges in a few Newton steps; fit_fedprox
+(fixed-epoch gradient descent) is kept as the "gd" solver. With
+configure_fit_batching() the Newton fits of all actors of a node that
+arrive within a short window go to the executor as one fit_fedprox_batch
+call, which solves every team's Newton system in the same vectorized step.
+Local fits can warm-start from the current global/cluster model
+(fit_logreg_warm, or w_global with mu=0 for the Newton solvers).
+
+The *_rows variants take a feature_store.FeatureMatrix plus row
+positions: the matrix pickles as its file path, so a pool process maps the
+shared .npy files instead of receiving a copy of the rows.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+EXECUTORS = ("process", "thread", "inline")
+
+_kind = "process"
+_workers = None
+_executor = None
+
+
+def configure_executor(kind: str = "process", workers: int | None = None):
+    """Select the executor for run_cpu; an already running pool is shut down."""
+    global _kind, _workers
+    if kind not in EXECUTORS:
+        raise ValueError(f"unknown executor {kind!r} (expected one of {', '.join(EXECUTORS)})")
+    shutdown_executor()
+    _kind = kind
+    _workers = int(workers) if workers else None
+
+
+def _mp_context():
+    # a fork of a process with gRPC/asyncio threads is unsafe; forkserver/spawn start clean
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def get_executor():
+    global _executor
+    if _kind == "inline":
+        return None
+    if _executor is None:
+        workers = _workers or os.cpu_count() or 1
+        if _kind == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compute")
+    return _executor
+
+
+async def run_cpu(fn, *args, **kwargs):
+    executor = get_executor()
+    if executor is None:
+        return fn(*args, **kwargs)
+    call = functools.partial(fn, *args, **kwargs) if kwargs else functools.partial(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+class FitBatcher:
+    """Collects the fits the actors of a node request at about the same time and
+    runs them as one fit_fedprox_batch call on the executor.
+
+    The first request of a batch opens a window of max_delay_ms; everything
+    that arrives before it closes (or until max_teams are waiting) is fitted
+    together and every caller gets its own (w, b, iterations).
+    """
+
+    def __init__(self, max_delay_ms: float = 2.0, max_teams: int = 256):
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self.max_teams = max(1, int(max_teams))
+        self._pending = {}  # (tol, max_iter, has_global) -> [(fm, rows, mu, w_global, b_global, l2, future)]
+        self._timers = {}
+        self.batches = 0
+        self.teams = 0
+
+    async def fit(self, fm, rows, mu: float, w_global, b_global, l2: float = 0.0,
+                  tol: float = 1e-6, max_iter: int = 50):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        key = (float(tol), int(max_iter), w_global is not None)
+        batch = self._pending.setdefault(key, [])
+        batch.append((fm, rows, float(mu), w_global, b_global, float(l2), fut))
+        if len(batch) >= self.max_teams:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_delay, self._flush, key)
+        return await fut
+
+    async def fit_logreg(self, fm, rows=None, coef_init=None, intercept_init=None):
+        """Same model as fit_logreg (LogisticRegression, C=1): mean loss + ||w||^2 / (2n).
+
+        coef_init/intercept_init warm-start Newton (mu=0, so they are only a
+        starting point). Returns (coef, intercept, iterations).
+        """
+        n = len(fm) if rows is None else len(rows)
+        if coef_init is not None:
+            coef_init = np.asarray(coef_init, dtype=float).ravel()
+            intercept_init = float(intercept_init if intercept_init is not None else 0.0)
+        return await self.fit(fm, rows, 0.0, coef_init, intercept_init, l2=1.0 / max(1, n))
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(key, batch))
+
+    async def _run(self, key, batch):
+        tol, max_iter, has_global = key
+        self.batches += 1
+        self.teams += len(batch)
+        try:
+            items = [(fm, rows) for fm, rows, *_ in batch]
+            mu = np.array([e[2] for e in batch])
+            l2 = np.array([e[5] for e in batch])
+            if has_global:
+                w_global = np.stack([np.asarray(e[3], dtype=float).ravel() for e in batch])
+                b_global = np.array([float(e[4] if e[4] is not None else 0.0) for e in batch])
+            else:
+                w_global = b_global = None
+            results = await run_cpu(fit_fedprox_batch_rows, items, mu, w_global, b_global, l2=l2, tol=tol, max_iter=max_iter)
+        except Exception as e:
+            for *_, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (*_, fut), res in zip(batch, results):
+            if not fut.done():
+                fut.set_result(res)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "teams": self.teams, "mean_batch": self.teams / self.batches if self.batches else 0.0}
+
+
+_batcher = None
+
+
+def configure_fit_batching(max_delay_ms: float = 0.0, max_teams: int = 256):
+    """Enable node-level fit batching (max_delay_ms > 0) or turn it off."""
+    global _batcher
+    _batcher = FitBatcher(max_delay_ms, max_teams) if max_delay_ms and max_delay_ms > 0 else None
+
+
+def get_fit_batcher():
+    return _batcher
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def executor_info() -> dict:
+    return {"kind": _kind, "workers": _workers or os.cpu_count() or 1}
+
+
+# --- picklable work functions ---
+
+def fit_logreg(X, y, max_iter: int = 500):
+    """Fit LogisticRegression and return (coef 1-D, intercept)."""
+    from sklearn.linear_model import LogisticRegression
+    model = LogisticRegression(max_iter=max_iter)
+    model.fit(X, y)
+    return model.coef_[0], float(model.intercept_[0])
+
+
+def fit_logreg_model(X, y, max_iter: int = 500):
+    """Fit LogisticRegression and return the fitted estimator."""
+    from sklearn.linear_model import LogisticRegression
+    model = LogisticRegression(max_iter=max_iter)
+    model.fit(X, y)
+    return model
+
+
+def fit_logreg_warm(X, y, coef_init=None, intercept_init=None, max_iter: int = 500):
+    """fit_logreg started from (coef_init, intercept_init) when given; returns (coef, intercept, lbfgs iterations)."""
+    from sklearn.linear_model import LogisticRegression
+    model = LogisticRegression(max_iter=max_iter, warm_start=coef_init is not None)
+    if coef_init is not None:
+        model.coef_ = np.array(coef_init, dtype=float).reshape(1, -1)
+        model.intercept_ = np.array([float(intercept_init if intercept_init is not None else 0.0)])
+    model.fit(X, y)
+    return model.coef_[0], float(model.intercept_[0]), int(model.n_iter_[0])
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    z = np.clip(z, -50.0, 50.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def fit_fedprox(X: np.ndarray, y: np.ndarray, mu: float,
+                w_global: np.ndarray | None, b_global: float | None,
+                epochs: int = 100, lr: float = 0.1, l2: float = 0.0) -> tuple[np.ndarray, float]:
+    """Full-batch gradient descent on the logistic loss plus the FedProx term mu/2 ||w - w_global||^2."""
+    n, d = X.shape
+    if w_global is None:
+        w = np.zeros(d, dtype=float)
+        b = 0.0
+    else:
+        w = np.array(w_global, dtype=float).ravel().copy()
+        b = float(b_global if b_global is not None else 0.0)
+    yv = np.array(y, dtype=float)
+    for _ in range(max(1, int(epochs))):
+        z = X.dot(w) + b
+        p = _sigmoid(z)
+        # gradients
+        diff = (p - yv)
+        grad_w = (X.T @ diff) / n + (l2 * w)
+        grad_b = float(np.sum(diff) / n)
+        if mu > 0.0 and w_global is not None:
+            grad_w += mu * (w - np.array(w_global, dtype=float).ravel())
+            grad_b += mu * (b - float(b_global))
+        # step
+        w -= lr * grad_w
+        b -= lr * grad_b
+    return w, float(b)
+
+
+def _prox_objective(X, y, w, b, mu, w_global, b_global, l2):
+    z = X.dot(w) + b
+    # mean logistic loss, log(1 + e^z) - y z written to stay finite for large |z|
+    loss = float(np.mean(np.logaddexp(0.0, z) - y * z)) + 0.5 * l2 * float(w @ w)
+    if mu > 0.0 and w_global is not None:
+        dw = w - w_global
+        loss += 0.5 * mu * (float(dw @ dw) + (b - b_global) ** 2)
+    return loss
+
+
+def fit_fedprox_newton(X: np.ndarray, y: np.ndarray, mu: float,
+                       w_global: np.ndarray | None, b_global: float | None,
+                       l2: float = 0.0, tol: float = 1e-6, max_iter: int = 50) -> tuple[np.ndarray, float, int]:
+    """Damped Newton (IRLS) on the same objective as fit_fedprox, run to convergence.
+
+    Stops when the max-norm of the gradient drops below tol or after max_iter
+    steps; returns (w, b, iterations used). Each step solves the (d+1)x(d+1)
+    Hessian system and halves the step until the objective decreases, so
+    separable data (no mu/l2) stops at max_iter instead of diverging.
+    """
+    X = np.asarray(X, dtype=float)
+    n, d = X.shape
+    yv = np.asarray(y, dtype=float)
+    prox = mu > 0.0 and w_global is not None
+    if w_global is None:
+        w, b = np.zeros(d), 0.0
+    else:
+        w = np.array(w_global, dtype=float).ravel().copy()
+        b = float(b_global if b_global is not None else 0.0)
+    wg = np.array(w_global, dtype=float).ravel() if prox else None
+    bg = float(b_global if b_global is not None else 0.0) if prox else 0.0
+    m = mu if prox else 0.0
+    Xa = np.hstack([X, np.ones((n, 1))])
+    reg = np.full(d + 1, m)
+    reg[:d] += l2
+    loss = _prox_objective(X, yv, w, b, m, wg, bg, l2)
+
+    it = 0
+    while it < max_iter:
+        p = _sigmoid(X.dot(w) + b)
+        diff = p - yv
+        g = Xa.T @ diff / n
+        g[:d] += l2 * w
+        if prox:
+            g[:d] += mu * (w - wg)
+            g[d] += mu * (b - bg)
+        if np.max(np.abs(g)) < tol:
+            break
+        it += 1
+        s = p * (1.0 - p)
+        H = (Xa.T * s) @ Xa / n
+        H[np.diag_indices_from(H)] += reg + 1e-10
+        step = np.linalg.solve(H, g)
+        t = 1.0
+        while True:
+            w_new, b_new = w - t * step[:d], b - t * step[d]
+            new_loss = _prox_objective(X, yv, w_new, b_new, m, wg, bg, l2)
+            if new_loss <= loss + 1e-12 * (1.0 + abs(loss)) or t < 1e-6:  # slack for round-off near the optimum
+                break
+            t *= 0.5
+        w, b, loss = w_new, float(b_new), new_loss
+    return w, float(b), it
+
+
+def _batch_objective(Xp, yp, mask, counts, theta, mu, theta_g, l2):
+    d = Xp.shape[2] - 1
+    z = (Xp @ theta[:, :, None])[:, :, 0]
+    loss = np.sum(mask * (np.logaddexp(0.0, z) - yp * z), axis=1) / counts
+    loss += 0.5 * l2 * np.einsum("ij,ij->i", theta[:, :d], theta[:, :d])
+    if theta_g is not None:
+        dt = theta - theta_g
+        loss += 0.5 * mu * np.einsum("ij,ij->i", dt, dt)
+    return loss
+
+
+def fit_fedprox_batch(X: np.ndarray, y: np.ndarray, counts, mu,
+                      w_global=None, b_global=None, l2=0.0,
+                      tol: float = 1e-6, max_iter: int = 50) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """fit_fedprox_newton for k teams at once.
+
+    X/y hold the teams' rows back to back, counts[i] rows for team i (all > 0).
+    mu and l2 are scalars or per-team arrays; w_global is None, (d,) or (k, d),
+    b_global None, a scalar or (k,). The rows are padded into a (k, max rows,
+    d+1) block, so every Newton step computes all gradients and (d+1)x(d+1)
+    Hessians with batched matmuls and solves the k systems in one call; a
+    team stops updating once its gradient is below tol. Returns W (k, d),
+    b (k,), iterations (k,).
+    """
+    X = np.asarray(X, dtype=float)
+    counts = np.asarray(counts, dtype=np.int64)
+    k, (n, d) = len(counts), X.shape
+    seg = np.repeat(np.arange(k), counts)
+    pos = np.arange(n) - np.repeat(np.cumsum(counts) - counts, counts)
+    width = int(counts.max()) if k else 0
+    Xp = np.zeros((k, width, d + 1))
+    Xp[seg, pos, :d] = X
+    Xp[seg, pos, d] = 1.0
+    yp = np.zeros((k, width))
+    yp[seg, pos] = np.asarray(y, dtype=float)
+    mask = np.zeros((k, width))
+    mask[seg, pos] = 1.0
+    XpT = Xp.transpose(0, 2, 1)
+    cnt = counts.astype(float)
+    mu = np.broadcast_to(np.asarray(mu, dtype=float), (k,))
+    l2 = np.broadcast_to(np.asarray(l2, dtype=float), (k,))
+
+    theta = np.zeros((k, d + 1))
+    theta_g = None
+    if w_global is not None:
+        theta[:, :d] = np.broadcast_to(np.asarray(w_global, dtype=float).reshape(-1, d), (k, d))
+        theta[:, d] = 0.0 if b_global is None else np.broadcast_to(np.asarray(b_global, dtype=float).ravel(), (k,))
+        if np.any(mu > 0.0):
+            theta_g = theta.copy()
+    m = mu if theta_g is not None else np.zeros(k)
+    reg = np.repeat(m[:, None], d + 1, axis=1)
+    reg[:, :d] += l2[:, None]
+    loss = _batch_objective(Xp, yp, mask, cnt, theta, m, theta_g, l2)
+
+    active = np.ones(k, dtype=bool)
+    iters = np.zeros(k, dtype=np.int64)
+    for _ in range(max_iter):
+        p = _sigmoid((Xp @ theta[:, :, None])[:, :, 0])
+        diff = (p - yp) * mask
+        G = (XpT @ diff[:, :, None])[:, :, 0] / cnt[:, None]
+        G[:, :d] += l2[:, None] * theta[:, :d]
+        if theta_g is not None:
+            G += m[:, None] * (theta - theta_g)
+        active &= np.max(np.abs(G), axis=1) >= tol
+        if not active.any():
+            break
+        iters[active] += 1
+        s = p * (1.0 - p) * mask
+        H = (XpT * s[:, None, :]) @ Xp / cnt[:, None, None]
+        H[:, np.arange(d + 1), np.arange(d + 1)] += reg + 1e-10
+        step = np.linalg.solve(H, G[:, :, None])[:, :, 0]
+        step[~active] = 0.0
+        t = np.ones(k)
+        while True:
+            cand = theta - t[:, None] * step
+            new_loss = _batch_objective(Xp, yp, mask, cnt, cand, m, theta_g, l2)
+            retry = (new_loss > loss + 1e-12 * (1.0 + np.abs(loss))) & (t >= 1e-6)
+            if not retry.any():
+                break
+            t[retry] *= 0.5
+        theta, loss = cand, new_loss
+    return theta[:, :d].copy(), theta[:, d].copy(), iters
+
+
+def _rows(fm, rows):
+    return (fm.X, fm.y) if rows is None else fm.take(rows)
+
+
+def fit_logreg_rows(fm, rows=None, max_iter: int = 500):
+    X, y = _rows(fm, rows)
+    return fit_logreg(X, y, max_iter=max_iter)
+
+
+def fit_logreg_warm_rows(fm, rows=None, coef_init=None, intercept_init=None, max_iter: int = 500):
+    X, y = _rows(fm, rows)
+    return fit_logreg_warm(X, y, coef_init, intercept_init, max_iter=max_iter)
+
+
+def fit_logreg_model_rows(fm, rows=None, max_iter: int = 500):
+    X, y = _rows(fm, rows)
+    return fit_logreg_model(X, y, max_iter=max_iter)
+
+
+def fit_fedprox_batch_rows(items, mu, w_global, b_global, l2=0.0, **kwargs):
+    """fit_fedprox_batch over [(fm, rows), ...]; returns [(w, b, iterations), ...]."""
+    parts = [_rows(fm, rows) for fm, rows in items]
+    X = np.concatenate([np.asarray(X, dtype=float) for X, _ in parts])
+    y = np.concatenate([np.asarray(y, dtype=float) for _, y in parts])
+    W, b, iters = fit_fedprox_batch(X, y, [len(y) for _, y in parts], mu, w_global, b_global, l2=l2, **kwargs)
+    return [(W[i], float(b[i]), int(iters[i])) for i in range(len(parts))]
+
+
+def fit_fedprox_rows(fm, rows, mu: float, w_global, b_global, solver: str = "newton", **kwargs):
+    """FedProx fit on rows of a FeatureMatrix; returns (w, b, iterations)."""
+    X, y = _rows(fm, rows)
+    X = np.asarray(X, dtype=float)
+    if solver == "newton":
+        return fit_fedprox_newton(X, y, mu, w_global, b_global, **kwargs)
+    w, b = fit_fedprox(X, y, mu, w_global, b_global, **kwargs)
+    return w, b, max(1, int(kwargs.get("epochs", 100)))
@@ -1,9 +1,13 @@
 from actor.actor_system import Actor
 import time
 from typing import Dict, Any
+from actor.codec import register_message
 
+@register_message
 class Increment: pass
+@register_message
 class Decrement: pass
+@register_message
 class GetValue: pass
 
 class PN_Counter(Actor):
@@ -30,31 +34,38 @@ class PN_Counter(Actor):
 
 
 # === LWW-Map (Last-Write-Wins Map) ===
+@register_message
 class LwwPut:
     def __init__(self, key: str, value: Any, ts: int | None = None):
         self.key = str(key)
         self.value = value
         self.ts = int(ts) if ts is not None else None
 
+@register_message
 class LwwGet:
     def __init__(self, key: str):
         self.key = str(key)
 
+@register_message
 class LwwDump:
     pass
 
+@register_message
 class CrdtMerge:
     def __init__(self, delta: Dict[str, Dict[str, Any]]):
         self.delta = delta
 
+@register_message
 class Replicate:
     def __init__(self, delta: Dict[str, Dict[str, Any]]):
         self.delta = delta
 
+@register_message
 class Attach:
     def __init__(self, map_actor_name: str):
         self.map_actor_name = map_actor_name
 
+@register_message
 class AddPeer:
     def __init__(self, remote_actor_name: str, host: str, port: int):
         self.remote_actor_name = remote_actor_name
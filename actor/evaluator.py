@@ -3,24 +3,57 @@ import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, log_loss, brier_score_loss
 from actor.aggregator import GlobalModel
+from actor.codec import register_message
+from actor.compute import run_cpu, fit_logreg_model_rows
+from actor.matchups import MatchupMatrix, ROOT as MATCHUPS_ROOT
+from actor.playoffs import exact_odds, playoff_odds, seeded_pairs
+from actor import results_db
+from feature_store import feature_matrix
+import baseline_cache
+from team_index import team_index
+import hashlib
 import json
 from datetime import datetime
-import sqlite3
+
+def _model_version(model) -> str:
+    h = hashlib.sha1(np.ascontiguousarray(model.coef_, dtype=float).tobytes())
+    h.update(np.ascontiguousarray(model.intercept_, dtype=float).tobytes())
+    return h.hexdigest()
+
 
 class Evaluator(Actor):
-    def __init__(self, name, system, features, imputer, test_data, train_data=None, persist_path: str = "global_model.json"):
+    # playoff evaluation defaults for EvalRequests that do not set them (set from main.py flags)
+    playoff_mode = "sample"       # "sample": one bracket played game by game; "monte_carlo" / "exact": see actor.playoffs
+    playoff_sims = 1_000_000
+    playoff_seed = None
+
+    def __init__(self, name, system, features, imputer, test_data, train_data=None, persist_path: str = "global_model.json",
+                 baseline_root=baseline_cache.ROOT, matchups_root=MATCHUPS_ROOT, db_path: str = results_db.DEFAULT_PATH):
         super().__init__(name, system)
         self.features = features
         self.imputer = imputer
         self.test_data = test_data
         self.train_data = train_data
         self.persist_path = persist_path
+        self.baseline_root = baseline_root
+        self._baseline = None          # centrally fitted model on train_data (see baseline_cache)
+        self._baseline_metrics = None  # its metrics on test_data
+        self.db_path = db_path
+        self._db = None
+        self.matchups_root = matchups_root  # None = keep the matchup matrices in memory only
+        self._matchups_by_version = {}     # model version -> MatchupMatrix (oldest evicted first)
 
     async def default_behavior(self, message):
         if isinstance(message, EvalRequest):
             try:
-                res = self._simulate_playoffs(best_of=message.best_of, pairs=message.pairs)
-                self._persist_playoffs(res, round_idx=message.round_idx)
+                model = await self._baseline_model()
+                mode = getattr(message, "mode", None) or self.playoff_mode
+                if mode in ("monte_carlo", "exact"):
+                    res = await self._playoff_odds(message, model, mode)
+                    self._persist_playoff_odds(res, round_idx=message.round_idx)
+                else:
+                    res = self._simulate_playoffs(best_of=message.best_of, pairs=message.pairs, model=model)
+                    self._persist_playoffs(res, round_idx=message.round_idx)
                 if message.reply_to:
                     self.system.tell(message.reply_to, EvalReport(res))
             except Exception as e:
@@ -32,8 +65,8 @@ class Evaluator(Actor):
             global_model.intercept_ = np.array([message.intercept])
             global_model.classes_ = np.array([0, 1])
 
-            X_test = self.imputer.transform(self.test_data[self.features])
-            y_test = self.test_data["home_win"]
+            fm_test = feature_matrix(self.test_data, self.features, self.imputer)
+            X_test, y_test = fm_test.X, fm_test.y
             y_pred = global_model.predict(X_test)
             y_prob = getattr(global_model, "predict_proba", None)
             if y_prob is not None:
@@ -48,16 +81,7 @@ class Evaluator(Actor):
 
             baseline_metrics = None
             if self.train_data is not None:
-                X_train_all = self.imputer.transform(self.train_data[self.features])
-                y_train_all = self.train_data["home_win"]
-                base = LogisticRegression(max_iter=500)
-                base.fit(X_train_all, y_train_all)
-                base_prob = base.predict_proba(X_test)[:, 1]
-                base_pred = base.predict(X_test)
-                base_acc = accuracy_score(y_test, base_pred)
-                base_ll = log_loss(y_test, base_prob, labels=[0, 1])
-                base_bs = brier_score_loss(y_test, base_prob)
-                baseline_metrics = {"accuracy": base_acc, "log_loss": base_ll, "brier": base_bs}
+                baseline_metrics = await self._get_baseline_metrics(X_test, y_test)
 
             print("[Evaluator] Federated (FedAvg) metrics:")
             print(f"  accuracy: {acc:.3f}")
@@ -82,76 +106,116 @@ class Evaluator(Actor):
                     json.dump(payload, f, ensure_ascii=False, indent=2)
                 print(f"[Evaluator] Rezultati i model sačuvani u {self.persist_path}")
 
-                try:
-                    conn = sqlite3.connect("storage/results.db")
-                    cur = conn.cursor()
-                    cur.execute(
-                        """
-                        CREATE TABLE IF NOT EXISTS results (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            timestamp TEXT NOT NULL,
-                            round_idx INTEGER,
-                            coef TEXT NOT NULL,
-                            intercept REAL NOT NULL,
-                            acc REAL,
-                            log_loss REAL,
-                            brier REAL,
-                            base_acc REAL,
-                            base_log_loss REAL,
-                            base_brier REAL
-                        )
-                        """
-                    )
-                    cur.execute(
-                        """
-                        INSERT INTO results (timestamp, round_idx, coef, intercept, acc, log_loss, brier, base_acc, base_log_loss, base_brier)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            payload["timestamp"],
-                            payload["round_idx"],
-                            json.dumps(payload["coef"]),
-                            payload["intercept"],
-                            acc,
-                            ll,
-                            bs,
-                            baseline_metrics.get("accuracy") if baseline_metrics else None,
-                            baseline_metrics.get("log_loss") if baseline_metrics else None,
-                            baseline_metrics.get("brier") if baseline_metrics else None,
-                        ),
-                    )
-                    conn.commit()
-                    conn.close()
-                    print("[Evaluator] Rezultati upisani u storage/results.db")
-                except Exception as db_e:
-                    print(f"[Evaluator] Greška pri upisu u DB: {db_e}")
+                self.db.put("results", [(
+                    payload["timestamp"],
+                    payload["round_idx"],
+                    json.dumps(payload["coef"]),
+                    payload["intercept"],
+                    acc,
+                    ll,
+                    bs,
+                    baseline_metrics.get("accuracy") if baseline_metrics else None,
+                    baseline_metrics.get("log_loss") if baseline_metrics else None,
+                    baseline_metrics.get("brier") if baseline_metrics else None,
+                )])
             except Exception as e:
                 print(f"[Evaluator] Greška pri čuvanju modela: {e}")
 
     async def on_start(self):
         print("[Evaluator] čeka globalni model")
 
-    def _simulate_playoffs(self, best_of: int = 7, pairs: list[tuple[str, str]] | None = None):
+    async def on_stop(self):
+        if self._db is not None:
+            self._db.flush()
+
+    @property
+    def db(self) -> results_db.ResultsWriter:
+        """Shared writer for db_path, opened on the first write; rows are committed in batches by a background thread."""
+        if self._db is None:
+            self._db = results_db.results_writer(self.db_path)
+        return self._db
+
+    async def _baseline_model(self):
+        """Centralized model on train_data: fitted once per training fingerprint and persisted."""
+        if self._baseline is None:
+            key = baseline_cache.data_key(self.train_data, self.features, self.imputer)
+            entry = baseline_cache.load(key, self.baseline_root)
+            if "model" in entry:
+                self._baseline = baseline_cache.model_from_dict(entry["model"])
+                print("[Evaluator] Baseline model učitan iz keša")
+            else:
+                self._baseline = await run_cpu(fit_logreg_model_rows, feature_matrix(self.train_data, self.features, self.imputer))
+                entry["model"] = baseline_cache.model_to_dict(self._baseline)
+                self._save_baseline(key, entry)
+        return self._baseline
+
+    def _save_baseline(self, key, entry):
+        try:
+            baseline_cache.save(key, entry, self.baseline_root)
+        except OSError as e:
+            print(f"[Evaluator] Baseline keš nije sačuvan: {e}")
+
+    async def _get_baseline_metrics(self, X_test, y_test) -> dict:
+        if self._baseline_metrics is None:
+            key = baseline_cache.data_key(self.train_data, self.features, self.imputer)
+            test_key = baseline_cache.data_key(self.test_data, self.features, self.imputer)
+            metrics = baseline_cache.load(key, self.baseline_root).get("metrics", {}).get(test_key)
+            if metrics is None:
+                base = await self._baseline_model()
+                base_prob = base.predict_proba(X_test)[:, 1]
+                metrics = {
+                    "accuracy": float(accuracy_score(y_test, base.predict(X_test))),
+                    "log_loss": float(log_loss(y_test, base_prob, labels=[0, 1])),
+                    "brier": float(brier_score_loss(y_test, base_prob)),
+                }
+                entry = baseline_cache.load(key, self.baseline_root)
+                entry.setdefault("metrics", {})[test_key] = metrics
+                self._save_baseline(key, entry)
+            self._baseline_metrics = metrics
+        return self._baseline_metrics
+
+    def _matchups(self, model) -> MatchupMatrix:
+        """Home-court-aware matchup matrix for this model version (actor.matchups).
+
+        All training rows are scored in one predict_proba call and averaged per team
+        through the team index; the matrix is cached per model version (its parameters)
+        and saved under matchups_root for scripts/matchup_odds.py."""
+        version = _model_version(model)
+        matchups = self._matchups_by_version.get(version)
+        if matchups is None:
+            fm = feature_matrix(self.train_data, self.features, self.imputer)
+            index = team_index(self.train_data)
+            p_home = model.predict_proba(fm.X)[:, 1]
+            ph = index.mean_by_team(p_home, "home", default=0.5)
+            pa = index.mean_by_team(p_home, "away", default=0.5)
+            matchups = MatchupMatrix(index.teams, ph, 1.0 - pa, version=version[:16])
+            if len(self._matchups_by_version) >= 8:
+                self._matchups_by_version.pop(next(iter(self._matchups_by_version)))
+            self._matchups_by_version[version] = matchups
+            if self.matchups_root is not None:
+                try:
+                    matchups.save(self.matchups_root)
+                except OSError as e:
+                    print(f"[Evaluator] Matrica mečeva nije sačuvana: {e}")
+        return matchups
+
+    def _team_ratings(self, model) -> dict:
+        """team -> (mean P(home win) at home + mean P(away win) away) / 2 over train_data."""
+        return self._matchups(model).ratings
+
+    def _simulate_playoffs(self, best_of: int = 7, pairs: list[tuple[str, str]] | None = None, model=None):
         """Simulate a seeded bracket QF -> SF -> F and return list of series dicts with 'stage'.
 
-        - Ratings are derived from per-team home/away probabilities.
+        - Ratings and per-game odds come from the matchup matrix (per-team home/away probabilities);
+          games follow the 2-2-1-1-1 home pattern, home court to the better-rated team.
         - If 'pairs' is provided, it's treated as initial QF pairs.
         - Returns: list of dicts with keys: a,b,best_of,wins_a,wins_b,winner,p_a_win,stage
+        - 'model' is a fitted estimator (see actor.compute); fitted here when omitted.
         """
-        model = LogisticRegression(max_iter=500)
-        X_tr = self.imputer.transform(self.train_data[self.features])
-        y_tr = self.train_data["home_win"]
-        model.fit(X_tr, y_tr)
-
-        teams = sorted(set(self.train_data["home_team"]).union(set(self.train_data["away_team"])) )
-        ratings = {}
-        for t in teams:
-            home = self.train_data[self.train_data["home_team"] == t]
-            away = self.train_data[self.train_data["away_team"] == t]
-            ph = model.predict_proba(self.imputer.transform(home[self.features]))[:, 1] if len(home) else np.array([0.5])
-            pa = model.predict_proba(self.imputer.transform(away[self.features]))[:, 1] if len(away) else np.array([0.5])
-            rating = float(np.mean(ph) + (1.0 - np.mean(pa))) / 2.0
-            ratings[t] = rating
+        if model is None:
+            model = fit_logreg_model_rows(feature_matrix(self.train_data, self.features, self.imputer))
+        matchups = self._matchups(model)
+        ratings = matchups.ratings
 
         if not pairs:
             ordered = sorted(ratings.items(), key=lambda x: x[1], reverse=True)
@@ -163,18 +227,17 @@ class Evaluator(Actor):
             need = best_of // 2 + 1
             wins_a = 0
             wins_b = 0
-            pa = ratings.get(a, 0.5)
-            pb = ratings.get(b, 0.5)
-            p_a_win = 0.5 if (pa + pb == 0) else pa / (pa + pb)
-            for _ in range(best_of):
-                if np.random.rand() < p_a_win:
+            m = matchups.query(a, b, best_of)
+            for p_game in m["games"]:
+                if np.random.rand() < p_game:
                     wins_a += 1
                 else:
                     wins_b += 1
                 if wins_a == need or wins_b == need:
                     break
             winner = a if wins_a > wins_b else b
-            return {"a": a, "b": b, "best_of": best_of, "wins_a": wins_a, "wins_b": wins_b, "winner": winner, "p_a_win": p_a_win}
+            return {"a": a, "b": b, "best_of": best_of, "wins_a": wins_a, "wins_b": wins_b, "winner": winner,
+                    "p_a_win": m["p_game"], "p_series": m["p_series"], "home_court": m["home_court"]}
 
         results = []
         current = list(pairs)
@@ -207,53 +270,54 @@ class Evaluator(Actor):
 
         return results
 
+    async def _playoff_odds(self, message, model, mode: str = "monte_carlo") -> dict:
+        """Per-round advancement and title probabilities: exact bracket DP or N vectorized brackets (actor.playoffs)."""
+        matchups = self._matchups(model)
+        teams = matchups.teams
+        pairs = [tuple(p) for p in message.pairs] if message.pairs else seeded_pairs(matchups.ratings)
+        S = matchups.series_matrix(message.best_of)
+        if mode == "exact":
+            odds = exact_odds(S, teams, pairs)
+            speed = f"egzaktno, {odds['elapsed_us']:.0f} µs"
+        else:
+            n_sims = int(getattr(message, "n_sims", None) or self.playoff_sims)
+            seed = getattr(message, "seed", None)
+            seed = seed if seed is not None else self.playoff_seed
+            odds = await run_cpu(playoff_odds, S, teams, pairs, n_sims, seed)
+            speed = f"Monte Carlo, {n_sims} bracket-a, {odds['brackets_per_sec']:.0f}/s"
+        odds["best_of"] = int(message.best_of)
+        top = sorted(odds["title"].items(), key=lambda x: x[1], reverse=True)[:5]
+        print(f"[Evaluator] Plej-of ({speed}); šanse za titulu: " + ", ".join(f"{t} {p:.3f}" for t, p in top))
+        return odds
+
+    def _persist_playoff_odds(self, odds: dict, round_idx: int | None = None):
+        self.db.put("playoff_odds", [
+            (int(round_idx) if round_idx is not None else None, odds.get("n_sims"),
+             str(odds["seed"]) if odds.get("seed") is not None else None, team, stage, p)
+            for team, stages in odds["advance"].items() for stage, p in stages.items()
+        ])
+
     def _persist_playoffs(self, results, round_idx: int | None = None):
-        try:
-            conn = sqlite3.connect("storage/results.db")
-            cur = conn.cursor()
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS playoffs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    round_idx INTEGER,
-                    team_a TEXT,
-                    team_b TEXT,
-                    best_of INTEGER,
-                    wins_a INTEGER,
-                    wins_b INTEGER,
-                    winner TEXT,
-                    stage TEXT,
-                    p_a_win REAL,
-                    ts DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-                """
-            )
-            try:
-                cur.execute("SELECT stage FROM playoffs LIMIT 1")
-            except Exception:
-                cur.execute("ALTER TABLE playoffs ADD COLUMN stage TEXT")
-            for r in results:
-                cur.execute(
-                    "INSERT INTO playoffs(round_idx, team_a, team_b, best_of, wins_a, wins_b, winner, stage, p_a_win) VALUES(?,?,?,?,?,?,?,?,?)",
-                    (
-                        int(round_idx) if round_idx is not None else None,
-                        r["a"], r["b"], int(r["best_of"]), int(r["wins_a"]), int(r["wins_b"]), r["winner"], r.get("stage"), float(r["p_a_win"]) 
-                    ),
-                )
-            conn.commit()
-            conn.close()
-            print("[Evaluator] Playoffs upisani u storage/results.db")
-        except Exception as e:
-            print("[Evaluator] DB error (playoffs):", e)
+        self.db.put("playoffs", [
+            (int(round_idx) if round_idx is not None else None,
+             r["a"], r["b"], int(r["best_of"]), int(r["wins_a"]), int(r["wins_b"]), r["winner"], r.get("stage"), float(r["p_a_win"]))
+            for r in results
+        ])
 
 
+@register_message
 class EvalRequest:
-    def __init__(self, pairs=None, best_of: int = 7, reply_to: str | None = None, round_idx: int | None = None):
+    def __init__(self, pairs=None, best_of: int = 7, reply_to: str | None = None, round_idx: int | None = None,
+                 mode: str | None = None, n_sims: int | None = None, seed: int | None = None):
         self.pairs = pairs
         self.best_of = int(best_of)
         self.reply_to = reply_to
         self.round_idx = round_idx
+        self.mode = mode      # None = Evaluator.playoff_mode
+        self.n_sims = n_sims  # monte_carlo: brackets to simulate (None = Evaluator.playoff_sims)
+        self.seed = seed
 
+@register_message
 class EvalReport:
     def __init__(self, results):
         self.results = results
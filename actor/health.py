@@ -2,18 +2,26 @@ from actor.actor_system import Actor
 import asyncio
 import time
 from actor.supervisor import RestartRequest
+from actor.codec import register_message
 
 
+@register_message
 class HealthPing:
+    control = True  # served ahead of queued data messages (see actor.mailbox)
+
     def __init__(self, monitor_name: str):
         self.monitor_name = monitor_name
 
 
+@register_message
 class HealthAck:
+    control = True
+
     def __init__(self, actor_name: str):
         self.actor_name = actor_name
 
 
+@register_message
 class CrashMe:
     pass
 
@@ -0,0 +1,227 @@
+"""Bounded actor mailbox with overflow policies and a control lane.
+
+Messages go to one of two lanes:
+
+- control: the "__STOP__" sentinel and messages whose class sets
+           `control = True` (health pings/acks, NoMoreWork, ...). Never
+           bounded, never dropped.
+- data:    everything else.
+
+get() serves the control lane first, so a ping is not stuck behind hundreds
+of queued model updates. To keep a flood of control messages from starving
+the data lane, after `control_burst` control messages in a row one data
+message is served if any is waiting.
+
+A Mailbox with capacity 0 is unbounded (the old asyncio.Queue behaviour).
+The capacity applies to the data lane; a full data lane applies its policy
+to the next data message:
+
+- "block":       `await put()` waits for room (ActorSystem.tell_async, and
+                 the network receive path through ActorSystem.deliver, which
+                 waits per target actor). A plain put_nowait() (local tell)
+                 cannot wait; the message is parked behind the queue and
+                 counted as `deferred`. At most `max_deferred` messages
+                 (default: the capacity) are parked; past that put_nowait()
+                 falls back to drop_newest (counted as `dropped`). Waiting and parked messages enter
+                 the queue in arrival order and count in depth/high_water
+                 (`parked` in stats()).
+- "drop_oldest": the oldest queued message is discarded.
+- "drop_newest": the incoming message is discarded.
+- "coalesce":    a message whose key (see `key`) matches a queued one
+                 replaces it in place, whether the mailbox is full or not;
+                 otherwise a full mailbox drops its oldest message.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+POLICIES = ("block", "drop_oldest", "drop_newest", "coalesce")
+STOP = "__STOP__"
+
+
+def default_key(message):
+    # messages opt into coalescing by defining coalesce_key()
+    fn = getattr(message, "coalesce_key", None)
+    return fn() if fn is not None else None
+
+
+def is_control(message) -> bool:
+    if isinstance(message, str):
+        return message == STOP
+    return bool(getattr(message, "control", False))
+
+
+class _Lane:
+    def __init__(self):
+        self.items = deque()  # [key, message, enqueue time] cells
+        self.high_water = 0
+        self.received = 0
+        self.served = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self.items),
+            "high_water": self.high_water,
+            "received": self.received,
+            "served": self.served,
+            "avg_wait_ms": (self.wait_sum / self.served * 1000.0) if self.served else 0.0,
+            "max_wait_ms": self.wait_max * 1000.0,
+        }
+
+
+class Mailbox:
+    def __init__(self, capacity: int = 0, policy: str = "block", key=None, control_burst: int = 16,
+                 max_deferred: int | None = None):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown mailbox policy {policy!r} (expected one of {', '.join(POLICIES)})")
+        self.capacity = max(0, int(capacity or 0))
+        self.policy = policy
+        self.key = key or default_key
+        self.control_burst = max(1, int(control_burst))
+        self.max_deferred = self.capacity if max_deferred is None else max(0, int(max_deferred))
+        self._control = _Lane()
+        self._data = _Lane()
+        self._items = self._data.items  # data lane, bounded by capacity
+        self._by_key = {}         # coalesce key -> data cell currently queued
+        self._deferred = deque()  # block policy: (message, future of a waiting put() or None)
+        self._parked = 0          # entries of _deferred without a waiter (put_nowait)
+        self._not_empty = asyncio.Event()
+        self._control_streak = 0
+        # counters
+        self.high_water = 0
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked = 0
+        self.deferred = 0
+
+    def qsize(self) -> int:
+        return len(self._control.items) + len(self._items) + len(self._deferred)
+
+    def empty(self) -> bool:
+        return not self._control.items and not self._items and not self._deferred
+
+    def full(self) -> bool:
+        return self.capacity > 0 and len(self._items) >= self.capacity
+
+    def would_block(self) -> bool:
+        """True when a data message could not enter the queue right now under the block policy."""
+        return self.policy == "block" and (self.full() or bool(self._deferred))
+
+    def _append(self, message, key=None, lane=None):
+        lane = lane or self._data
+        cell = [key, message, time.perf_counter()]
+        lane.items.append(cell)
+        lane.received += 1
+        lane.high_water = max(lane.high_water, len(lane.items))
+        if key is not None:
+            self._by_key[key] = cell
+        self.high_water = max(self.high_water, self.qsize())
+        self._not_empty.set()
+
+    def _pop_data(self):
+        cell = self._items.popleft()
+        if cell[0] is not None and self._by_key.get(cell[0]) is cell:
+            del self._by_key[cell[0]]
+        # parked messages move in as room frees up, in arrival order
+        while self._deferred and not self.full():
+            message, waiter = self._deferred.popleft()
+            self._append(message)
+            if waiter is None:
+                self._parked -= 1
+            elif not waiter.done():
+                waiter.set_result(True)
+        return cell
+
+    def _pop(self):
+        control = self._control.items
+        if control and (self._control_streak < self.control_burst or not self._items):
+            lane, cell = self._control, control.popleft()
+            self._control_streak += 1
+        else:
+            lane, cell = self._data, self._pop_data()
+            self._control_streak = 0
+        wait = time.perf_counter() - cell[2]
+        lane.served += 1
+        lane.wait_sum += wait
+        lane.wait_max = max(lane.wait_max, wait)
+        if not control and not self._items:
+            self._not_empty.clear()
+        return cell[1]
+
+    def put_nowait(self, message) -> bool:
+        """Enqueue without waiting; returns False when the policy discarded the message."""
+        self.received += 1
+        if is_control(message):
+            self._append(message, lane=self._control)
+            return True
+        key = self.key(message) if self.policy == "coalesce" else None
+        if key is not None and key in self._by_key:
+            self._by_key[key][1] = message
+            self.coalesced += 1
+            return True
+        if not self.full() and not self._deferred:
+            self._append(message, key)
+            return True
+        if self.policy == "block" and self._parked < self.max_deferred:
+            self._deferred.append((message, None))
+            self._parked += 1
+            self.deferred += 1
+            self.high_water = max(self.high_water, self.qsize())
+            return True
+        if self.policy in ("drop_newest", "block"):
+            # block: the parked backlog is full too, local senders cannot wait
+            self.dropped += 1
+            return False
+        # drop_oldest, and coalesce without a matching key
+        self._pop_data()
+        self.dropped += 1
+        self._append(message, key)
+        return True
+
+    async def put(self, message) -> bool:
+        if self.policy != "block" or is_control(message) or (not self.full() and not self._deferred):
+            return self.put_nowait(message)
+        self.received += 1
+        self.blocked += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._deferred.append((message, waiter))
+        self.high_water = max(self.high_water, self.qsize())
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._deferred.remove((message, waiter))
+                except ValueError:
+                    pass
+            raise
+        return True
+
+    def get_nowait(self):
+        if not self._control.items and not self._items:
+            raise asyncio.QueueEmpty
+        return self._pop()
+
+    async def get(self):
+        while not self._control.items and not self._items:
+            await self._not_empty.wait()
+        return self._pop()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.qsize(),
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "high_water": self.high_water,
+            "received": self.received,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "blocked": self.blocked,
+            "deferred": self.deferred,
+            "parked": self._parked,
+            "lanes": {"control": self._control.stats(), "data": self._data.stats()},
+        }
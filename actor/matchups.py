@@ -0,0 +1,126 @@
+"""Pairwise matchup probabilities per model version, with home court.
+
+From one scoring pass over the training rows (see Evaluator._team_ratings)
+every team gets a home strength h (mean P(win) in its home games) and an
+away strength a (mean P(win) in its away games). The per-game matrix is
+
+    home[i, j] = h_i / (h_i + a_j)     P(i beats j in a game i hosts)
+
+which is the Evaluator's old r_a / (r_a + r_b) with the venue taken into
+account; the seeding rating stays r = (h + a) / 2.
+
+Series follow the 2-2-1-1-1 home pattern (best-of-5: 2-2-1, shorter
+series alternate). The team with home court hosts games 1, 2, 5, 7. The
+series probability is a Poisson-binomial tail over those per-game
+probabilities, computed for all pairs at once. Playing every game and
+taking the majority decides the same winner as stopping at k // 2 + 1
+wins. series_matrix(best_of) gives home court to the better-rated team, so
+it can be plugged straight into actor.playoffs. It is computed once per
+best_of and cached.
+
+query(a, b) answers single "what if A met B" questions behind an LRU cache;
+query_many() answers thousands of pairs with plain array indexing. The
+matrix is saved as storage/matchups/<version>.npz so scripts can query it
+without running the actors (scripts/matchup_odds.py).
+"""
+
+import functools
+import os
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path("storage/matchups")
+
+
+def home_schedule(best_of: int) -> np.ndarray:
+    """True where the team with home court hosts game k (2-2-1-1-1 for best-of-5 and longer)."""
+    if best_of >= 5:
+        return np.array([True, True, False, False] + [k % 2 == 0 for k in range(best_of - 4)])
+    return np.array([k % 2 == 0 for k in range(best_of)])
+
+
+class MatchupMatrix:
+    def __init__(self, teams, home_strength, away_strength, version: str | None = None, cache_size: int = 4096):
+        self.teams = list(teams)
+        self.version = version
+        self.pos = {t: i for i, t in enumerate(self.teams)}
+        self.h = np.asarray(home_strength, dtype=float)
+        self.a = np.asarray(away_strength, dtype=float)
+        total = self.h[:, None] + self.a[None, :]
+        self.home = np.divide(self.h[:, None], total, out=np.full(total.shape, 0.5), where=total != 0)
+        # neutral court: average of hosting and visiting
+        self.neutral = 0.5 * (self.home + 1.0 - self.home.T)
+        self.rating = (self.h + self.a) / 2.0
+        self.ratings = dict(zip(self.teams, self.rating.tolist()))
+        self._series = {}  # best_of -> (with home court (n, n), seeded (n, n))
+        self.query = functools.lru_cache(maxsize=cache_size)(self._query)
+
+    def _series_tables(self, best_of: int):
+        tables = self._series.get(best_of)
+        if tables is None:
+            need = best_of // 2 + 1
+            # dist[w] = P(w games won so far) for every (i with home court, j) pair
+            dist = np.zeros((best_of + 1,) + self.home.shape)
+            dist[0] = 1.0
+            for hosts in home_schedule(best_of):
+                p = self.home if hosts else 1.0 - self.home.T
+                dist[1:] = dist[1:] * (1.0 - p) + dist[:-1] * p
+                dist[0] *= 1.0 - p
+            with_court = dist[need:].sum(axis=0)
+            idx = np.arange(len(self.teams))
+            seeded = np.where(self._better(idx[:, None], idx[None, :]), with_court, 1.0 - with_court.T)
+            np.fill_diagonal(seeded, 0.5)
+            tables = self._series[best_of] = (with_court, seeded)
+        return tables
+
+    def _better(self, i, j):
+        # home court: higher rating, ties to the earlier team
+        r = self.rating
+        return (r[i] > r[j]) | ((r[i] == r[j]) & (i < j))
+
+    def series_matrix(self, best_of: int = 7) -> np.ndarray:
+        """S[i, j] = P(i wins a best-of series against j), home court to the better-rated team."""
+        return self._series_tables(best_of)[1]
+
+    def _query(self, a: str, b: str, best_of: int = 7, home_court: str | None = None) -> dict:
+        i, j = self.pos[a], self.pos[b]
+        with_court = self._series_tables(best_of)[0]
+        if home_court is None:
+            home_court = a if self._better(i, j) else b
+        if home_court == a:
+            p_series = float(with_court[i, j])
+        elif home_court == b:
+            p_series = float(1.0 - with_court[j, i])
+        else:
+            raise ValueError(f"home_court must be {a!r} or {b!r}, got {home_court!r}")
+        hosts = home_schedule(best_of) if home_court == a else ~home_schedule(best_of)
+        games = tuple(float(self.home[i, j]) if h else float(1.0 - self.home[j, i]) for h in hosts)
+        return {"a": a, "b": b, "best_of": int(best_of), "home_court": home_court, "p_game": float(self.neutral[i, j]),
+                "games": games, "p_series": p_series}
+
+    def query_many(self, pairs, best_of: int = 7) -> np.ndarray:
+        """P(first team wins the series) for many (a, b) pairs, home court to the better-rated team."""
+        idx = np.array([(self.pos[a], self.pos[b]) for a, b in pairs], dtype=np.int64).reshape(-1, 2)
+        return self.series_matrix(best_of)[idx[:, 0], idx[:, 1]]
+
+    def save(self, root=ROOT) -> Path:
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        path = root / f"{self.version or 'latest'}.npz"
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, teams=np.array(self.teams, dtype=str), h=self.h, a=self.a)
+        os.replace(tmp, path)
+        return path
+
+
+def load_matchups(path) -> MatchupMatrix:
+    with np.load(path) as z:
+        return MatchupMatrix(z["teams"].tolist(), z["h"], z["a"], version=Path(path).stem)
+
+
+def latest_matchups(root=ROOT) -> MatchupMatrix | None:
+    """Most recently saved matrix under root (None when there is none)."""
+    files = sorted(Path(root).glob("*.npz"), key=lambda p: p.stat().st_mtime)
+    return load_matchups(files[-1]) if files else None
@@ -0,0 +1,116 @@
+"""Per-peer outbound queue drained by one sender coroutine.
+
+ActorSystem.tell puts serialized envelopes for a remote peer into that
+peer's PeerOutbox. A single task per peer takes everything that is queued
+(up to max_batch) and hands it to the transport as one batch, so messages
+to the same peer keep their order and a burst of tells becomes one write.
+
+The coalescing window adapts to the arrival rate: while messages arrive
+closer together than max_delay_ms the sender waits about two inter-arrival
+gaps for more of them before flushing; when traffic is sparse it flushes
+immediately and adds no latency.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class PeerOutbox:
+    def __init__(self, name: str, flush, max_batch: int = 256, max_delay_ms: float = 2.0):
+        self.name = name
+        self._flush = flush  # async callable(list[envelope])
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self._queue = deque()  # (enqueue time, envelope)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self._last_put = None
+        self._gap_ewma = None
+        # counters
+        self.enqueued = 0
+        self.sent = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.max_batch_seen = 0
+        self.last_batch = 0
+        self.flush_latency_sum = 0.0
+        self.flush_latency_max = 0.0
+        self.failures = 0  # failed batches
+        self.dropped = 0  # envelopes in failed batches
+
+    def put(self, envelope):
+        now = time.perf_counter()
+        if self._last_put is not None:
+            gap = now - self._last_put
+            self._gap_ewma = gap if self._gap_ewma is None else 0.8 * self._gap_ewma + 0.2 * gap
+        self._last_put = now
+        self._queue.append((now, envelope))
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._wakeup.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def window(self) -> float:
+        if self.max_delay <= 0.0 or self._gap_ewma is None or self._gap_ewma >= self.max_delay:
+            return 0.0
+        return min(self.max_delay, 2.0 * self._gap_ewma)
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = self.window()
+            if wait > 0.0 and len(self._queue) < self.max_batch and not self._closing:
+                await asyncio.sleep(wait)
+            n = min(self.max_batch, len(self._queue))
+            items = [self._queue.popleft() for _ in range(n)]
+            try:
+                await self._flush([env for (_, env) in items])
+            except Exception as e:
+                self.failures += 1
+                self.dropped += n
+                print(f"[ActorSystem] send to {self.name} failed ({n} msgs):", e)
+                continue
+            # batch size and latency only count delivered batches
+            latency = time.perf_counter() - items[0][0]
+            self.sent += n
+            self.batches += 1
+            self.last_batch = n
+            self.max_batch_seen = max(self.max_batch_seen, n)
+            self.flush_latency_sum += latency
+            self.flush_latency_max = max(self.flush_latency_max, latency)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "batches": self.batches,
+            "avg_batch": (self.sent / self.batches) if self.batches else 0.0,
+            "last_batch": self.last_batch,
+            "max_batch": self.max_batch_seen,
+            "window_ms": self.window() * 1000.0,
+            "avg_flush_latency_ms": (self.flush_latency_sum / self.batches * 1000.0) if self.batches else 0.0,
+            "max_flush_latency_ms": self.flush_latency_max * 1000.0,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+    async def close(self, timeout: float = 2.0):
+        # flush what is still queued, then stop the sender task
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except Exception:
+                self._task.cancel()
+            self._task = None
@@ -1,33 +1,83 @@
 from actor.actor_system import Actor
+import time
 import numpy as np
-from sklearn.linear_model import LogisticRegression
+from actor.compute import run_cpu, get_fit_batcher, fit_logreg_warm_rows
+from feature_store import feature_matrix, fingerprint, forget
 from math import ceil
 from actor.aggregator import GlobalModel
 from actor.crdt import Increment
+from actor.codec import register_message
 
+@register_message
 class StartRound: pass
+@register_message
 class PeerList:
     def __init__(self, peers, is_reporter=False, reporter_name: str | None = None, total_rounds: int = 1):
         self.peers = peers
         self.is_reporter = is_reporter
         self.reporter_name = reporter_name
         self.total_rounds = int(total_rounds)
+@register_message
 class PeerReady:
     def __init__(self, peer_name: str):
         self.peer_name = peer_name
+@register_message
 class ModelShare:
-    def __init__(self, sender, coef, intercept, version: int | None = None, ts_ms: int | None = None):
+    def __init__(self, sender, coef, intercept, version: int | None = None, ts_ms: int | None = None,
+                 n_samples: int | None = None):
         self.sender = sender
         self.coef = coef
         self.intercept = intercept
         self.version = version
         self.ts_ms = ts_ms
+        self.n_samples = n_samples  # training rows behind the model (weighted FedAvg)
+
+    def coalesce_key(self):
+        # mailbox "coalesce" policy keeps only the newest share per sender
+        return ("ModelShare", self.sender)
+
+    def to_payload(self):
+        payload = {
+            "sender": self.sender,
+            "coef": np.asarray(self.coef, dtype=float).ravel(),
+            "intercept": float(self.intercept),
+        }
+        if self.version is not None:
+            payload["version"] = int(self.version)
+        payload["ts_ms"] = self.ts_ms if self.ts_ms is not None else int(time.time() * 1000)
+        if self.n_samples is not None:
+            payload["n_samples"] = int(self.n_samples)
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(
+            payload["sender"],
+            np.asarray(payload["coef"], dtype=float),
+            float(payload["intercept"]),
+            payload.get("version"),
+            payload.get("ts_ms"),
+            payload.get("n_samples"),
+        )
+
+@register_message
+class ShareHeartbeat:
+    """Gossip-async: the sender's model is still `version` (inputs unchanged, no refit)."""
+    def __init__(self, sender: str, version: int):
+        self.sender = sender
+        self.version = int(version)
+
+@register_message
+class ShareRequest:
+    """Gossip-async: the reporter got a heartbeat for a version it does not hold; resend the full share."""
+    def __init__(self, requester: str):
+        self.requester = requester
 
 class TeamNodeP2P(Actor):
     def __init__(self, name, system, data, features, imputer, total_rounds: int = 1, eval_after: bool = False,
                  gossip_async: bool = False, gossip_batch: int = 3, gossip_window_ms: int = 2000, gossip_interval_ms: int = 2000, staleness_alpha: float = 0.0,
                  gossip_max_flushes: int = 0, gossip_max_seconds: int = 0, gossip_eval_on_stop: bool = False,
-                 gossip_converge_eps: float = 0.0, gossip_converge_patience: int = 3):
+                 gossip_converge_eps: float = 0.0, gossip_converge_patience: int = 3, gossip_resend_every: int = 5):
         super().__init__(name, system)
         self.data = data
         self.features = features
@@ -48,14 +98,27 @@ class TeamNodeP2P(Actor):
         self.gossip_eval_on_stop = bool(gossip_eval_on_stop)
         self.gossip_converge_eps = float(gossip_converge_eps)
         self.gossip_converge_patience = int(max(1, gossip_converge_patience))
+        self.gossip_resend_every = max(0, int(gossip_resend_every))  # full share to everyone every N intervals (0 = never)
 
         # state po rundi
         self.local_coef = None
         self.local_intercept = None
+        self.global_coef = None
+        self.global_intercept = None
+        self._rounds_trained = 0
+        # dirty tracking for gossip-async: what the current local model was fitted on
+        self._global_version = 0
+        self._fitted_key = None
+        self._shared_with = set()  # peers the current share version was sent to (delivery is not confirmed)
+        self._share_ticks = 0
+        self._latest = {}          # sender -> last ModelShare tuple (reporter, re-used on heartbeats)
+        self._fresh = False        # buffer holds at least one new version since the last flush
+        self.fits = 0
+        self.skipped_fits = 0
         self.collected = {}
         self._share_version = 0
         self._last_flush_ms = 0
-        self._buffer = {}  # sender -> (coef, intercept, ver, ts)
+        self._buffer = {}  # sender -> (coef, intercept, ver, ts of the share or of the heartbeat that confirmed it)
         self._seen = {}    # sender -> last_version
         self._flush_count = 0
         self._start_ms = None
@@ -90,17 +153,13 @@ class TeamNodeP2P(Actor):
                         self.system.tell(target, PeerReady(self.name))
 
         elif isinstance(message, StartRound):
-            # 1) lokalni trening
-            X = self.imputer.transform(self.data[self.features])
-            y = self.data["home_win"]
-            model = LogisticRegression(max_iter=500)
-            model.fit(X, y)
-            self.local_coef = model.coef_[0]
-            self.local_intercept = model.intercept_[0]
+            # 1) lokalni trening (warm start od globalnog modela prethodne runde)
+            self._rounds_trained += 1
+            await self._train_local(f"runda {self._rounds_trained}")
             self.collected = {self.name: (self.local_coef, self.local_intercept)}
 
             # 2) broadcast moje težine
-            share = ModelShare(self.name, self.local_coef, self.local_intercept, version=self._share_version)
+            share = ModelShare(self.name, self.local_coef, self.local_intercept, version=self._share_version, n_samples=len(self.data))
             for p in self.peers:
                 self.system.tell(p, share)
 
@@ -110,11 +169,16 @@ class TeamNodeP2P(Actor):
                 # dedup by version
                 last_v = self._seen.get(message.sender, -1)
                 ver = message.version if message.version is not None else last_v + 1
-                if ver <= last_v:
+                if ver < last_v:
+                    return
+                if ver == last_v:
+                    # periodic full resend of the version we hold: counts like a heartbeat
+                    await self.default_behavior(ShareHeartbeat(message.sender, ver))
                     return
                 self._seen[message.sender] = ver
                 # buffer update
-                self._buffer[message.sender] = (message.coef, message.intercept, ver, message.ts_ms)
+                self._buffer[message.sender] = self._latest[message.sender] = (message.coef, message.intercept, ver, message.ts_ms)
+                self._fresh = True
                 await self._maybe_flush_async()
                 return
 
@@ -126,6 +190,8 @@ class TeamNodeP2P(Actor):
                 intercepts = np.array([b for (w, b) in self.collected.values()])
                 global_coef = np.mean(coefs, axis=0).reshape(1, -1)
                 global_intercept = float(np.mean(intercepts, axis=0))
+                self.global_coef, self.global_intercept = global_coef, global_intercept
+                self._global_version += 1
 
                 if self.is_reporter:
                     self.system.tell("evaluator", GlobalModel(global_coef, global_intercept))
@@ -144,6 +210,28 @@ class TeamNodeP2P(Actor):
                 else:
                     print(f"[{self.name}] izračunao global (lokalno), reporter će poslati")
 
+        elif isinstance(message, ShareHeartbeat):
+            # sender's model unchanged: its last share counts in the next window again, with its real
+            # version (so --gossip-staleness still discounts it) and the heartbeat time as confirmed-at
+            if not self.gossip_async:
+                return
+            latest = self._latest.get(message.sender)
+            if latest is not None and latest[2] == message.version:
+                if message.sender not in self._buffer:
+                    coef, intercept, ver, _ts = latest
+                    self._buffer[message.sender] = (coef, intercept, ver, int(time.time() * 1000))
+                await self._maybe_flush_async()
+            elif self.is_reporter:
+                # the share for this version never arrived (lost send, we started later or restarted)
+                if latest is not None and message.version < latest[2]:
+                    self._seen.pop(message.sender, None)  # sender restarted and counts from 1 again
+                self.system.tell(message.sender, ShareRequest(self.name))
+
+        elif isinstance(message, ShareRequest):
+            if self.gossip_async and self.local_coef is not None:
+                self.system.tell(message.requester, self._share())
+                self._shared_with.add(message.requester)
+
         elif isinstance(message, PeerReady):
             if not self.gossip_async and self.is_reporter:
                 self.ready.add(message.peer_name)
@@ -151,6 +239,24 @@ class TeamNodeP2P(Actor):
                 if expected.issubset(self.ready):
                     await self._start_next_round()
 
+    async def _train_local(self, label: str):
+        # warm start: last global model this node computed, else its own previous local model
+        if self.global_coef is not None:
+            coef0, b0 = self.global_coef, self.global_intercept
+        else:
+            coef0, b0 = self.local_coef, self.local_intercept
+        fm = feature_matrix(self.data, self.features, self.imputer)
+        t0 = time.perf_counter()
+        batcher = get_fit_batcher()
+        if batcher is not None:
+            coef, intercept, iters = await batcher.fit_logreg(fm, None, coef0, b0)
+        else:
+            coef, intercept, iters = await run_cpu(fit_logreg_warm_rows, fm, None, coef0, b0)
+        self.local_coef, self.local_intercept = coef, intercept
+        self.fits += 1
+        print(f"[{self.name}] {label}: {iters} iteracija ({'warm' if coef0 is not None else 'cold'} start), "
+              f"{(time.perf_counter() - t0) * 1000.0:.1f} ms")
+
     async def on_start(self):
         print(f"[{self.name}] P2P node spreman sa {len(self.data)} mečeva")
         if self.gossip_async:
@@ -177,18 +283,42 @@ class TeamNodeP2P(Actor):
         import asyncio
         asyncio.create_task(loop())
 
+    def _fit_inputs(self):
+        # the local fit depends on the content of the node's frame (in-place edits included) and on the
+        # received global model; gossip-async nodes never receive one, so there only data changes refit
+        return (fingerprint(self.data, self.features, self.imputer, np.float64), self._global_version)
+
     async def _send_periodic_share(self):
-        # local train every interval; bump version and broadcast
-        X = self.imputer.transform(self.data[self.features])
-        y = self.data["home_win"]
-        model = LogisticRegression(max_iter=500)
-        model.fit(X, y)
-        self.local_coef = model.coef_[0]
-        self.local_intercept = model.intercept_[0]
-        self._share_version += 1
-        share = ModelShare(self.name, self.local_coef, self.local_intercept, version=self._share_version)
+        # local train every interval, but only when its inputs changed since the last fit;
+        # otherwise peers that already have the current version get a heartbeat
+        key = self._fit_inputs()
+        if key != self._fitted_key or self.local_coef is None:
+            if self._fitted_key is not None and key[0] != self._fitted_key[0]:
+                forget(self.data)  # the frame may have changed in place: re-impute it
+            await self._train_local(f"share {self._share_version + 1}")
+            self._fitted_key = key
+            self._share_version += 1
+            self._shared_with = set()
+        else:
+            if self.skipped_fits == 0:
+                print(f"[{self.name}] podaci i globalni model nepromenjeni → bez ponovnog treniranja (heartbeat v{self._share_version})")
+            self.skipped_fits += 1
+        self._share_ticks += 1
+        if self.gossip_resend_every and self._share_ticks % self.gossip_resend_every == 0:
+            # tell() returning does not mean the share arrived: periodically send it in full again
+            self._shared_with = set()
+        share = None
         for p in self.peers:
+            if p in self._shared_with:
+                self.system.tell(p, ShareHeartbeat(self.name, self._share_version))
+                continue
+            if share is None:
+                share = self._share()
             self.system.tell(p, share)
+            self._shared_with.add(p)
+
+    def _share(self) -> ModelShare:
+        return ModelShare(self.name, self.local_coef, self.local_intercept, version=self._share_version, n_samples=len(self.data))
 
     async def _maybe_flush_async(self):
         # Reporter agregira po batch/window, ostali ne flushuju
@@ -223,8 +353,11 @@ class TeamNodeP2P(Actor):
         # weighted average
         gcoef = (W[:, None] * C).sum(axis=0).reshape(1, -1)
         gint = float((W * I).sum())
-        self.system.tell("evaluator", GlobalModel(gcoef, gint))
-        self.system.tell("crdt", Increment())
+        if self._fresh:
+            self.system.tell("evaluator", GlobalModel(gcoef, gint))
+            self.system.tell("crdt", Increment())
+        # else: only heartbeats in this window, the global model is the one already sent
+        self._fresh = False
         self._flush_count += 1
         # convergence check
         if self.gossip_converge_eps > 0.0:
@@ -268,7 +401,7 @@ class TeamNodeP2P(Actor):
         await asyncio.sleep(max(0.0, ms / 1000.0))
 
     async def _stop_async_gossip(self):
-        print(f"[{self.name}] Gossip-async stop triggered (flushes={self._flush_count})")
+        print(f"[{self.name}] Gossip-async stop triggered (flushes={self._flush_count}, fitova={self.fits}, preskočeno={self.skipped_fits})")
         # Optional final evaluation
         if self.gossip_eval_on_stop and self.is_reporter:
             try:
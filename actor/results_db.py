@@ -0,0 +1,222 @@
+"""Background writer for storage/results.db.
+
+The Evaluator used to open a new sqlite3 connection for every model and
+playoff evaluation, run CREATE TABLE IF NOT EXISTS (plus a schema probe for
+playoffs) and insert row by row, all on the event loop. ResultsWriter owns
+one connection on a daemon thread instead:
+
+- the database is opened once in WAL mode (readers such as
+  scripts/who_wins_playoffs.py or bench.py never block the writer) and
+  migrate() brings the schema up to SCHEMA_VERSION (PRAGMA user_version)
+  once, at open;
+- put(table, rows) only appends to a queue and returns;
+- the thread collects rows until max_batch rows are waiting or max_delay_ms
+  passed since the first of them, then writes them with one executemany
+  per table inside a single transaction.
+
+flush() blocks until everything queued so far is committed (tests, shutdown);
+close() flushes and closes the connection. results_writer(path) returns the
+process-wide writer for a database file.
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_PATH = "storage/results.db"
+SCHEMA_VERSION = 1
+
+# table -> insert columns (rows are tuples in this order)
+TABLES = {
+    "results": ("timestamp", "round_idx", "coef", "intercept", "acc", "log_loss", "brier",
+                "base_acc", "base_log_loss", "base_brier"),
+    "playoffs": ("round_idx", "team_a", "team_b", "best_of", "wins_a", "wins_b", "winner", "stage", "p_a_win"),
+    "playoff_odds": ("round_idx", "n_sims", "seed", "team", "stage", "probability"),
+}
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        round_idx INTEGER,
+        coef TEXT NOT NULL,
+        intercept REAL NOT NULL,
+        acc REAL,
+        log_loss REAL,
+        brier REAL,
+        base_acc REAL,
+        base_log_loss REAL,
+        base_brier REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS playoffs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        round_idx INTEGER,
+        team_a TEXT,
+        team_b TEXT,
+        best_of INTEGER,
+        wins_a INTEGER,
+        wins_b INTEGER,
+        winner TEXT,
+        stage TEXT,
+        p_a_win REAL,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS playoff_odds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        round_idx INTEGER,
+        n_sims INTEGER,   -- NULL = exact
+        seed TEXT,
+        team TEXT,
+        stage TEXT,
+        probability REAL,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def migrate(conn: sqlite3.Connection):
+    """Create missing tables and columns; a no-op once user_version is current."""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    with conn:
+        for stmt in _SCHEMA:
+            conn.execute(stmt)
+        # databases from before the stage column
+        if "stage" not in {row[1] for row in conn.execute("PRAGMA table_info(playoffs)")}:
+            conn.execute("ALTER TABLE playoffs ADD COLUMN stage TEXT")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def connect(path) -> sqlite3.Connection:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    migrate(conn)
+    return conn
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ResultsWriter:
+    def __init__(self, path=DEFAULT_PATH, max_batch: int = 256, max_delay_ms: float = 200.0):
+        self.path = str(path)
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        # counters
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name=f"results-db:{Path(self.path).name}", daemon=True)
+        self._ready = threading.Event()
+        self._thread.start()
+        self._ready.wait()
+
+    def put(self, table: str, rows):
+        """Queue rows (tuples in TABLES[table] order) for the next batch; never blocks on the database."""
+        if table not in TABLES:
+            raise ValueError(f"unknown results table {table!r}")
+        rows = [tuple(r) for r in rows]
+        if rows and not self._closed:
+            self._queue.put((table, rows))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every row queued before this call is committed."""
+        if self._closed:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {"rows": self.rows, "batches": self.batches, "errors": self.errors, "queued": self._queue.qsize()}
+
+    def _run(self):
+        try:
+            conn = connect(self.path)
+        except sqlite3.Error as e:
+            print(f"[ResultsDB] {self.path} nije otvoren: {e}")
+            conn = None
+        self._ready.set()
+        pending, count, first_at, markers = {}, 0, None, []
+        while True:
+            timeout = None if first_at is None else max(0.0, first_at + self.max_delay - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # time threshold reached
+            stop = item is None
+            if isinstance(item, _Flush):
+                markers.append(item)
+            elif item:
+                table, rows = item
+                pending.setdefault(table, []).extend(rows)
+                count += len(rows)
+                if first_at is None:
+                    first_at = time.monotonic()
+            if pending and (stop or markers or item is False or count >= self.max_batch):
+                self._write(conn, pending, count)
+                pending, count, first_at = {}, 0, None
+            for m in markers:
+                m.done.set()
+            markers = []
+            if stop:
+                break
+        if conn is not None:
+            conn.close()
+
+    def _write(self, conn, pending: dict, count: int):
+        if conn is None:
+            self.errors += 1
+            return
+        try:
+            with conn:
+                for table, rows in pending.items():
+                    cols = TABLES[table]
+                    conn.executemany(f"INSERT INTO {table}({', '.join(cols)}) VALUES({', '.join('?' * len(cols))})", rows)
+            self.rows += count
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"[ResultsDB] Greška pri upisu ({count} redova): {e}")
+
+
+_writers = {}  # resolved path -> ResultsWriter
+_lock = threading.Lock()
+
+
+def results_writer(path=DEFAULT_PATH) -> ResultsWriter:
+    key = str(Path(path).resolve())
+    with _lock:
+        writer = _writers.get(key)
+        if writer is None or writer._closed:
+            writer = _writers[key] = ResultsWriter(key)
+        return writer
+
+
+@atexit.register
+def _close_all():
+    for writer in list(_writers.values()):
+        writer.close()
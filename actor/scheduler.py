@@ -1,34 +1,38 @@
+import time
 from actor.actor_system import Actor
+from actor.codec import register_message
+# iste klase šalje AggregatorP2P; jedna definicija po tipu poruke (registar i isinstance)
+from actor.aggregator import SetClusterModels, SetTeamClusters
 
 # Poruke za koordinaciju posla (mrežno bez slanja DataFrame-ova)
+@register_message
 class GiveMeWork:
     def __init__(self, worker: str):
         self.worker = worker  # puno ime aktera koji traži posao (npr. worker_BOS_0)
 
+@register_message
 class AssignTeam:
     def __init__(self, team_name: str):
         self.team_name = team_name
 
+@register_message
 class NoMoreWork:
-    pass
+    control = True
 
+@register_message
 class RegisterWorker:
     def __init__(self, worker: str, host: str, port: int):
         self.worker = worker
         self.host = host
         self.port = port
 
+@register_message
 class WorkDone:
-    def __init__(self, worker: str):
+    def __init__(self, worker: str, iterations: int = 0, fit_ms: float = 0.0):
         self.worker = worker
+        self.iterations = int(iterations)  # solver iterations of the finished fit (0 = skipped)
+        self.fit_ms = float(fit_ms)
 
-class SetClusterModels:
-    def __init__(self, cluster_models: dict):
-        self.cluster_models = cluster_models
-
-class SetTeamClusters:
-    def __init__(self, mapping: dict):
-        self.mapping = mapping
 
 
 class Scheduler(Actor):
@@ -50,6 +54,22 @@ class Scheduler(Actor):
         self.team_to_cluster = {}
         self.cluster_models = None
         self._team_idx = 0  # for async round-robin
+        # per-round training cost (WorkDone.iterations / fit_ms), logged at RoundComplete
+        self._round_t0 = None
+        self._round_fits = 0
+        self._round_iters = 0
+        self._round_fit_ms = 0.0
+
+    def _log_round_cost(self):
+        if self._round_t0 is None:
+            return  # already logged for this round
+        wall = time.perf_counter() - self._round_t0
+        mean_iters = self._round_iters / self._round_fits if self._round_fits else 0.0
+        print(f"[Scheduler] Runda {self.current_round}: {self._round_fits} fitova, {self._round_iters} iteracija "
+              f"(prosek {mean_iters:.1f}), fit {self._round_fit_ms:.0f} ms, ukupno {wall:.2f} s")
+        self._round_t0 = None
+        self._round_fits = self._round_iters = 0
+        self._round_fit_ms = 0.0
 
     async def default_behavior(self, message):
         from actor.aggregator import RoundComplete, SetGlobalModel
@@ -83,6 +103,8 @@ class Scheduler(Actor):
                 if self.teams:
                     team = self.teams.pop(0)
                     self.active_requests += 1
+                    if self._round_t0 is None:
+                        self._round_t0 = time.perf_counter()
                     if self.cluster_models and self.team_to_cluster:
                         cid = self.team_to_cluster.get(team)
                         if cid is not None and cid in self.cluster_models:
@@ -98,6 +120,7 @@ class Scheduler(Actor):
                     print(f"[Scheduler] nema više posla za {message.worker}")
 
                     if not self.teams and self.active_requests == 0:
+                        self._log_round_cost()
                         self.system.tell("aggregator_p2p", RoundComplete(self.current_round, self.total_rounds, self.fedprox_mu))
                         print(f"[Scheduler] Runda {self.current_round}/{self.total_rounds} završena → poslato RoundComplete")
 
@@ -114,8 +137,13 @@ class Scheduler(Actor):
         elif isinstance(message, WorkDone):
             if self.active_requests > 0:
                 self.active_requests -= 1
+            if message.iterations or message.fit_ms:
+                self._round_fits += 1
+                self._round_iters += message.iterations
+                self._round_fit_ms += message.fit_ms
             if not self.async_mode:
                 if not self.teams and self.active_requests == 0:
+                    self._log_round_cost()
                     self.system.tell("aggregator_p2p", RoundComplete(self.current_round, self.total_rounds, self.fedprox_mu))
                     print(f"[Scheduler] Runda {self.current_round}/{self.total_rounds} završena (WorkDone) → RoundComplete")
                     if self.current_round < self.total_rounds:
@@ -1,6 +1,8 @@
 from actor.actor_system import Actor
 
 class RestartRequest:
+    control = True
+
     def __init__(self, actor_name, actor_class, args):
         self.actor_name = actor_name
         self.actor_class = actor_class
@@ -0,0 +1,254 @@
+"""TCP transport: length-prefixed frames over long-lived, pooled connections.
+
+Wire format of one frame:
+
+    [4 bytes body length, big-endian][1 byte frame kind][body]
+
+A single connection carries any number of frames, so a peer is connected
+once and reused for all envelopes sent to it. Right after connecting the
+client offers its body codecs in a HELLO frame and the server answers with
+the one it picked (see actor.wire); a server that does not answer in time
+is treated as JSON-only. The receiving side still
+accepts the legacy "one JSON line per connection" format, which is detected
+by the first byte: frames are capped at 64 MiB, so the high byte of the
+length is always below 0x04 and never equals '{'.
+"""
+
+import asyncio
+import itertools
+import json
+import struct
+
+from actor import wire
+
+FRAME_HEADER = struct.Struct("!IB")
+FRAME_JSON = 1
+FRAME_BINARY = 2
+FRAME_HELLO = 3
+FRAME_BATCH = 4  # body = concatenated JSON/BINARY frames, sent as one write
+
+CODEC_FRAMES = {wire.CODEC_JSON: FRAME_JSON, wire.CODEC_BINARY: FRAME_BINARY}
+
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+_LEGACY_JSON_START = b"{"
+
+
+def pack_frame(kind: int, body: bytes) -> bytes:
+    if len(body) > MAX_FRAME_SIZE:
+        raise ValueError(f"frame too large: {len(body)} bytes")
+    return FRAME_HEADER.pack(len(body), kind) + body
+
+
+def pack_batch(frames: list) -> bytes:
+    """Wrap already packed frames into as few FRAME_BATCH frames as MAX_FRAME_SIZE allows."""
+    if len(frames) == 1:
+        return frames[0]
+    out, group, size = [], [], 0
+    for f in frames:
+        if group and size + len(f) > MAX_FRAME_SIZE:
+            out.append(pack_frame(FRAME_BATCH, b"".join(group)))
+            group, size = [], 0
+        group.append(f)
+        size += len(f)
+    out.append(pack_frame(FRAME_BATCH, b"".join(group)) if len(group) > 1 else group[0])
+    return b"".join(out)
+
+
+def unpack_batch(body):
+    """Yield (kind, memoryview) for every frame packed into a FRAME_BATCH body."""
+    view = memoryview(body)
+    pos = 0
+    while pos < len(view):
+        length, kind = FRAME_HEADER.unpack_from(view, pos)
+        pos += FRAME_HEADER.size
+        yield kind, view[pos:pos + length]
+        pos += length
+
+
+def negotiate_codec(offered, preferred: str = wire.CODEC_BINARY) -> str:
+    """Server side of the HELLO exchange: our preference if offered, else the first known one."""
+    offered = [c for c in (offered or []) if c in wire.CODECS]
+    if preferred in offered:
+        return preferred
+    return offered[0] if offered else wire.CODEC_JSON
+
+
+def hello_frame(payload: dict) -> bytes:
+    return pack_frame(FRAME_HELLO, json.dumps(payload).encode("utf-8"))
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    header = await reader.readexactly(FRAME_HEADER.size)
+    length, kind = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"frame too large: {length} bytes")
+    return kind, await reader.readexactly(length)
+
+
+async def read_frames(reader: asyncio.StreamReader):
+    """Yield (kind, body) for every frame on the connection until EOF.
+
+    Legacy peers that send a single JSON line are reported as FRAME_JSON.
+    """
+    while True:
+        try:
+            first = await reader.readexactly(1)
+        except asyncio.IncompleteReadError:
+            return
+        if first == _LEGACY_JSON_START:
+            line = first + await reader.readline()
+            yield FRAME_JSON, line.rstrip(b"\r\n")
+            continue
+        try:
+            header = first + await reader.readexactly(FRAME_HEADER.size - 1)
+            length, kind = FRAME_HEADER.unpack(header)
+            if length > MAX_FRAME_SIZE:
+                raise ValueError(f"frame too large: {length} bytes")
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return
+        yield kind, body
+
+
+class PeerConnection:
+    """One long-lived outbound connection; reconnects when the peer went away."""
+
+    def __init__(self, host: str, port: int, connect_timeout: float = 5.0,
+                 codecs=(wire.CODEC_BINARY, wire.CODEC_JSON), float32: bool = False, hello_timeout: float = 2.0):
+        self.host = host
+        self.port = int(port)
+        self.connect_timeout = float(connect_timeout)
+        self.codecs = list(codecs)
+        self.float32 = bool(float32)
+        self.hello_timeout = float(hello_timeout)
+        self.codec = wire.CODEC_JSON
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+        self.connects = 0
+
+    def _is_open(self) -> bool:
+        if self._writer is None or self._writer.is_closing():
+            return False
+        # peer closed its side (restart, idle timeout...) -> EOF is fed into our reader
+        return not self._reader.at_eof()
+
+    async def _connect(self):
+        await self._close()
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.connect_timeout
+        )
+        self.connects += 1
+        self.codec = await self._negotiate()
+
+    async def _negotiate(self) -> str:
+        if self.codecs == [wire.CODEC_JSON]:
+            return wire.CODEC_JSON
+        self._writer.write(hello_frame({"codecs": self.codecs}))
+        await self._writer.drain()
+        try:
+            kind, body = await asyncio.wait_for(read_frame(self._reader), timeout=self.hello_timeout)
+        except asyncio.TimeoutError:
+            return wire.CODEC_JSON  # framed peer without codec negotiation
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionError(f"{self.host}:{self.port} closed during handshake") from e
+        if kind != FRAME_HELLO:
+            return wire.CODEC_JSON
+        codec = json.loads(body.decode("utf-8")).get("codec")
+        return codec if codec in self.codecs else wire.CODEC_JSON
+
+    async def _close(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is None:
+            return
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+    async def send(self, envelope: dict):
+        await self.send_batch([envelope])
+
+    async def send_batch(self, envelopes: list):
+        async with self._lock:
+            for attempt in (0, 1):
+                try:
+                    if not self._is_open():
+                        await self._connect()
+                    kind = CODEC_FRAMES[self.codec]
+                    frames = [pack_frame(kind, wire.encode(e, self.codec, float32=self.float32)) for e in envelopes]
+                    self._writer.write(pack_batch(frames))
+                    await self._writer.drain()
+                    return
+                except (ConnectionError, OSError, asyncio.TimeoutError):
+                    await self._close()
+                    if attempt:
+                        raise
+
+    async def close(self):
+        async with self._lock:
+            await self._close()
+
+    def set_codecs(self, codecs):
+        # applies on the next (re)connect
+        self.codecs = list(codecs)
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ConnectionPool:
+    """Per-peer pool of long-lived connections keyed by (host, port)."""
+
+    def __init__(self, max_per_peer: int = 1, connect_timeout: float = 5.0,
+                 codec: str = wire.CODEC_BINARY, float32: bool = False):
+        self.max_per_peer = max(1, int(max_per_peer))
+        self.connect_timeout = float(connect_timeout)
+        self.default_codecs = _codec_offer(codec)
+        self.float32 = bool(float32)
+        self._conns = {}         # (host, port) -> list[PeerConnection]
+        self._rr = {}            # (host, port) -> round-robin iterator
+        self._peer_codecs = {}   # (host, port) -> codec offer override
+
+    def set_peer_codec(self, host: str, port: int, codec: str):
+        key = (host, int(port))
+        self._peer_codecs[key] = _codec_offer(codec)
+        for c in self._conns.get(key, []):
+            c.set_codecs(self._peer_codecs[key])
+
+    def get(self, host: str, port: int) -> PeerConnection:
+        key = (host, int(port))
+        conns = self._conns.get(key)
+        if conns is None:
+            codecs = self._peer_codecs.get(key, self.default_codecs)
+            conns = [PeerConnection(host, port, self.connect_timeout, codecs=codecs, float32=self.float32)
+                     for _ in range(self.max_per_peer)]
+            self._conns[key] = conns
+            self._rr[key] = itertools.cycle(conns)
+        return next(self._rr[key])
+
+    async def send(self, host: str, port: int, envelope: dict):
+        await self.get(host, port).send(envelope)
+
+    async def send_batch(self, host: str, port: int, envelopes: list):
+        await self.get(host, port).send_batch(envelopes)
+
+    def stats(self) -> dict:
+        return {
+            f"{h}:{p}": {"connects": sum(c.connects for c in conns), "codec": conns[0].codec}
+            for (h, p), conns in self._conns.items()
+        }
+
+    async def close(self):
+        conns = [c for group in self._conns.values() for c in group]
+        self._conns.clear()
+        self._rr.clear()
+        for c in conns:
+            await c.close()
+
+
+def _codec_offer(codec: str) -> list:
+    # JSON is always acceptable as a fallback; asking for JSON means JSON only
+    if codec == wire.CODEC_JSON:
+        return [wire.CODEC_JSON]
+    return [codec] + [c for c in wire.CODECS if c != codec]
@@ -0,0 +1,118 @@
+"""Envelope body codecs used on framed TCP connections.
+
+Two codecs exist and are negotiated per connection (see tcp_transport):
+
+- "json":   the envelope as UTF-8 JSON; numpy arrays become lists. Human
+            readable, kept for debugging and for peers without numpy buffers.
+- "binary": a small JSON header followed by the raw array buffers. Arrays in
+            the payload are replaced by {"__nd__": i} placeholders and the
+            header lists (dtype, shape, offset) for each of them. Decoding
+            returns np.frombuffer views over the received frame, no copies.
+
+Binary body layout:
+
+    [u32 header length][header JSON][zero padding to 8 bytes][array data ...]
+"""
+
+import json
+import struct
+
+import numpy as np
+
+CODEC_JSON = "json"
+CODEC_BINARY = "binary"
+CODECS = (CODEC_BINARY, CODEC_JSON)
+
+_HEADER_LEN = struct.Struct("!I")
+_ALIGN = 8
+_ND = "__nd__"
+
+
+def json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(envelope: dict) -> bytes:
+    return json.dumps(envelope, default=json_default).encode("utf-8")
+
+
+def decode_json(body) -> dict:
+    return json.loads(bytes(body).decode("utf-8"))
+
+
+def _pad(n: int) -> int:
+    return (-n) % _ALIGN
+
+
+def encode_binary(envelope: dict, float32: bool = False) -> bytes:
+    buffers = []
+    specs = []
+    offset = 0
+
+    def strip(obj):
+        nonlocal offset
+        if isinstance(obj, np.ndarray):
+            arr = obj
+            if arr.dtype.kind == "f":
+                arr = arr.astype(np.float32 if float32 else np.float64, copy=False)
+            arr = np.ascontiguousarray(arr)
+            specs.append([arr.dtype.str, list(arr.shape), offset])
+            buffers.append(arr)
+            offset += arr.nbytes + _pad(arr.nbytes)
+            return {_ND: len(specs) - 1}
+        if isinstance(obj, dict):
+            return {k: strip(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [strip(v) for v in obj]
+        return obj
+
+    header = dict(envelope)
+    if "payload" in header:
+        header["payload"] = strip(header["payload"])
+    header["arrays"] = specs
+    hbytes = json.dumps(header, default=json_default).encode("utf-8")
+
+    parts = [_HEADER_LEN.pack(len(hbytes)), hbytes, b"\0" * _pad(_HEADER_LEN.size + len(hbytes))]
+    for arr in buffers:
+        parts.append(arr.data)
+        parts.append(b"\0" * _pad(arr.nbytes))
+    return b"".join(parts)
+
+
+def decode_binary(body) -> dict:
+    (hlen,) = _HEADER_LEN.unpack_from(body, 0)
+    start = _HEADER_LEN.size
+    header = json.loads(bytes(body[start:start + hlen]).decode("utf-8"))
+    data_start = start + hlen + _pad(start + hlen)
+
+    arrays = []
+    for dtype, shape, off in header.pop("arrays", []):
+        dt = np.dtype(dtype)
+        count = int(np.prod(shape, dtype=np.int64)) if shape else 1
+        arr = np.frombuffer(body, dtype=dt, count=count, offset=data_start + off)
+        arrays.append(arr.reshape(shape))
+
+    def restore(obj):
+        if isinstance(obj, dict):
+            if len(obj) == 1 and _ND in obj:
+                return arrays[obj[_ND]]
+            return {k: restore(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [restore(v) for v in obj]
+        return obj
+
+    if "payload" in header:
+        header["payload"] = restore(header["payload"])
+    return header
+
+
+def encode(envelope: dict, codec: str, float32: bool = False) -> bytes:
+    if codec == CODEC_BINARY:
+        return encode_binary(envelope, float32=float32)
+    return encode_json(envelope)
@@ -4,11 +4,19 @@ from actor.scheduler import GiveMeWork, AssignTeam, NoMoreWork, RegisterWorker,
 from actor.p2p import ModelShare
 from actor.aggregator import SetGlobalModel
 from actor.health import HealthPing, HealthAck, CrashMe
+from actor.compute import run_cpu, get_fit_batcher, fit_fedprox, fit_fedprox_rows, fit_logreg_warm_rows, _sigmoid
+from feature_store import feature_matrix
+from team_index import team_index
+import time
 import numpy as np
-from sklearn.linear_model import LogisticRegression
 
 
 class TeamNodeWorker(Actor):
+    # FedProx local solver: "newton" (until ||grad||_inf < tol, at most max_iter steps) or "gd" (120 fixed epochs)
+    fedprox_solver = "newton"
+    fedprox_tol = 1e-6
+    fedprox_max_iter = 50
+
     def __init__(self, name, system, features, imputer, scheduler_name, train_df=None, fedprox_mu: float = 0.0):
         super().__init__(name, system)
         self.features = features
@@ -19,37 +27,15 @@ class TeamNodeWorker(Actor):
         self.global_intercept = None
         self.fedprox_mu = float(fedprox_mu)
 
-    # --- FedProx helpers (numpy) ---
+    # --- FedProx helpers (numpy); the loop itself lives in actor.compute so it can run in a worker process ---
     @staticmethod
     def _sigmoid(z: np.ndarray) -> np.ndarray:
-        z = np.clip(z, -50.0, 50.0)
-        return 1.0 / (1.0 + np.exp(-z))
+        return _sigmoid(z)
 
     def _train_fedprox(self, X: np.ndarray, y: np.ndarray, mu: float,
                         w_global: np.ndarray | None, b_global: float | None,
                         epochs: int = 100, lr: float = 0.1, l2: float = 0.0) -> tuple[np.ndarray, float]:
-        n, d = X.shape
-        if w_global is None:
-            w = np.zeros(d, dtype=float)
-            b = 0.0
-        else:
-            w = np.array(w_global, dtype=float).ravel().copy()
-            b = float(b_global if b_global is not None else 0.0)
-        yv = np.array(y, dtype=float)
-        for _ in range(max(1, int(epochs))):
-            z = X.dot(w) + b
-            p = self._sigmoid(z)
-            # gradients
-            diff = (p - yv)
-            grad_w = (X.T @ diff) / n + (l2 * w)
-            grad_b = float(np.sum(diff) / n)
-            if mu > 0.0 and w_global is not None:
-                grad_w += mu * (w - np.array(w_global, dtype=float).ravel())
-                grad_b += mu * (b - float(b_global))
-            # step
-            w -= lr * grad_w
-            b -= lr * grad_b
-        return w, float(b)
+        return fit_fedprox(X, y, mu, w_global, b_global, epochs=epochs, lr=lr, l2=l2)
 
     async def on_start(self):
         try:
@@ -80,44 +66,62 @@ class TeamNodeWorker(Actor):
                 self.system.tell(self.scheduler, WorkDone(self.name))
                 self.system.tell(self.scheduler, GiveMeWork(self.name))
                 return
-            data = self.train_df[(self.train_df["home_team"] == team) | (self.train_df["away_team"] == team)]
-
-            X = self.imputer.transform(data[self.features])
-            y = data["home_win"]
+            # pre-imputed rows of this team (shared, memory-mapped matrix; see feature_store)
+            fm = feature_matrix(self.train_df, self.features, self.imputer)
+            rows = team_index(self.train_df).rows(team)
+            y = fm.y[rows]
 
-            if len(set(y)) < 2:
+            if len(np.unique(y)) < 2:
                 print(f"[{self.name}] tim {team} nema dovoljno klasa, preskačem.")
                 self.system.tell(self.scheduler, WorkDone(self.name))
                 self.system.tell(self.scheduler, GiveMeWork(self.name))
                 return
 
-            if self.fedprox_mu > 0.0 and self.global_coef is not None and self.global_intercept is not None:
+            batcher = get_fit_batcher()
+            # warm start from the global/cluster model of the last SetGlobalModel
+            warm = self.global_coef is not None and self.global_intercept is not None
+            coef0 = self.global_coef.ravel() if warm else None
+            b0 = float(self.global_intercept) if warm else None
+            t0 = time.perf_counter()
+            if self.fedprox_mu > 0.0 and warm:
+                solver = self.fedprox_solver
+                if solver == "newton":
+                    solver_kwargs = {"tol": self.fedprox_tol, "max_iter": self.fedprox_max_iter}
+                else:
+                    solver_kwargs = {"epochs": 120, "lr": 0.1}
                 try:
-                    w, b = self._train_fedprox(
-                        X, y,
-                        mu=self.fedprox_mu,
-                        w_global=self.global_coef.ravel(),
-                        b_global=float(self.global_intercept),
-                        epochs=120,
-                        lr=0.1,
-                        l2=0.0,
-                    )
-                    coef_out, intercept_out = w, b
+                    if batcher is not None and solver == "newton":
+                        # fitted together with the other workers' teams of this node
+                        coef_out, intercept_out, iters = await batcher.fit(fm, rows, self.fedprox_mu, coef0, b0, **solver_kwargs)
+                    else:
+                        coef_out, intercept_out, iters = await run_cpu(
+                            fit_fedprox_rows,
+                            fm, rows,
+                            mu=self.fedprox_mu,
+                            w_global=coef0,
+                            b_global=b0,
+                            solver=solver,
+                            l2=0.0,
+                            **solver_kwargs,
+                        )
                 except Exception as e:
                     print(f"[{self.name}] FedProx fallback zbog greške: {e}")
-                    model = LogisticRegression(max_iter=500)
-                    model.fit(X, y)
-                    coef_out, intercept_out = model.coef_[0], float(model.intercept_[0])
+                    solver = "lbfgs"
+                    coef_out, intercept_out, iters = await run_cpu(fit_logreg_warm_rows, fm, rows, coef0, b0)
+            elif batcher is not None:
+                solver = "newton"
+                coef_out, intercept_out, iters = await batcher.fit_logreg(fm, rows, coef0, b0)
             else:
-                model = LogisticRegression(max_iter=500)
-                model.fit(X, y)
-                coef_out, intercept_out = model.coef_[0], float(model.intercept_[0])
+                solver = "lbfgs"
+                coef_out, intercept_out, iters = await run_cpu(fit_logreg_warm_rows, fm, rows, coef0, b0)
+            fit_ms = (time.perf_counter() - t0) * 1000.0
+            print(f"[{self.name}] {team}: {iters} iteracija ({solver}, {'warm' if warm else 'cold'} start), {fit_ms:.1f} ms")
 
-            share = ModelShare(team, coef_out, intercept_out)
+            share = ModelShare(team, coef_out, intercept_out, n_samples=len(rows))
 
             self.system.tell("aggregator_p2p", share)
 
-            self.system.tell(self.scheduler, WorkDone(self.name))
+            self.system.tell(self.scheduler, WorkDone(self.name, iterations=iters, fit_ms=fit_ms))
             self.system.tell(self.scheduler, GiveMeWork(self.name))
 
         elif isinstance(message, NoMoreWork):
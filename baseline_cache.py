@@ -0,0 +1,64 @@
+"""Centralized baseline (LogisticRegression on the whole training set), fitted once.
+
+The Evaluator compares every federated GlobalModel with a model trained
+centrally on the same data. That fit never changes within a run, so it is
+done once and persisted together with its test metrics:
+
+    storage/baseline/<train fingerprint>.json
+        model     coef, intercept, classes, lbfgs iterations
+        metrics   test fingerprint -> {"accuracy", "log_loss", "brier"}
+
+The fingerprints are feature_store.fingerprint() of the frame, the feature
+list and the fitted imputer's statistics, so restarts on the same data
+reuse the file and any change in data, features or imputation refits.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from feature_store import fingerprint
+
+ROOT = Path("storage/baseline")
+
+
+def data_key(df, features, imputer) -> str:
+    return fingerprint(df, features, imputer, np.float64)
+
+
+def model_to_dict(model) -> dict:
+    return {
+        "coef": np.asarray(model.coef_, dtype=float).tolist(),
+        "intercept": np.asarray(model.intercept_, dtype=float).tolist(),
+        "classes": np.asarray(model.classes_).tolist(),
+        "n_iter": int(np.max(getattr(model, "n_iter_", [0]))),
+    }
+
+
+def model_from_dict(d: dict) -> LogisticRegression:
+    model = LogisticRegression()
+    model.coef_ = np.asarray(d["coef"], dtype=float)
+    model.intercept_ = np.asarray(d["intercept"], dtype=float)
+    model.classes_ = np.asarray(d["classes"])
+    return model
+
+
+def load(key: str, root=ROOT) -> dict:
+    """The cached entry for a training fingerprint ({} when there is none or it is unreadable)."""
+    try:
+        entry = json.loads((Path(root) / f"{key}.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return entry if entry.get("fingerprint") == key else {}
+
+
+def save(key: str, entry: dict, root=ROOT):
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / f"{key}.json"
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({**entry, "fingerprint": key}, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
@@ -1,11 +1,17 @@
 import os
+import sys
 import time
 import json
+import asyncio
+import contextlib
+import io
 import sqlite3
 import subprocess
 import signal
 from pathlib import Path
 
+import numpy as np
+
 DB_PATH = Path("storage/results.db")
 
 
@@ -93,17 +99,680 @@ def bench_gossip(python):
         _kill(reporter)
 
 
+def _percentiles(samples_sec):
+    arr = np.asarray(samples_sec, dtype=float) * 1000.0
+    return {"p50_ms": float(np.percentile(arr, 50)), "p99_ms": float(np.percentile(arr, 99))}
+
+
+async def _legacy_send(host, port, envelope):
+    # stara TCP putanja: nova konekcija + jedna JSON linija po poruci
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps(envelope) + "\n").encode("utf-8"))
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def _bench_transport(n_msgs):
+    from actor.actor_system import ActorSystem, Actor
+    from actor.crdt import LwwGet
+
+    class Sink(Actor):
+        def __init__(self, name, system):
+            super().__init__(name, system)
+            self.recv = {}
+
+        async def default_behavior(self, message):
+            self.recv[message.key] = time.perf_counter()
+
+    recv = ActorSystem(host="127.0.0.1", port=0)
+    await recv.start_network()
+    sender = ActorSystem(host="127.0.0.1", port=0)
+    sender.register_peer("sink", recv.host, recv.port)
+
+    async def run(label, send_one):
+        sink = recv.create_actor(f"sink_{label}", lambda n, s: Sink(n, s))
+        sent = {}
+        t0 = time.perf_counter()
+        for i in range(n_msgs):
+            key = str(i)
+            sent[key] = time.perf_counter()
+            send_one(f"sink_{label}", key)
+            if i % 200 == 0:
+                await asyncio.sleep(0)
+        while len(sink.recv) < n_msgs and time.perf_counter() - t0 < 60:
+            await asyncio.sleep(0.005)
+        # trajanje do poslednje isporučene poruke (ne do isteka timeout-a)
+        dur = (max(sink.recv.values()) if sink.recv else time.perf_counter()) - t0
+        recv.stop_actor(f"sink_{label}")
+        lat = [sink.recv[k] - sent[k] for k in sink.recv]
+        return {"msgs_per_sec": len(sink.recv) / dur, "delivered": len(sink.recv), **_percentiles(lat)}
+
+    def legacy(target, key):
+        env = sender._serialize(target, LwwGet(key))
+        asyncio.create_task(_legacy_send(recv.host, recv.port, env))
+
+    def pooled(target, key):
+        sender.register_peer(target, recv.host, recv.port)
+        sender.tell(target, LwwGet(key))
+
+    out = {"legacy_conn_per_msg": await run("legacy", legacy), "pooled_framed": await run("pooled", pooled)}
+    await sender.stop_network()
+    await recv.stop_network()
+    return out
+
+
+def bench_transport(python, n_msgs=2000):
+    return asyncio.run(_bench_transport(n_msgs))
+
+
+def _codec_samples():
+    from actor.p2p import ModelShare, StartRound, PeerList, PeerReady
+    from actor.aggregator import TrainRequest, AllDone, RoundComplete, SetGlobalModel, SetClusterModels, SetTeamClusters
+    from actor.scheduler import GiveMeWork, AssignTeam, NoMoreWork, RegisterWorker, WorkDone
+    from actor.evaluator import EvalRequest, EvalReport
+    from actor.crdt import LwwPut, LwwGet, LwwDump, CrdtMerge, Replicate, Attach, AddPeer
+    from actor.health import HealthPing, HealthAck, CrashMe
+
+    coef = np.array([0.1, -0.2, 0.3, -0.4])
+    return [
+        ModelShare("MIA", coef, 0.5, version=3, ts_ms=1), TrainRequest(), StartRound(),
+        GiveMeWork("worker_BOS_0"), AssignTeam("MIA"), NoMoreWork(), RegisterWorker("worker_BOS_0", "127.0.0.1", 5001),
+        WorkDone("worker_BOS_0"), AllDone(), RoundComplete(1, 3, 0.01), SetGlobalModel(coef.reshape(1, -1), 0.5),
+        SetClusterModels({0: {"coef": coef.reshape(1, -1), "intercept": 0.1}, 1: {"coef": coef.reshape(1, -1), "intercept": 0.2}}),
+        SetTeamClusters({"MIA": 0, "BOS": 1}), PeerList(["p2p_BOS"], True, "p2p_MIA", 2), PeerReady("p2p_BOS"),
+        EvalRequest(None, 7, None, 1), EvalReport([{"a": "MIA", "b": "BOS"}]), LwwPut("leader", "MIA", 1), LwwGet("leader"),
+        LwwDump(), CrdtMerge({"k": {"value": 1, "ts": 1}}), Replicate({"k": {"value": 1, "ts": 1}}), Attach("lww_MIA"),
+        AddPeer("lww_BOS", "127.0.0.1", 5001), HealthPing("health"), HealthAck("worker_BOS_0"), CrashMe(),
+    ]
+
+
+def bench_codec(python, repeat=2000):
+    from actor.actor_system import ActorSystem
+
+    class NullSystem(ActorSystem):
+        def tell(self, actor_name, message):
+            pass
+
+    system = NullSystem()
+    out = {}
+    for msg in _codec_samples():
+        env = system._serialize("target", msg)
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            system._serialize("target", msg)
+        t_enc = (time.perf_counter() - t0) / repeat
+
+        async def decode_loop():
+            t = time.perf_counter()
+            for _ in range(repeat):
+                await system._handle_envelope(env)
+            return (time.perf_counter() - t) / repeat
+        t_dec = asyncio.run(decode_loop())
+        out[env["type"]] = {"encode_us": t_enc * 1e6, "decode_us": t_dec * 1e6}
+    out["_mean"] = {k: float(np.mean([v[k] for v in out.values()])) for k in ("encode_us", "decode_us")}
+    return out
+
+
+def _team_datasets(n_teams=30, rows=2400, seed=0):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n_teams):
+        X = rng.normal(size=(rows, 4))
+        y = (X @ np.array([1.0, 2.0, -1.0, -2.0]) + rng.normal(size=rows) > 0).astype(float)
+        out.append((X, y))
+    return out
+
+
+async def _bench_fit(kind, workers, datasets):
+    from actor import compute
+    compute.configure_executor(kind, workers)
+    await compute.run_cpu(compute.fit_logreg, *datasets[0])  # imports / pool start-up
+    lags = []
+    done = False
+
+    async def ticker():
+        # event loop responsiveness while the fits run
+        while not done:
+            t = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - t - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(compute.run_cpu(compute.fit_logreg, X, y) for X, y in datasets))
+    dur = time.perf_counter() - t0
+    done = True
+    await tick
+    compute.shutdown_executor()
+    return {"teams_per_sec": len(datasets) / dur, "sec": dur, "max_loop_lag_ms": max(lags or [0.0]) * 1000.0}
+
+
+def bench_fit(python, n_teams=30):
+    workers = os.cpu_count() or 1
+    datasets = _team_datasets(n_teams)
+    out = {"cpus": workers, "teams": n_teams}
+    for kind in ("inline", "thread", "process"):
+        out[kind] = asyncio.run(_bench_fit(kind, workers, datasets))
+    return out
+
+
+def _games_frame(seasons=25, games_per_season=1230, n_teams=30, seed=0):
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    n = seasons * games_per_season
+    names = np.array([f"T{i:02d}" for i in range(n_teams)])
+    home = rng.integers(0, n_teams, n)
+    away = (home + rng.integers(1, n_teams, n)) % n_teams
+    df = pd.DataFrame({"home_team": names[home], "away_team": names[away], "season": np.repeat(np.arange(seasons), games_per_season)})
+    for c in ("ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"):
+        df[c] = rng.uniform(0.3, 0.9, n)
+    return df[df["season"] < seasons - 1]
+
+
+def bench_team_index(python, repeat=3):
+    import team_index as ti
+    train = _games_frame()
+    teams = sorted(set(train["home_team"]))
+
+    def per_assignment(slice_fn):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for t in teams:
+                slice_fn(t)
+        return (time.perf_counter() - t0) / (repeat * len(teams)) * 1e6
+
+    mask_us = per_assignment(lambda t: train[(train["home_team"] == t) | (train["away_team"] == t)])
+    t0 = time.perf_counter()
+    ti.team_index(train)
+    build_ms = (time.perf_counter() - t0) * 1000.0
+    index_us = per_assignment(lambda t: ti.team_frame(train, t))
+    return {"rows": len(train), "teams": len(teams), "mask_us": mask_us, "index_us": index_us, "build_ms": build_ms}
+
+
+def bench_features(python, repeat=3):
+    import pickle
+    import tempfile
+    from sklearn.impute import SimpleImputer
+    import feature_store
+    import team_index as ti
+
+    features = ["ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"]
+    train = _games_frame()
+    train["home_win"] = (train["fg_pct_home"] > train["fg_pct_away"]).astype(int)
+    imputer = SimpleImputer(strategy="mean").fit(train[features])
+    teams = sorted(set(train["home_team"]))
+    index = ti.team_index(train)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in teams:
+            data = ti.team_frame(train, t)
+            X, y = imputer.transform(data[features]), data["home_win"].to_numpy()
+    transform_us = (time.perf_counter() - t0) / (repeat * len(teams)) * 1e6
+    task_bytes_before = len(pickle.dumps((X, y)))
+
+    with tempfile.TemporaryDirectory() as root:
+        t0 = time.perf_counter()
+        fm = feature_store.build_feature_matrix(train, features, imputer, "train", root=root)
+        build_ms = (time.perf_counter() - t0) * 1000.0
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for t in teams:
+                rows = index.rows(t)
+                X, y = fm.take(rows)
+        take_us = (time.perf_counter() - t0) / (repeat * len(teams)) * 1e6
+        task_bytes_after = len(pickle.dumps((fm, rows)))
+        matrix_mb = fm.X.nbytes / 1e6
+    return {"transform_us": transform_us, "mmap_take_us": take_us, "build_ms": build_ms,
+            "task_bytes_before": task_bytes_before, "task_bytes_after": task_bytes_after, "matrix_mb": matrix_mb}
+
+
+def bench_fedprox(python, mu=0.1):
+    # local FedProx fits on per-team partitions: fixed 120-epoch GD (old worker loop) vs Newton to tol
+    from sklearn.impute import SimpleImputer
+    from actor import compute
+    import team_index as ti
+
+    features = ["ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"]
+    train = _games_frame()
+    train["home_win"] = (train["fg_pct_home"] - train["fg_pct_away"] + np.random.default_rng(1).normal(0, 0.1, len(train)) > 0).astype(int)
+    X_all = SimpleImputer(strategy="mean").fit_transform(train[features])
+    y_all = train["home_win"].to_numpy(dtype=float)
+    index = ti.team_index(train)
+    w_global, b_global = compute.fit_logreg(X_all, y_all)
+    parts = [(X_all[index.rows(t)], y_all[index.rows(t)]) for t in index.teams]
+
+    def run(fit):
+        t0 = time.perf_counter()
+        out = [fit(X, y) for X, y in parts]
+        return (time.perf_counter() - t0) / len(parts) * 1000.0, out
+
+    def grad_norm(X, y, w, b):
+        diff = compute._sigmoid(X @ w + b) - y
+        g = np.append(X.T @ diff / len(y) + mu * (w - w_global), diff.mean() + mu * (b - b_global))
+        return float(np.max(np.abs(g)))
+
+    gd_ms, gd = run(lambda X, y: compute.fit_fedprox(X, y, mu, w_global, b_global, epochs=120, lr=0.1))
+    nt_ms, nt = run(lambda X, y: compute.fit_fedprox_newton(X, y, mu, w_global, b_global))
+    return {
+        "teams": len(parts), "rows_per_team": int(np.mean([len(y) for _, y in parts])), "mu": mu,
+        "gd_ms_per_fit": gd_ms, "gd_iters": 120,
+        "gd_grad_norm": float(np.median([grad_norm(X, y, *r) for (X, y), r in zip(parts, gd)])),
+        "newton_ms_per_fit": nt_ms, "newton_iters_mean": float(np.mean([r[2] for r in nt])),
+        "newton_grad_norm": float(np.median([grad_norm(X, y, r[0], r[1]) for (X, y), r in zip(parts, nt)])),
+    }
+
+
+def bench_fit_batch(python, sizes=(30, 1000), rows=600, mu=0.1):
+    # teams/s for per-team fits in a Python loop vs one batched (segmented) Newton fit
+    from actor import compute
+    from feature_store import FeatureMatrix
+
+    out = {"rows_per_team": rows, "mu": mu}
+    for n_teams in sizes:
+        datasets = _team_datasets(n_teams, rows=rows)
+        X = np.concatenate([X for X, _ in datasets])
+        y = np.concatenate([y for _, y in datasets])
+        counts = [len(y) for _, y in datasets]
+        w_global, b_global = np.array([0.5, 1.0, -0.5, -1.0]), 0.0
+
+        def teams_per_sec(fn):
+            t0 = time.perf_counter()
+            fn()
+            return n_teams / (time.perf_counter() - t0)
+
+        res = {
+            "gd120_loop": teams_per_sec(lambda: [compute.fit_fedprox(X, y, mu, w_global, b_global, epochs=120) for X, y in datasets]),
+            "newton_loop": teams_per_sec(lambda: [compute.fit_fedprox_newton(X, y, mu, w_global, b_global) for X, y in datasets]),
+            "newton_batch": teams_per_sec(lambda: compute.fit_fedprox_batch(X, y, counts, mu, w_global, b_global)),
+        }
+
+        async def via_batcher():
+            compute.configure_executor("inline")
+            compute.configure_fit_batching(1.0, max_teams=n_teams)
+            fm = FeatureMatrix(X, y, ["f0", "f1", "f2", "f3"])
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            t0 = time.perf_counter()
+            await asyncio.gather(*(compute.get_fit_batcher().fit(fm, np.arange(offsets[i], offsets[i + 1]), mu, w_global, b_global)
+                                   for i in range(n_teams)))
+            dur = time.perf_counter() - t0
+            compute.configure_fit_batching(0)
+            return n_teams / dur
+
+        res["batcher_concurrent_actors"] = asyncio.run(via_batcher())
+        out[str(n_teams)] = res
+    return out
+
+
+def bench_warm_start(python, rounds=3, n_teams=30, rows=2400):
+    # FedAvg rounds over per-team fits: every round cold vs warm-started from the previous global model
+    from actor import compute
+    datasets = _team_datasets(n_teams, rows=rows)
+    compute.fit_logreg_warm(*datasets[0])  # sklearn import
+    out = {"teams": n_teams, "rows_per_team": rows}
+    for solver in ("lbfgs", "newton"):
+        for mode in ("cold", "warm"):
+            coef0 = b0 = None
+            per_round = []
+            for _ in range(rounds):
+                t0 = time.perf_counter()
+                fits = []
+                for X, y in datasets:
+                    if solver == "lbfgs":
+                        fits.append(compute.fit_logreg_warm(X, y, coef0, b0))
+                    else:
+                        W, b, it = compute.fit_fedprox_batch(X, y, [len(y)], 0.0, coef0, b0, l2=1.0 / len(y))
+                        fits.append((W[0], float(b[0]), int(it[0])))
+                per_round.append({"ms": (time.perf_counter() - t0) * 1000.0, "iters_mean": float(np.mean([f[2] for f in fits]))})
+                if mode == "warm":
+                    coef0 = np.mean([f[0] for f in fits], axis=0)
+                    b0 = float(np.mean([f[1] for f in fits]))
+            out[f"{solver}_{mode}"] = per_round
+    return out
+
+
+def bench_aggregate(python, sizes=(10_000, 100_000), d=4, clusters=8):
+    # per-cluster aggregation of one window: dict of lists + np.mean per cluster vs actor.aggregation
+    from actor.aggregation import aggregate, ClusterAccumulator
+    rng = np.random.default_rng(0)
+    out = {"d": d, "clusters": clusters}
+    for n in sizes:
+        coefs = rng.normal(size=(n, d))
+        intercepts = rng.normal(size=n)
+        ids = rng.integers(0, clusters, n)
+        weights = rng.integers(50, 400, n).astype(float)
+        res = {}
+
+        t0 = time.perf_counter()
+        lists = {}
+        for c, b, k in zip(coefs, intercepts, ids):
+            lists.setdefault(int(k), []).append((c.reshape(1, -1), float(b)))
+        for items in lists.values():
+            np.mean([c for c, _ in items], axis=0), float(np.mean([b for _, b in items]))
+        res["lists_mean_ms"] = (time.perf_counter() - t0) * 1000.0
+
+        theta = np.column_stack([coefs, intercepts])
+        for strategy in ("mean", "weighted", "trimmed", "median"):
+            t0 = time.perf_counter()
+            aggregate(theta, ids, weights, strategy=strategy, trim=0.1)
+            res[f"engine_{strategy}_ms"] = (time.perf_counter() - t0) * 1000.0
+        # what the actor pays: one add() per arriving share, then finalize()
+        for strategy in ("mean", "median"):
+            acc = ClusterAccumulator(strategy)
+            t0 = time.perf_counter()
+            for c, b, k, w in zip(coefs, intercepts, ids.tolist(), weights):
+                acc.add(k, c, b, w)
+            t1 = time.perf_counter()
+            acc.finalize()
+            res[f"stream_{strategy}_add_us"] = (t1 - t0) * 1e6 / n
+            res[f"stream_{strategy}_finalize_ms"] = (time.perf_counter() - t1) * 1000.0
+        out[str(n)] = res
+    return out
+
+
+def bench_evaluator(python, models=5):
+    # ms per GlobalModel in the Evaluator: baseline refit every time (old) vs cached in memory / on disk
+    import tempfile
+    from sklearn.impute import SimpleImputer
+    from actor import compute
+    from actor.aggregator import GlobalModel
+    from actor.evaluator import Evaluator
+    import baseline_cache
+
+    class _Sink:
+        def tell(self, *_):
+            pass
+
+    features = ["ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"]
+    df = _games_frame()
+    df["home_win"] = (df["fg_pct_home"] > df["fg_pct_away"]).astype(int)
+    train, test = df[df["season"] < 20], df[df["season"] >= 20]
+    imputer = SimpleImputer(strategy="mean").fit(train[features])
+    compute.configure_executor("inline")
+    msg = GlobalModel(np.zeros((1, len(features))), 0.0)
+    out = {"train_rows": len(train), "test_rows": len(test)}
+
+    async def per_model(ev, n):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await ev.default_behavior(msg)
+        return (time.perf_counter() - t0) * 1000.0 / n
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp), contextlib.redirect_stdout(io.StringIO()):
+        def make():
+            return Evaluator("evaluator", _Sink(), features, imputer, test, train_data=train,
+                             persist_path=os.path.join(tmp, "gm.json"), baseline_root=os.path.join(tmp, "baseline"))
+
+        async def run():
+            # old behaviour: cache defeated, every model refits the baseline
+            ev = make()
+            t0 = time.perf_counter()
+            for _ in range(models):
+                ev._baseline = ev._baseline_metrics = None
+                for f in os.listdir(ev.baseline_root) if os.path.isdir(ev.baseline_root) else []:
+                    os.remove(os.path.join(ev.baseline_root, f))
+                await ev.default_behavior(msg)
+            out["refit_ms"] = (time.perf_counter() - t0) * 1000.0 / models
+            out["first_ms"] = await per_model(make(), 1)  # fresh actor, model and metrics from disk
+            ev = make()
+            await ev.default_behavior(msg)
+            out["cached_ms"] = await per_model(ev, models)
+            t0 = time.perf_counter()
+            baseline_cache.data_key(train, features, imputer)
+            out["fingerprint_ms"] = (time.perf_counter() - t0) * 1000.0
+
+        asyncio.run(run())
+    return out
+
+
+def bench_ratings(python, repeat=5):
+    # team ratings for one EvalRequest: per-team impute + predict_proba loop (old) vs one scoring pass, and cached
+    from sklearn.impute import SimpleImputer
+    from actor import compute
+    from actor.evaluator import Evaluator
+    import team_index as ti
+
+    features = ["ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"]
+    train = _games_frame()
+    train["home_win"] = (train["fg_pct_home"] > train["fg_pct_away"]).astype(int)
+    imputer = SimpleImputer(strategy="mean").fit(train[features])
+    ev = Evaluator("evaluator", None, features, imputer, train, train_data=train, matchups_root=None)
+    model = compute.fit_logreg_model(imputer.transform(train[features]), train["home_win"].to_numpy())
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in sorted(set(train["home_team"]) | set(train["away_team"])):
+            home, away = ti.team_frame(train, t, "home"), ti.team_frame(train, t, "away")
+            ph = model.predict_proba(imputer.transform(home[features]))[:, 1]
+            pa = model.predict_proba(imputer.transform(away[features]))[:, 1]
+            (np.mean(ph) + (1.0 - np.mean(pa))) / 2.0
+    loop_ms = (time.perf_counter() - t0) * 1000.0 / repeat
+    ev._team_ratings(model)  # feature matrix + team index built once
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        ev._matchups_by_version.clear()
+        ev._team_ratings(model)
+    vector_ms = (time.perf_counter() - t0) * 1000.0 / repeat
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        ev._team_ratings(model)
+    cached_ms = (time.perf_counter() - t0) * 1000.0 / repeat
+    return {"rows": len(train), "loop_ms": loop_ms, "vectorized_ms": vector_ms, "cached_ms": cached_ms}
+
+
+def bench_playoffs(python, n_sims=1_000_000, legacy=2000):
+    # brackets/s: the single game-by-game bracket of _simulate_playoffs vs the vectorized Monte Carlo engine
+    from sklearn.impute import SimpleImputer
+    from actor import compute
+    from actor.evaluator import Evaluator
+    from actor.playoffs import exact_odds, playoff_odds, seeded_pairs
+
+    features = ["ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"]
+    train = _games_frame()
+    train["home_win"] = (train["fg_pct_home"] > train["fg_pct_away"]).astype(int)
+    imputer = SimpleImputer(strategy="mean").fit(train[features])
+    ev = Evaluator("evaluator", None, features, imputer, train, train_data=train, matchups_root=None)
+    model = compute.fit_logreg_model(imputer.transform(train[features]), train["home_win"].to_numpy())
+    matchups = ev._matchups(model)  # cached: both sides time only the brackets
+    ratings = matchups.ratings
+
+    t0 = time.perf_counter()
+    for _ in range(legacy):
+        ev._simulate_playoffs(model=model)
+    legacy_rate = legacy / (time.perf_counter() - t0)
+    teams = matchups.teams
+    S, pairs = matchups.series_matrix(7), seeded_pairs(ratings)
+    odds = playoff_odds(S, teams, pairs, n_sims=n_sims, seed=0)
+    exact_odds(S, teams, pairs)
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        exact = exact_odds(S, teams, pairs)
+    exact_us = (time.perf_counter() - t0) * 1000.0
+    top = max(odds["title"].items(), key=lambda x: x[1])
+    max_err = max(abs(odds["advance"][t][s] - exact["advance"][t][s]) for t in exact["advance"] for s in exact["stages"])
+    return {"legacy_brackets_per_sec": legacy_rate, "mc_brackets_per_sec": odds["brackets_per_sec"],
+            "n_sims": n_sims, "exact_us": exact_us, "mc_max_abs_err": max_err,
+            "favourite": top[0], "favourite_title_p": top[1], "favourite_title_exact": exact["title"][top[0]]}
+
+
+def bench_matchups(python, n_queries=10_000):
+    # hypothetical "A vs B" series odds: building the matrix once, then LRU queries and vectorized lookups
+    from actor.matchups import MatchupMatrix
+    rng = np.random.default_rng(0)
+    teams = [f"T{i:02d}" for i in range(30)]
+    h, a = rng.uniform(0.45, 0.7, 30), rng.uniform(0.3, 0.55, 30)
+    idx = rng.integers(0, 30, size=(n_queries, 2))
+    pairs = [(teams[i], teams[j]) for i, j in idx if i != j]
+
+    t0 = time.perf_counter()
+    m = MatchupMatrix(teams, h, a)
+    m.series_matrix(7)
+    build_ms = (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    for x, y in pairs:
+        m.query(x, y, 7)
+    first_us = (time.perf_counter() - t0) * 1e6 / len(pairs)  # 870 distinct pairs: mostly LRU hits after the first pass
+    t0 = time.perf_counter()
+    for x, y in pairs:
+        m.query(x, y, 7)
+    hot_us = (time.perf_counter() - t0) * 1e6 / len(pairs)
+    t0 = time.perf_counter()
+    m.query_many(pairs, 7)
+    many_us = (time.perf_counter() - t0) * 1e6 / len(pairs)
+    return {"queries": len(pairs), "build_ms": build_ms, "query_first_pass_us": first_us,
+            "query_lru_hit_us": hot_us, "query_many_us": many_us}
+
+
+def bench_results_db(python, evaluations=300, series=15):
+    # per evaluation: one results row + a bracket of playoff rows. Old: connect, CREATE/probe, row-by-row
+    # inserts, commit on the caller; new: ResultsWriter.put() and a background WAL writer
+    import tempfile
+    from actor.results_db import ResultsWriter, _SCHEMA
+
+    result = ("2026-01-01T00:00:00Z", 1, "[0.1, 0.2]", 0.0, 0.6, 0.65, 0.22, 0.61, 0.64, 0.21)
+    bracket = [(1, "A", "B", 7, 4, 2, "A", "QF", 0.6)] * series
+    out = {"evaluations": evaluations, "rows_per_eval": 1 + series}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "old.db")
+        t0 = time.perf_counter()
+        for _ in range(evaluations):
+            conn = sqlite3.connect(path)
+            conn.execute(_SCHEMA[0])
+            conn.execute("INSERT INTO results (timestamp, round_idx, coef, intercept, acc, log_loss, brier, base_acc, base_log_loss, base_brier) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", result)
+            conn.commit()
+            conn.close()
+            conn = sqlite3.connect(path)
+            conn.execute(_SCHEMA[1])
+            conn.execute("SELECT stage FROM playoffs LIMIT 1")
+            for row in bracket:
+                conn.execute("INSERT INTO playoffs(round_idx, team_a, team_b, best_of, wins_a, wins_b, winner, stage, p_a_win) "
+                             "VALUES(?,?,?,?,?,?,?,?,?)", row)
+            conn.commit()
+            conn.close()
+        out["old_blocking_ms_per_eval"] = (time.perf_counter() - t0) * 1000.0 / evaluations
+
+        w = ResultsWriter(os.path.join(tmp, "new.db"))
+        t0 = time.perf_counter()
+        for _ in range(evaluations):
+            w.put("results", [result])
+            w.put("playoffs", bracket)
+        t1 = time.perf_counter()
+        w.flush()
+        t2 = time.perf_counter()
+        out["writer_blocking_ms_per_eval"] = (t1 - t0) * 1000.0 / evaluations
+        out["writer_total_ms_per_eval"] = (t2 - t0) * 1000.0 / evaluations
+        out["writer_batches"] = w.batches
+        w.close()
+    return out
+
+
+def _synthetic_clean_csv(path, n=65000, seed=0):
+    # same shape as create_clean_csv.py output (all 25 columns), roughly the size of the real file
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    names = np.array(["ATL", "BOS", "BKN", "CHA", "CHI", "CLE", "DAL", "DEN", "DET", "GSW", "HOU", "IND", "LAC", "LAL", "MEM",
+                      "MIA", "MIL", "MIN", "NOP", "NYK", "OKC", "ORL", "PHI", "PHX", "POR", "SAC", "SAS", "TOR", "UTA", "WAS"])
+    home = rng.integers(0, 30, n)
+    away = (home + rng.integers(1, 30, n)) % 30
+    df = pd.DataFrame({
+        "season": 21990 + np.arange(n) * 33 // n,
+        "date": pd.Timestamp("1990-11-01") + pd.to_timedelta(np.arange(n) * 6, unit="h"),
+        "home_team": names[home], "away_team": names[away],
+        "home_points": rng.integers(80, 140, n), "away_points": rng.integers(80, 140, n),
+    })
+    for side in ("home", "away"):
+        for c in ("fg_pct", "fg3_pct", "ft_pct"):
+            df[f"{c}_{side}"] = np.round(rng.uniform(0.3, 0.9, n), 3)
+        for c in ("reb", "ast", "stl", "blk", "tov", "pf"):
+            df[f"{c}_{side}"] = rng.integers(0, 60, n)
+    df["home_win"] = (df["home_points"] > df["away_points"]).astype(int)
+    df.to_csv(path, index=False)
+
+
+def _time_to_ready(python, csv, nodes, extra, base_port):
+    procs = [(time.perf_counter(), _spawn([python, "main.py", "--mode", "p2p-gossip", "--node", f"N{i}", "--host", "127.0.0.1",
+                                           "--port", str(base_port + i), "--dataset", str(csv), "--executor", "inline"] + extra))
+             for i in range(nodes)]
+    wall, load = [], []
+    try:
+        for t0, p in procs:
+            for raw in p.stdout:
+                if raw.startswith(b"[Main] ready"):
+                    wall.append(time.perf_counter() - t0)
+                    # "[Main] ready in 0.123s ..." = from main() entry, i.e. without interpreter/import time
+                    load.append(float(raw.split()[3].rstrip(b"s")))
+                    break
+            else:
+                wall.append(float("nan"))
+                load.append(float("nan"))
+    finally:
+        for _, p in procs:
+            _kill(p)
+    return {"wall_sec": wall, "ready_after_imports_sec": load}
+
+
+def bench_startup(python, nodes=4):
+    import shutil
+    import dataset_cache
+    csv = Path("storage/bench_games.csv")
+    if not csv.exists():
+        _synthetic_clean_csv(csv)
+    shutil.rmtree(dataset_cache.cache_dir(csv), ignore_errors=True)
+    res = {"rows": sum(1 for _ in open(csv)) - 1, "nodes": nodes}
+    res["csv"] = _time_to_ready(python, csv, nodes, ["--no-dataset-cache"], 5430)
+    res["cache_cold"] = _time_to_ready(python, csv, 1, [], 5440)
+    res["cache_warm"] = _time_to_ready(python, csv, nodes, [], 5450)
+    for k in ("csv", "cache_warm"):
+        res[k]["mean_ready_after_imports_sec"] = float(np.mean(res[k]["ready_after_imports_sec"]))
+    return res
+
+
+SCENARIOS = {
+    "provider": ("provider_sec", bench_provider),
+    "p2p": ("p2p_sec", bench_p2p),
+    "gossip": ("gossip_sec", bench_gossip),
+    "transport": ("transport", bench_transport),
+    "codec": ("codec", bench_codec),
+    "fit": ("fit", bench_fit),
+    "team_index": ("team_index", bench_team_index),
+    "features": ("features", bench_features),
+    "startup": ("startup", bench_startup),
+    "fedprox": ("fedprox", bench_fedprox),
+    "fit_batch": ("fit_batch", bench_fit_batch),
+    "warm_start": ("warm_start", bench_warm_start),
+    "aggregate": ("aggregate", bench_aggregate),
+    "evaluator": ("evaluator", bench_evaluator),
+    "ratings": ("ratings", bench_ratings),
+    "playoffs": ("playoffs", bench_playoffs),
+    "matchups": ("matchups", bench_matchups),
+    "results_db": ("results_db", bench_results_db),
+}
+DEFAULT_SCENARIOS = ["provider", "p2p", "gossip"]
+
+
 def main():
     python = os.environ.get("PYTHON", str(Path(".venv")/"Scripts"/"python.exe" if os.name=="nt" else "python3"))
-    results = {}
-    print("[bench] provider...")
-    results["provider_sec"] = bench_provider(python)
-    print("[bench] p2p...")
-    results["p2p_sec"] = bench_p2p(python)
-    print("[bench] gossip...")
-    results["gossip_sec"] = bench_gossip(python)
+    selected = sys.argv[1:] or DEFAULT_SCENARIOS
+    unknown = [s for s in selected if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"[bench] nepoznat scenario: {unknown}; dostupni: {sorted(SCENARIOS)}")
 
     Path("storage").mkdir(exist_ok=True)
+    results = {}
+    if Path("storage/bench.json").exists():
+        try:
+            results = json.loads(Path("storage/bench.json").read_text(encoding="utf-8"))
+        except Exception:
+            results = {}
+    for name in selected:
+        key, fn = SCENARIOS[name]
+        print(f"[bench] {name}...")
+        results[key] = fn(python)
+        print(f"[bench] {name}: {results[key]}")
+
     with open("storage/bench.json", "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2)
     print("[bench] saved storage/bench.json:", results)
@@ -6,6 +6,8 @@ import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 
+from team_index import team_index
+
 
 def compute_team_clusters(
     train_df: pd.DataFrame,
@@ -16,25 +18,26 @@ def compute_team_clusters(
 ) -> Dict[str, int]:
     Path("storage").mkdir(exist_ok=True)
 
-    teams = sorted(set(train_df["home_team"]).union(set(train_df["away_team"])) )
+    index = team_index(train_df)
+    teams = index.teams
+    cols = {c: train_df[c].to_numpy(dtype=float) for c in ("ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away")}
+
+    def _mean_safe(values):
+        with np.errstate(all="ignore"):
+            return float(np.nanmean(values)) if np.any(~np.isnan(values)) else float("nan")
 
     vecs = []
     names = []
     for t in teams:
-        home = train_df[train_df["home_team"] == t]
-        away = train_df[train_df["away_team"] == t]
+        home = index.home(t)
+        away = index.away(t)
         # Build vector in the same order as training features
         # features are: [ft_pct_home, fg_pct_home, ft_pct_away, fg_pct_away]
-        def _mean_safe(series):
-            try:
-                return float(np.nanmean(series))
-            except Exception:
-                return float("nan")
         v = [
-            _mean_safe(home["ft_pct_home"]) if len(home) else 0.5,
-            _mean_safe(home["fg_pct_home"]) if len(home) else 0.5,
-            _mean_safe(away["ft_pct_away"]) if len(away) else 0.5,
-            _mean_safe(away["fg_pct_away"]) if len(away) else 0.5,
+            _mean_safe(cols["ft_pct_home"][home]) if len(home) else 0.5,
+            _mean_safe(cols["fg_pct_home"][home]) if len(home) else 0.5,
+            _mean_safe(cols["ft_pct_away"][away]) if len(away) else 0.5,
+            _mean_safe(cols["fg_pct_away"][away]) if len(away) else 0.5,
         ]
         names.append(t)
         vecs.append(v)
@@ -1,29 +1,182 @@
+"""Streaming ETL: dataset/csv/game.csv -> clean CSV + per-team binary partitions.
+
+One pass over the source in chunks (explicit dtypes, only the needed
+columns). For every chunk it computes home_win, appends the rows to
+dataset/nba_games_clean.csv and writes each team's games of that chunk as
+one uncompressed .npz part under dataset/teams_npz/<TEAM>/, one array per
+column. Nothing holds more than one chunk in memory, and the per-team
+split costs one groupby per chunk instead of a scan of the whole frame
+per team.
+
+--incremental only processes games newer than the watermark stored in
+dataset/etl_state.json (last game_date plus the game ids seen on that
+date), appending to the clean CSV and adding new parts; without the state
+file it falls back to a full rebuild.
+
+    python create_clean_csv.py [--incremental] [--chunksize 50000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-df = pd.read_csv("dataset/csv/game.csv")
+from team_index import TeamIndex
+
+SOURCE = "dataset/csv/game.csv"
+OUT_CSV = "dataset/nba_games_clean.csv"
+TEAMS_DIR = "dataset/teams_npz"
+STATE_NAME = "etl_state.json"  # next to the clean CSV
 
-df = df[[
-    "season_id", "game_date",
-    "team_abbreviation_home", "team_abbreviation_away",
-    "pts_home", "pts_away",
+STAT_COLUMNS = [
     "fg_pct_home", "fg3_pct_home", "ft_pct_home",
     "reb_home", "ast_home", "stl_home", "blk_home", "tov_home", "pf_home",
     "fg_pct_away", "fg3_pct_away", "ft_pct_away",
-    "reb_away", "ast_away", "stl_away", "blk_away", "tov_away", "pf_away"
-]]
-
-df["home_win"] = (df["pts_home"] > df["pts_away"]).astype(int)
-
-df = df.rename(columns={
+    "reb_away", "ast_away", "stl_away", "blk_away", "tov_away", "pf_away",
+]
+SOURCE_DTYPES = {
+    "game_id": "string",
+    "season_id": "int64",
+    "game_date": "string",
+    "team_abbreviation_home": "string",
+    "team_abbreviation_away": "string",
+    "pts_home": "float64",
+    "pts_away": "float64",
+    **{c: "float64" for c in STAT_COLUMNS},
+}
+RENAME = {
     "season_id": "season",
     "game_date": "date",
     "team_abbreviation_home": "home_team",
     "team_abbreviation_away": "away_team",
     "pts_home": "home_points",
-    "pts_away": "away_points"
-})
+    "pts_away": "away_points",
+}
+OUT_COLUMNS = ["season", "date", "home_team", "away_team", "home_points", "away_points"] + STAT_COLUMNS + ["home_win"]
+
+
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = chunk.copy()
+    chunk["home_win"] = (chunk["pts_home"] > chunk["pts_away"]).astype(int)
+    return chunk.rename(columns=RENAME)[OUT_COLUMNS]
+
+
+def _columns(df: pd.DataFrame) -> dict:
+    arrays = {}
+    for c in OUT_COLUMNS:
+        if c == "date":
+            arrays[c] = pd.to_datetime(df[c]).to_numpy(dtype="datetime64[s]")
+        elif c in ("home_team", "away_team"):
+            arrays[c] = df[c].to_numpy(dtype=str)
+        else:
+            arrays[c] = df[c].to_numpy()
+    return arrays
+
+
+def team_rows(clean: pd.DataFrame):
+    """Yield (team, ascending row positions) for every team in the chunk from one TeamIndex."""
+    index = TeamIndex(clean)
+    for team in index.teams:
+        yield team, index.rows(team)
+
+
+def write_team_parts(clean: pd.DataFrame, teams_dir: Path, part: str):
+    """Write each team's games of this chunk as teams_dir/<TEAM>/<part>.npz."""
+    for team, rows in team_rows(clean):
+        out = teams_dir / str(team)
+        out.mkdir(parents=True, exist_ok=True)
+        np.savez(out / f"{part}.npz", **_columns(clean.iloc[rows]))
+
+
+def load_team_partition(team: str, teams_dir=TEAMS_DIR) -> pd.DataFrame:
+    """All games of `team` from its .npz parts, in source order."""
+    parts = sorted(Path(teams_dir, team).glob("*.npz"))
+    frames = []
+    for p in parts:
+        with np.load(p) as z:
+            frames.append(pd.DataFrame({c: z[c] for c in z.files}))
+    if not frames:
+        return pd.DataFrame(columns=OUT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[OUT_COLUMNS]
+
+
+def _load_state(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def run(source=SOURCE, out_csv=OUT_CSV, teams_dir=TEAMS_DIR,
+        chunksize: int = 50000, incremental: bool = False) -> dict:
+    teams_dir = Path(teams_dir)
+    state_path = Path(out_csv).with_name(STATE_NAME)
+    state = _load_state(state_path) if incremental else None
+    if state is None or not Path(out_csv).exists():
+        incremental = False
+        state = {"last_date": None, "last_ids": [], "rows": 0, "runs": 0}
+        Path(out_csv).unlink(missing_ok=True)
+        shutil.rmtree(teams_dir, ignore_errors=True)
+    Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+
+    last_date = pd.Timestamp(state["last_date"]) if state["last_date"] else None
+    seen_last = set(state["last_ids"])
+    new_last_date, new_last_ids = last_date, set(seen_last)
+    run_id = state["runs"]
+    written = 0
+    header = not Path(out_csv).exists()
+
+    reader = pd.read_csv(source, usecols=list(SOURCE_DTYPES), dtype=SOURCE_DTYPES, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        dates = pd.to_datetime(chunk["game_date"])
+        if last_date is not None:
+            # watermark: strictly newer dates, plus unseen games on the last processed date
+            keep = (dates > last_date) | ((dates == last_date) & ~chunk["game_id"].isin(seen_last))
+            chunk, dates = chunk[keep.to_numpy()], dates[keep.to_numpy()]
+        if chunk.empty:
+            continue
+
+        clean = clean_chunk(chunk)
+        clean.to_csv(out_csv, mode="a", header=header, index=False)
+        header = False
+        write_team_parts(clean, teams_dir, f"part-{run_id:04d}-{i:05d}")
+        written += len(clean)
+
+        chunk_max = dates.max()
+        ids_at_max = set(chunk.loc[(dates == chunk_max).to_numpy(), "game_id"])
+        if new_last_date is None or chunk_max > new_last_date:
+            new_last_date, new_last_ids = chunk_max, ids_at_max
+        elif chunk_max == new_last_date:
+            new_last_ids |= ids_at_max
+
+    state = {
+        "last_date": new_last_date.isoformat() if new_last_date is not None else None,
+        "last_ids": sorted(new_last_ids),
+        "rows": int(state["rows"]) + written,
+        "runs": run_id + 1,
+    }
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, state_path)
+    return {"written": written, "incremental": incremental, **state}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Čišćenje game.csv i podela po timovima u jednom prolazu")
+    p.add_argument("--source", default=SOURCE)
+    p.add_argument("--out", default=OUT_CSV)
+    p.add_argument("--teams-dir", default=TEAMS_DIR)
+    p.add_argument("--chunksize", type=int, default=50000)
+    p.add_argument("--incremental", action="store_true", help="Dodaj samo mečeve posle poslednjeg obrađenog datuma")
+    return p.parse_args()
 
-print(df.head())
 
-df.to_csv("dataset/nba_games_clean.csv", index=False)
-print("Prošireni clean dataset sačuvan u dataset/nba_games_clean.csv")
+if __name__ == "__main__":
+    args = parse_args()
+    res = run(args.source, args.out, args.teams_dir, chunksize=args.chunksize, incremental=args.incremental)
+    mode = "inkrementalno dodato" if res["incremental"] else "napravljeno"
+    print(f"{mode} {res['written']} mečeva -> {args.out} (+ particije po timovima u {args.teams_dir}); ukupno {res['rows']}")
@@ -0,0 +1,122 @@
+"""Columnar on-disk cache of the cleaned games CSV for fast node startup.
+
+Parsing dataset/nba_games_clean.csv dominates the startup of every node.
+load_games() parses it once, keeps only the columns the pipeline uses and
+writes each of them as a compact .npy file:
+
+    storage/dataset_cache/<csv stem>/
+        meta.json            source fingerprint, row count, column dtypes
+        season.npy           int32
+        date.npy             datetime64[s]
+        home_team.npy        int16 codes  (team names in meta.json)
+        away_team.npy        int16 codes
+        home_win.npy         int8
+        ft_pct_home.npy ...  float64 (as parsed, so features match --no-dataset-cache)
+
+Later starts memory-map the columns (np.load(mmap_mode="r")) and build the
+DataFrame around them without copying; team columns come back as
+categoricals. The cache is rebuilt when the source fingerprint (resolved
+path, size, mtime) changes. Parquet/Feather would need pyarrow, which the
+project does not depend on; plain .npy files need nothing beyond numpy.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SOURCE = "dataset/nba_games_clean.csv"
+CACHE_ROOT = Path("storage/dataset_cache")
+FORMAT_VERSION = 2
+
+# column -> on-disk dtype ("team" = categorical codes)
+COLUMNS = {
+    "season": "int32",
+    "date": "datetime64[s]",
+    "home_team": "team",
+    "away_team": "team",
+    "home_win": "int8",
+    "ft_pct_home": "float64",
+    "fg_pct_home": "float64",
+    "ft_pct_away": "float64",
+    "fg_pct_away": "float64",
+}
+
+
+def fingerprint(source) -> dict:
+    st = os.stat(source)
+    return {"path": str(Path(source).resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "version": FORMAT_VERSION}
+
+
+def cache_dir(source, root=CACHE_ROOT) -> Path:
+    return Path(root) / Path(source).stem
+
+
+def build_cache(source=SOURCE, root=CACHE_ROOT) -> dict:
+    header = pd.read_csv(source, nrows=0).columns
+    usecols = [c for c in COLUMNS if c in header]
+    df = pd.read_csv(source, usecols=usecols)
+
+    out = cache_dir(source, root)
+    tmp = out.with_name(f"{out.name}.tmp{os.getpid()}")  # nodes starting together build side by side
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    meta = {"fingerprint": fingerprint(source), "rows": len(df), "columns": {}, "teams": []}
+    teams = None
+    if "home_team" in usecols and "away_team" in usecols:
+        teams = sorted(set(df["home_team"].dropna()) | set(df["away_team"].dropna()))
+        meta["teams"] = [str(t) for t in teams]
+    for col in usecols:
+        kind = COLUMNS[col]
+        if kind == "team":
+            arr = pd.Categorical(df[col], categories=teams).codes.astype(np.int16)
+        elif kind.startswith("datetime64"):
+            arr = pd.to_datetime(df[col]).to_numpy(dtype=kind)
+        else:
+            arr = df[col].to_numpy(dtype=kind)
+        np.save(tmp / f"{col}.npy", np.ascontiguousarray(arr))
+        meta["columns"][col] = kind
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    current = _read_meta(out)
+    if current is not None and current.get("fingerprint") == meta["fingerprint"]:
+        shutil.rmtree(tmp, ignore_errors=True)  # another node got there first
+        return current
+    shutil.rmtree(out, ignore_errors=True)
+    try:
+        os.replace(tmp, out)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return meta
+
+
+def _read_meta(path: Path):
+    try:
+        return json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def load_games(source=SOURCE, root=CACHE_ROOT, columns=None, rebuild: bool = False) -> pd.DataFrame:
+    """Cleaned games as a DataFrame backed by the memory-mapped cache (built on first use)."""
+    path = cache_dir(source, root)
+    meta = None if rebuild else _read_meta(path)
+    if meta is None or meta.get("fingerprint") != fingerprint(source):
+        built = build_cache(source, root)
+        # meta.json may be unreadable for a moment when another node wins the os.replace race
+        meta = _read_meta(path) or built
+
+    data = {}
+    for col, kind in meta["columns"].items():
+        if columns is not None and col not in columns:
+            continue
+        arr = np.load(path / f"{col}.npy", mmap_mode="r")
+        if kind == "team":
+            data[col] = pd.Categorical.from_codes(np.asarray(arr), categories=meta["teams"])
+        else:
+            data[col] = arr
+    return pd.DataFrame(data, copy=False)
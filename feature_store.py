@@ -0,0 +1,139 @@
+"""Pre-imputed feature matrices shared through memory-mapped .npy files.
+
+imputer.transform(df[features]) used to run on every worker assignment,
+gossip interval and evaluation. build_feature_matrix() runs it once per
+frame and writes
+
+    storage/features/<name>-<fp>_X.npy   contiguous float64 (or float32) matrix
+    storage/features/<name>-<fp>_y.npy   labels (int8)
+    storage/features/<name>-<fp>.json    fingerprint of the inputs
+
+where <fp> is the start of the input fingerprint. Rows are aligned with the
+frame's positions, so a team's games are fm.X[team_index(df).rows(team)].
+Files whose fingerprint matches are reused instead of re-imputed; nodes on
+one host with different inputs (--dataset) get different files, so they
+never overwrite each other's matrices. Everyone on the host opens the files with
+np.load(mmap_mode="r"), so the pages live once in the OS page cache no
+matter how many worker processes read them. A FeatureMatrix pickles as
+its path: passing one to actor.compute.run_cpu sends a few bytes and the
+pool process maps the same files.
+
+feature_matrix(df, ...) returns the matrix registered for df by main.py
+(cached per process for the lifetime of df), or imputes df in memory when
+nothing was registered (tests, ad-hoc frames).
+"""
+
+import hashlib
+import json
+import os
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path("storage/features")
+LABEL = "home_win"
+
+_cache = {}   # id(df) -> (weakref to df, FeatureMatrix)
+_opened = {}  # path prefix (includes the fingerprint) -> FeatureMatrix (one mapping per process)
+
+
+class FeatureMatrix:
+    def __init__(self, X: np.ndarray, y: np.ndarray | None, features: list[str], prefix: str | None = None):
+        self.X = X
+        self.y = y
+        self.features = list(features)
+        self.prefix = prefix  # None = in-memory only
+
+    def __len__(self):
+        return len(self.X)
+
+    def take(self, rows) -> tuple[np.ndarray, np.ndarray | None]:
+        return self.X[rows], (self.y[rows] if self.y is not None else None)
+
+    def __reduce__(self):
+        if self.prefix is None:
+            return (FeatureMatrix, (self.X, self.y, self.features, None))
+        return (open_feature_matrix, (self.prefix,))
+
+
+def fingerprint(df: pd.DataFrame, features: list[str], imputer, dtype) -> str:
+    h = hashlib.sha1()
+    h.update(json.dumps({"features": list(features), "rows": len(df), "dtype": np.dtype(dtype).str}).encode())
+    h.update(np.asarray(getattr(imputer, "statistics_", []), dtype=float).tobytes())
+    cols = list(features) + ([LABEL] if LABEL in df.columns else [])
+    h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _impute(df: pd.DataFrame, features: list[str], imputer, dtype):
+    X = np.ascontiguousarray(imputer.transform(df[features]), dtype=dtype)
+    y = df[LABEL].to_numpy(dtype=np.int8) if LABEL in df.columns else None
+    return X, y
+
+
+def _save_npy(path: Path, arr: np.ndarray):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def open_feature_matrix(prefix: str) -> FeatureMatrix:
+    fm = _opened.get(prefix)
+    if fm is None:
+        meta = json.loads(Path(prefix + ".json").read_text(encoding="utf-8"))
+        X = np.load(prefix + "_X.npy", mmap_mode="r")
+        y = np.load(prefix + "_y.npy", mmap_mode="r") if meta.get("has_y") else None
+        fm = FeatureMatrix(X, y, meta["features"], prefix)
+        _opened[prefix] = fm
+    return fm
+
+
+def build_feature_matrix(df: pd.DataFrame, features: list[str], imputer, name: str,
+                         root: str | Path = ROOT, float32: bool = False) -> FeatureMatrix:
+    """Impute df once, persist it under root/<name>-<fp>_*.npy and register it for df."""
+    dtype = np.float32 if float32 else np.float64
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    key = fingerprint(df, features, imputer, dtype)
+    prefix = str(root / f"{name}-{key[:16]}")
+    meta_path = Path(prefix + ".json")
+    try:
+        fresh = json.loads(meta_path.read_text(encoding="utf-8")).get("fingerprint") == key
+    except (OSError, ValueError):
+        fresh = False
+    if not fresh:
+        X, y = _impute(df, features, imputer, dtype)
+        _save_npy(Path(prefix + "_X.npy"), X)
+        if y is not None:
+            _save_npy(Path(prefix + "_y.npy"), y)
+        meta = {"fingerprint": key, "features": list(features), "rows": len(df), "dtype": np.dtype(dtype).name, "has_y": y is not None}
+        tmp = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        os.replace(tmp, meta_path)
+        _opened.pop(prefix, None)
+    fm = open_feature_matrix(prefix)
+    _register(df, fm)
+    return fm
+
+
+def _register(df: pd.DataFrame, fm: FeatureMatrix):
+    key = id(df)
+    _cache[key] = (weakref.ref(df, lambda _ref, key=key: _cache.pop(key, None)), fm)
+
+
+def forget(df: pd.DataFrame):
+    """Drop the matrix cached for df (after df was changed in place)."""
+    _cache.pop(id(df), None)
+
+
+def feature_matrix(df: pd.DataFrame, features: list[str], imputer) -> FeatureMatrix:
+    entry = _cache.get(id(df))
+    if entry is not None and entry[0]() is df and entry[1].features == list(features) and len(entry[1]) == len(df):
+        return entry[1]
+    X, y = _impute(df, features, imputer, np.float64)
+    fm = FeatureMatrix(X, y, features)
+    _register(df, fm)
+    return fm
@@ -3,6 +3,7 @@ import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score
 from sklearn.impute import SimpleImputer
+from team_index import team_frame
 
 df = pd.read_csv("dataset/nba_games_clean.csv")
 
@@ -29,7 +30,7 @@ intercepts = []
 
 teams = pd.unique(train[["home_team", "away_team"]].values.ravel("K"))
 for team in teams:
-    team_data = train[(train["home_team"] == team) | (train["away_team"] == team)]
+    team_data = team_frame(train, team)
     if len(team_data) < 50:
         continue
 
@@ -1,8 +1,10 @@
 import asyncio
 import argparse
+import time
 import pandas as pd
 from sklearn.impute import SimpleImputer
 from actor.actor_system import ActorSystem
+from actor.compute import configure_executor, configure_fit_batching, executor_info
 from actor.aggregator import Aggregator, TrainRequest, AggregatorP2P, TeamNode
 from actor.p2p import TeamNodeP2P, PeerList, StartRound
 from actor.evaluator import Evaluator
@@ -14,6 +16,9 @@ from actor.worker import TeamNodeWorker
 from actor.worker import TeamNodeWorker as _W
 import argparse
 from clustering import compute_team_clusters
+from team_index import team_frame
+from feature_store import build_feature_matrix
+from dataset_cache import SOURCE as DATASET_CSV, load_games
 
 
 def parse_args():
@@ -26,6 +31,20 @@ def parse_args():
     p.add_argument("--workers", type=int, default=2, help="Broj worker aktora po nodu")
     p.add_argument("--rounds", type=int, default=1, help="Broj rundi u P2P režimu")
     p.add_argument("--fedprox_mu", type=float, default=0.0, help="Proksimalni koeficijent (0=FedAvg)")
+    p.add_argument("--fedprox-solver", choices=["newton", "gd"], default="newton",
+                   help="Lokalni FedProx solver: newton (IRLS do konvergencije) ili gd (120 epoha gradijentnog spusta)")
+    p.add_argument("--fedprox-tol", type=float, default=1e-6, help="Newton: prag max-norme gradijenta za zaustavljanje")
+    p.add_argument("--fedprox-max-iter", type=int, default=50, help="Newton: max broj iteracija po fitu")
+    p.add_argument("--fit-batch-ms", type=float, default=0.0,
+                   help="Prozor (ms) u kom se fitovi svih aktora noda skupljaju u jedan vektorizovani Newton fit (0 = svaki fit posebno)")
+    p.add_argument("--fit-batch-max", type=int, default=256, help="Max broj timova u jednom batch fitu")
+    p.add_argument("--agg-strategy", choices=["mean", "weighted", "trimmed", "median"], default="mean",
+                   help="Agregacija lokalnih modela: mean (FedAvg), weighted (po n_samples), trimmed (trimmed mean), median (po koordinati)")
+    p.add_argument("--agg-trim", type=float, default=0.1, help="trimmed: udeo najmanjih i najvećih vrednosti koji se odbacuje sa svake strane")
+    p.add_argument("--playoff-mode", choices=["sample", "monte_carlo", "exact"], default="sample",
+                   help="Evaluacija plej-ofa: sample (jedan odigran bracket), monte_carlo (verovatnoće iz N bracket-a) ili exact (egzaktne verovatnoće, DP)")
+    p.add_argument("--playoff-sims", type=int, default=1_000_000, help="monte_carlo: broj simuliranih bracket-a")
+    p.add_argument("--playoff-seed", type=int, default=None, help="monte_carlo: seed (isti seed = isti rezultat)")
     p.add_argument("--async-fed", action="store_true", help="Asinhrono federisano učenje (bez barijere po rundama)")
     p.add_argument("--async-batch", type=int, default=8, help="Broj ModelShare ažuriranja po jednoj agregaciji u async modu")
     p.add_argument("--reporter", action="store_true", help="Samo za p2p-gossip: ovaj nod šalje GlobalModel evaluatoru")
@@ -42,17 +61,45 @@ def parse_args():
     p.add_argument("--gossip-eval-on-stop", action="store_true", help="Pokreni playoff evaluaciju prilikom zaustavljanja async gossip-a")
     p.add_argument("--gossip-converge-eps", type=float, default=0.0, help="Epsilon prag konvergencije (L2 delta koef. + |delta intercept|) za async gossip")
     p.add_argument("--gossip-converge-patience", type=int, default=3, help="Broj uzastopnih flush-eva ispod eps pre stop-a")
+    p.add_argument("--gossip-resend-every", type=int, default=5,
+                   help="Async gossip: ceo share svim peer-ovima svakih N intervala, i kad je model nepromenjen (0 = samo heartbeat)")
     p.add_argument("--transport", choices=["tcp", "grpc"], default="tcp", help="Transport sloj: tcp (default) ili grpc (opciono)")
+    p.add_argument("--grpc-keepalive-ms", type=int, default=30000, help="gRPC keepalive ping interval u ms (0 = isključeno)")
+    p.add_argument("--grpc-compression", choices=["none", "gzip", "deflate"], default="none", help="Kompresija gRPC poruka")
+    p.add_argument("--wire-codec", choices=["binary", "json"], default="binary", help="TCP kodek tela poruke: binary (sirovi numpy baferi) ili json (za debug); pregovara se po peer-u")
+    p.add_argument("--wire-float32", action="store_true", help="U binary kodeku šalji koeficijente kao float32")
+    p.add_argument("--batch-max", type=int, default=256, help="Max broj poruka u jednom batch-u ka istom peer-u")
+    p.add_argument("--batch-delay-ms", type=float, default=2.0, help="Max čekanje (ms) na dodatne poruke pre slanja batch-a (0 = šalji odmah)")
+    p.add_argument("--mailbox-capacity", type=int, default=0, help="Kapacitet sanduceta svakog aktora (0 = neograničeno)")
+    p.add_argument("--mailbox-policy", choices=["block", "drop_oldest", "drop_newest", "coalesce"], default="block",
+                   help="Šta kad je sanduče puno: block (backpressure), drop_oldest, drop_newest, coalesce (najnoviji ModelShare po pošiljaocu)")
+    p.add_argument("--executor", choices=["process", "thread", "inline"], default="process",
+                   help="Gde se izvršava treniranje/skorovanje: process pool (podrazumevano), thread pool ili inline (na event loop-u)")
+    p.add_argument("--executor-workers", type=int, default=0, help="Broj procesa/niti za treniranje (0 = isto kao --workers)")
+    p.add_argument("--features-float32", action="store_true", help="Imputirana matrica obeležja kao float32 (upola manje memorije)")
+    p.add_argument("--dataset", default=DATASET_CSV, help="Očišćeni CSV sa mečevima")
+    p.add_argument("--no-dataset-cache", action="store_true", help="Parsiraj CSV pri svakom startu umesto keša u storage/dataset_cache")
     p.add_argument("--n-clusters", type=int, default=4, help="Broj ML klastera timova (KMeans) u P2P režimu")
     return p.parse_args()
 
 
 async def main():
+    t_start = time.perf_counter()
     args = parse_args()
     mode = args.mode
     node_name = args.node
     host, port = args.host, args.port
     raw_peers = [p.strip() for p in args.peers.split(",") if p.strip()]
+    configure_executor(args.executor, args.executor_workers or args.workers)
+    print(f"[Main] executor: {executor_info()}")
+    configure_fit_batching(args.fit_batch_ms, args.fit_batch_max)
+    TeamNodeWorker.fedprox_solver = args.fedprox_solver
+    TeamNodeWorker.fedprox_tol = float(args.fedprox_tol)
+    TeamNodeWorker.fedprox_max_iter = int(args.fedprox_max_iter)
+    Evaluator.playoff_mode = args.playoff_mode
+    Evaluator.playoff_sims = int(args.playoff_sims)
+    Evaluator.playoff_seed = args.playoff_seed
+    agg_strategy = args.agg_strategy
 
     peers = []
     for raw in raw_peers:
@@ -63,7 +110,7 @@ async def main():
         except ValueError:
             print(f"[WARN] Neispravan peer format: {raw}, koristi IME@HOST:PORT")
 
-    df = pd.read_csv("dataset/nba_games_clean.csv")
+    df = pd.read_csv(args.dataset) if args.no_dataset_cache else load_games(args.dataset)
     last_season = df["season"].max()
     train = df[df["season"] < last_season]
     test = df[df["season"] == last_season]
@@ -71,9 +118,18 @@ async def main():
     features = ["ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"]
     imputer = SimpleImputer(strategy="mean")
     imputer.fit(train[features])
+    # impute train/test once; actors and pool processes share the memory-mapped .npy files
+    build_feature_matrix(train, features, imputer, "train", float32=bool(args.features_float32))
+    build_feature_matrix(test, features, imputer, "test", float32=bool(args.features_float32))
 
-    system = ActorSystem(host=host, port=port, transport=args.transport)
+    system = ActorSystem(
+        host=host, port=port, transport=args.transport, codec=args.wire_codec, wire_float32=bool(args.wire_float32),
+        grpc_keepalive_ms=int(args.grpc_keepalive_ms), grpc_compression=args.grpc_compression,
+        batch_max=int(args.batch_max), batch_max_delay_ms=float(args.batch_delay_ms),
+        mailbox_capacity=int(args.mailbox_capacity), mailbox_policy=args.mailbox_policy,
+    )
     await system.start_network()
+    print(f"[Main] ready in {time.perf_counter() - t_start:.3f}s ({len(df)} mečeva)", flush=True)
 
     for (pname, phost, pport) in peers:
         system.register_peer(pname, phost, pport)
@@ -83,10 +139,10 @@ async def main():
         if node_name == "LAL":
             system.create_actor("crdt", lambda n, s: PN_Counter(n, s))
             system.create_actor("evaluator", lambda n, s: Evaluator(n, s, features, imputer, test, train_data=train, persist_path="global_model.json"))
-            system.create_actor("aggregator", lambda n, s: Aggregator(n, s, team_count=0))
+            system.create_actor("aggregator", lambda n, s: Aggregator(n, s, team_count=0, strategy=agg_strategy, trim=float(args.agg_trim)))
             sample_teams = sorted(df["home_team"].unique())[:3]
             for t in sample_teams:
-                local_df = train[(train["home_team"] == t) | (train["away_team"] == t)]
+                local_df = team_frame(train, t)
                 system.create_actor(f"team_{t}", lambda n, s, data=local_df: TeamNode(n, s, data, features, imputer))
             system.tell("aggregator", TrainRequest())
             system.tell("crdt", GetValue())
@@ -125,6 +181,7 @@ async def main():
                 gossip_eval_on_stop=bool(args.gossip_eval_on_stop),
                 gossip_converge_eps=float(args.gossip_converge_eps),
                 gossip_converge_patience=int(args.gossip_converge_patience),
+                gossip_resend_every=int(args.gossip_resend_every),
             ),
         )
 
@@ -158,7 +215,8 @@ async def main():
             )
             system.create_actor(
                 "aggregator_p2p",
-                lambda n, s: AggregatorP2P(n, s, async_mode=bool(args.async_fed), async_batch=int(args.async_batch), fedprox_mu=float(args.fedprox_mu))
+                lambda n, s: AggregatorP2P(n, s, async_mode=bool(args.async_fed), async_batch=int(args.async_batch), fedprox_mu=float(args.fedprox_mu),
+                                           strategy=agg_strategy, trim=float(args.agg_trim))
             )
             print("[Main] Scheduler pokrenut na reporter nodu")
             # Compute clusters once on reporter and distribute mapping
@@ -207,8 +265,19 @@ async def main():
             system.tell(lww_name, LwwDump())
 
 
+    if args.mailbox_capacity > 0:
+        asyncio.create_task(report_mailboxes(system))
     await asyncio.sleep(3600)
 
 
+async def report_mailboxes(system, interval: float = 30.0):
+    while True:
+        await asyncio.sleep(interval)
+        marks = [f"{name}={st['high_water']}/{st['capacity']} (drop={st['dropped']}, coalesce={st['coalesced']}, block={st['blocked']})"
+                 for name, st in sorted(system.mailbox_stats().items()) if st["high_water"]]
+        if marks:
+            print("[Main] mailbox high-water: " + ", ".join(marks))
+
+
 if __name__ == "__main__":
     asyncio.run(main())
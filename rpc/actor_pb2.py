@@ -19,17 +19,31 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0b\x61\x63tor.proto\x12\x05\x61\x63tor\">\n\x08\x45nvelope\x12\x0e\n\x06target\x18\x01 \x01(\t\x12\x0c\n\x04type\x18\x02 \x01(\t\x12\x14\n\x0cpayload_json\x18\x03 \x01(\t\"\x11\n\x03\x41\x63k\x12\n\n\x02ok\x18\x01 \x01(\x08\x32\x35\n\x0c\x41\x63torService\x12%\n\x04Send\x12\x0f.actor.Envelope\x1a\n.actor.Ack\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0b\x61\x63tor.proto\x12\x05\x61\x63tor\"\xa3\x01\n\nModelShare\x12\x0e\n\x06sender\x18\x01 \x01(\t\x12\x0c\n\x04\x63oef\x18\x02 \x01(\x0c\x12\x11\n\tintercept\x18\x03 \x01(\x01\x12\x14\n\x07version\x18\x04 \x01(\x03H\x00\x88\x01\x01\x12\x12\n\x05ts_ms\x18\x05 \x01(\x03H\x01\x88\x01\x01\x12\x16\n\tn_samples\x18\x06 \x01(\x03H\x02\x88\x01\x01\x42\n\n\x08_versionB\x08\n\x06_ts_msB\x0c\n\n_n_samples\"1\n\x0eSetGlobalModel\x12\x0c\n\x04\x63oef\x18\x01 \x01(\x0c\x12\x11\n\tintercept\x18\x02 \x01(\x01\"\x1c\n\nGiveMeWork\x12\x0e\n\x06worker\x18\x01 \x01(\t\"\x1f\n\nAssignTeam\x12\x11\n\tteam_name\x18\x01 \x01(\t\">\n\x08WorkDone\x12\x0e\n\x06worker\x18\x01 \x01(\t\x12\x12\n\niterations\x18\x02 \x01(\x03\x12\x0e\n\x06\x66it_ms\x18\x03 \x01(\x01\"\"\n\nHealthPing\x12\x14\n\x0cmonitor_name\x18\x01 \x01(\t\"\x1f\n\tHealthAck\x12\x12\n\nactor_name\x18\x01 \x01(\t\"\xf0\x02\n\x08\x45nvelope\x12\x0e\n\x06target\x18\x01 \x01(\t\x12\x0c\n\x04type\x18\x02 \x01(\t\x12\x14\n\x0cpayload_json\x18\x03 \x01(\t\x12(\n\x0bmodel_share\x18\x04 \x01(\x0b\x32\x11.actor.ModelShareH\x00\x12\x31\n\x10set_global_model\x18\x05 \x01(\x0b\x32\x15.actor.SetGlobalModelH\x00\x12)\n\x0cgive_me_work\x18\x06 \x01(\x0b\x32\x11.actor.GiveMeWorkH\x00\x12(\n\x0b\x61ssign_team\x18\x07 \x01(\x0b\x32\x11.actor.AssignTeamH\x00\x12$\n\twork_done\x18\x08 \x01(\x0b\x32\x0f.actor.WorkDoneH\x00\x12(\n\x0bhealth_ping\x18\t \x01(\x0b\x32\x11.actor.HealthPingH\x00\x12&\n\nhealth_ack\x18\n \x01(\x0b\x32\x10.actor.HealthAckH\x00\x42\x06\n\x04\x62ody\"#\n\x03\x41\x63k\x12\n\n\x02ok\x18\x01 \x01(\x08\x12\x10\n\x08received\x18\x02 \x01(\x04\x32\x66\n\x0c\x41\x63torService\x12%\n\x04Send\x12\x0f.actor.Envelope\x1a\n.actor.Ack\"\x00\x12/\n\nSendStream\x12\x0f.actor.Envelope\x1a\n.actor.Ack\"\x00(\x01\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'actor_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_ENVELOPE']._serialized_start=22
-  _globals['_ENVELOPE']._serialized_end=84
-  _globals['_ACK']._serialized_start=86
-  _globals['_ACK']._serialized_end=103
-  _globals['_ACTORSERVICE']._serialized_start=105
-  _globals['_ACTORSERVICE']._serialized_end=158
+  _globals['_MODELSHARE']._serialized_start=23
+  _globals['_MODELSHARE']._serialized_end=186
+  _globals['_SETGLOBALMODEL']._serialized_start=188
+  _globals['_SETGLOBALMODEL']._serialized_end=237
+  _globals['_GIVEMEWORK']._serialized_start=239
+  _globals['_GIVEMEWORK']._serialized_end=267
+  _globals['_ASSIGNTEAM']._serialized_start=269
+  _globals['_ASSIGNTEAM']._serialized_end=300
+  _globals['_WORKDONE']._serialized_start=302
+  _globals['_WORKDONE']._serialized_end=364
+  _globals['_HEALTHPING']._serialized_start=366
+  _globals['_HEALTHPING']._serialized_end=400
+  _globals['_HEALTHACK']._serialized_start=402
+  _globals['_HEALTHACK']._serialized_end=433
+  _globals['_ENVELOPE']._serialized_start=436
+  _globals['_ENVELOPE']._serialized_end=804
+  _globals['_ACK']._serialized_start=806
+  _globals['_ACK']._serialized_end=841
+  _globals['_ACTORSERVICE']._serialized_start=843
+  _globals['_ACTORSERVICE']._serialized_end=945
 # @@protoc_insertion_point(module_scope)
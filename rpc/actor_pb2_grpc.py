@@ -37,6 +37,11 @@ class ActorServiceStub(object):
                 request_serializer=actor__pb2.Envelope.SerializeToString,
                 response_deserializer=actor__pb2.Ack.FromString,
                 _registered_method=True)
+        self.SendStream = channel.stream_stream(
+                '/actor.ActorService/SendStream',
+                request_serializer=actor__pb2.Envelope.SerializeToString,
+                response_deserializer=actor__pb2.Ack.FromString,
+                _registered_method=True)
 
 
 class ActorServiceServicer(object):
@@ -48,6 +53,13 @@ class ActorServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SendStream(self, request_iterator, context):
+        """One long-lived stream per peer; the server acks when the client closes it.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ActorServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -56,6 +68,11 @@ def add_ActorServiceServicer_to_server(servicer, server):
                     request_deserializer=actor__pb2.Envelope.FromString,
                     response_serializer=actor__pb2.Ack.SerializeToString,
             ),
+            'SendStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.SendStream,
+                    request_deserializer=actor__pb2.Envelope.FromString,
+                    response_serializer=actor__pb2.Ack.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'actor.ActorService', rpc_method_handlers)
@@ -93,3 +110,30 @@ class ActorService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SendStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/actor.ActorService/SendStream',
+            actor__pb2.Envelope.SerializeToString,
+            actor__pb2.Ack.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -2,6 +2,10 @@ import asyncio
 import json
 from typing import Callable, Awaitable
 
+import numpy as np
+
+from actor.wire import json_default
+
 try:
     import grpc
 except Exception:
@@ -14,42 +18,198 @@ except Exception:
     actor_pb2_grpc = None
 
 
+COMPRESSION = {
+    "none": "NoCompression",
+    "gzip": "Gzip",
+    "deflate": "Deflate",
+}
+
+
+def _check_grpc():
+    if grpc is None:
+        raise RuntimeError(
+            "gRPC transport selected, but grpcio is not installed.\n"
+            "Fix: Activate your venv and run:\n"
+            "  pip install grpcio grpcio-tools\n"
+            "Then generate stubs:\n"
+            "  python -m grpc_tools.protoc -I rpc --python_out=rpc --grpc_python_out=rpc rpc/actor.proto"
+        )
+    if actor_pb2 is None or actor_pb2_grpc is None:
+        raise RuntimeError(
+            "gRPC Python stubs not found (rpc/actor_pb2.py, rpc/actor_pb2_grpc.py).\n"
+            "Generate them with:\n"
+            "  python -m grpc_tools.protoc -I rpc --python_out=rpc --grpc_python_out=rpc rpc/actor.proto"
+        )
+
+
+def _compression(name: str | None):
+    if not name or name == "none":
+        return None
+    return getattr(grpc.Compression, COMPRESSION[name])
+
+
+def channel_options(keepalive_ms: int = 30000, keepalive_timeout_ms: int = 10000) -> list:
+    if keepalive_ms <= 0:
+        return []
+    return [
+        ("grpc.keepalive_time_ms", int(keepalive_ms)),
+        ("grpc.keepalive_timeout_ms", int(keepalive_timeout_ms)),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+    ]
+
+
+def server_options(keepalive_ms: int = 30000) -> list:
+    if keepalive_ms <= 0:
+        return []
+    # accept client pings as often as we send them ourselves
+    return channel_options(keepalive_ms) + [
+        ("grpc.http2.min_recv_ping_interval_without_data_ms", int(keepalive_ms)),
+        ("grpc.http2.min_ping_interval_without_data_ms", int(keepalive_ms)),
+    ]
+
+
+_F64 = np.dtype("<f8")
+_typed = None
+_by_field = None
+
+
+def _coef_bytes(coef) -> bytes:
+    return np.ascontiguousarray(np.asarray(coef, dtype=_F64).ravel()).tobytes()
+
+
+def _typed_codecs() -> dict:
+    """type name -> (oneof field, payload -> proto body, proto body -> message object)."""
+    global _typed
+    if _typed is not None:
+        return _typed
+    from actor.p2p import ModelShare
+    from actor.aggregator import SetGlobalModel
+    from actor.scheduler import GiveMeWork, AssignTeam, WorkDone
+    from actor.health import HealthPing, HealthAck
+
+    def enc_share(p):
+        body = actor_pb2.ModelShare(sender=p["sender"], coef=_coef_bytes(p["coef"]), intercept=float(p["intercept"]))
+        if p.get("version") is not None:
+            body.version = int(p["version"])
+        if p.get("ts_ms") is not None:
+            body.ts_ms = int(p["ts_ms"])
+        if p.get("n_samples") is not None:
+            body.n_samples = int(p["n_samples"])
+        return body
+
+    def dec_share(b):
+        return ModelShare(
+            b.sender,
+            np.frombuffer(b.coef, dtype=_F64),
+            b.intercept,
+            b.version if b.HasField("version") else None,
+            b.ts_ms if b.HasField("ts_ms") else None,
+            b.n_samples if b.HasField("n_samples") else None,
+        )
+
+    _typed = {
+        "ModelShare": ("model_share", enc_share, dec_share),
+        "SetGlobalModel": (
+            "set_global_model",
+            lambda p: actor_pb2.SetGlobalModel(coef=_coef_bytes(p["coef"]), intercept=float(p["intercept"])),
+            lambda b: SetGlobalModel(np.frombuffer(b.coef, dtype=_F64), b.intercept),
+        ),
+        "GiveMeWork": ("give_me_work", lambda p: actor_pb2.GiveMeWork(worker=p["worker"]), lambda b: GiveMeWork(b.worker)),
+        "AssignTeam": ("assign_team", lambda p: actor_pb2.AssignTeam(team_name=p["team_name"]), lambda b: AssignTeam(b.team_name)),
+        "WorkDone": (
+            "work_done",
+            lambda p: actor_pb2.WorkDone(worker=p["worker"], iterations=int(p.get("iterations", 0)), fit_ms=float(p.get("fit_ms", 0.0))),
+            lambda b: WorkDone(b.worker, b.iterations, b.fit_ms),
+        ),
+        "HealthPing": ("health_ping", lambda p: actor_pb2.HealthPing(monitor_name=p["monitor_name"]), lambda b: HealthPing(b.monitor_name)),
+        "HealthAck": ("health_ack", lambda p: actor_pb2.HealthAck(actor_name=p["actor_name"]), lambda b: HealthAck(b.actor_name)),
+    }
+    return _typed
+
+
+def _to_request(envelope: dict):
+    target, mtype = envelope.get("target", ""), envelope.get("type", "")
+    typed = _typed_codecs().get(mtype)
+    if typed is not None:
+        field, enc, _ = typed
+        return actor_pb2.Envelope(target=target, type=mtype, **{field: enc(envelope.get("payload", {}))})
+    payload_json = json.dumps(envelope.get("payload", {}), default=json_default)
+    return actor_pb2.Envelope(target=target, type=mtype, payload_json=payload_json)
+
+
+def _from_request(request) -> dict:
+    return {
+        "target": request.target,
+        "type": request.type,
+        "payload": json.loads(request.payload_json) if request.payload_json else {},
+    }
+
+
+def _decoders() -> dict:
+    global _by_field
+    if _by_field is None:
+        _by_field = {field: dec for (field, _enc, dec) in _typed_codecs().values()}
+    return _by_field
+
+
+def decode_typed(request):
+    """Message object for a typed envelope, or None when it carries payload_json."""
+    field = request.WhichOneof("body")
+    if field is None:
+        return None
+    return _decoders()[field](getattr(request, field))
+
+
 class GrpcServer:
-    def __init__(self, host: str, port: int, handler: Callable[[dict], Awaitable[None]]):
-        if grpc is None:
-            raise RuntimeError(
-                "gRPC transport selected, but grpcio is not installed.\n"
-                "Fix: Activate your venv and run:\n"
-                "  pip install grpcio grpcio-tools\n"
-                "Then generate stubs:\n"
-                "  python -m grpc_tools.protoc -I rpc --python_out=rpc --grpc_python_out=rpc rpc/actor.proto"
-            )
-        if actor_pb2 is None or actor_pb2_grpc is None:
-            raise RuntimeError(
-                "gRPC Python stubs not found (rpc/actor_pb2.py, rpc/actor_pb2_grpc.py).\n"
-                "Generate them with:\n"
-                "  python -m grpc_tools.protoc -I rpc --python_out=rpc --grpc_python_out=rpc rpc/actor.proto"
-            )
+    def __init__(self, host: str, port: int, handler: Callable[[dict], Awaitable[None]],
+                 keepalive_ms: int = 30000, compression: str | None = None,
+                 deliver: Callable[[str, object], Awaitable[None]] | None = None):
+        _check_grpc()
         self._host = host
         self._port = port
         self._handler = handler
+        # typed envelopes are decoded here and handed over as message objects (ActorSystem.tell_async)
+        self._deliver = deliver
 
         class _Servicer(actor_pb2_grpc.ActorServiceServicer):
-            def __init__(self, handler: Callable[[dict], Awaitable[None]]):
+            def __init__(self, handler: Callable[[dict], Awaitable[None]], deliver):
                 self._handler = handler
+                self._deliver = deliver
 
-            async def Send(self, request, context):
-                envelope = {
-                    "target": request.target,
-                    "type": request.type,
-                    "payload": json.loads(request.payload_json) if request.payload_json else {},
-                }
+            async def _dispatch(self, request):
+                if self._deliver is not None:
+                    message = decode_typed(request)
+                    if message is not None:
+                        await self._deliver(request.target, message)
+                        return
+                    await self._handler(_from_request(request))
+                    return
+                envelope = _from_request(request)
+                if request.WhichOneof("body") is not None:
+                    # no direct delivery: rebuild the payload dict via the message registry
+                    from actor.codec import encode
+                    envelope = encode(request.target, decode_typed(request))
                 await self._handler(envelope)
-                return actor_pb2.Ack(ok=True)
+
+            async def Send(self, request, context):
+                await self._dispatch(request)
+                return actor_pb2.Ack(ok=True, received=1)
+
+            async def SendStream(self, request_iterator, context):
+                # envelopes of one stream are handled in order, like one TCP connection
+                received = 0
+                async for request in request_iterator:
+                    try:
+                        await self._dispatch(request)
+                    except Exception as e:
+                        print("[gRPC] recv error:", e)
+                    received += 1
+                yield actor_pb2.Ack(ok=True, received=received)
         self._servicer_cls = _Servicer
-        self._server = grpc.aio.server()
+        self._server = grpc.aio.server(options=server_options(keepalive_ms), compression=_compression(compression))
 
-        actor_pb2_grpc.add_ActorServiceServicer_to_server(self._servicer_cls(self._handler), self._server)
+        actor_pb2_grpc.add_ActorServiceServicer_to_server(self._servicer_cls(self._handler, self._deliver), self._server)
         bound = self._server.add_insecure_port(f"{self._host}:{self._port}")
         if bound == 0:
             raise RuntimeError("Failed to bind gRPC server port")
@@ -63,23 +223,148 @@ class GrpcServer:
         await self._server.stop(0)
 
 
+class _PeerStream:
+    """One cached channel + open SendStream call towards a peer.
+
+    Envelopes are written with call.write(), which waits for HTTP/2 flow
+    control instead of piling up in a local queue, and raises once the
+    stream has failed. A batch whose stream died is re-sent from the first
+    unwritten envelope on a fresh channel and stream; if that fails too the
+    error reaches the caller (PeerOutbox counts it as a failed batch).
+    """
+
+    def __init__(self, host: str, port: int, options: list, compression):
+        self.target = f"{host}:{port}"
+        self._options = options
+        self._compression = compression
+        self.channel = None
+        self.stub = None
+        self._call = None
+        self._reader_task = None
+        self._lock = asyncio.Lock()  # one writer per call
+        self.streams_opened = 0
+        self.resent = 0
+
+    def _ensure_channel(self):
+        if self.channel is None:
+            self.channel = grpc.aio.insecure_channel(self.target, options=self._options, compression=self._compression)
+            self.stub = actor_pb2_grpc.ActorServiceStub(self.channel)
+
+    def _stream_alive(self) -> bool:
+        return self._call is not None and not self._call.done()
+
+    def _open_stream(self):
+        self._ensure_channel()
+        self._call = self.stub.SendStream()
+        self._reader_task = asyncio.create_task(self._drain_acks(self._call))
+        self.streams_opened += 1
+
+    async def _drain_acks(self, call):
+        try:
+            while await call.read() is not grpc.aio.EOF:
+                pass
+        except Exception as e:
+            print(f"[gRPC] stream to {self.target} closed:", e)
+
+    async def _write_all(self, requests: list):
+        async with self._lock:
+            written = 0
+            for attempt in range(2):
+                if not self._stream_alive():
+                    self._open_stream()
+                try:
+                    for req in requests[written:]:
+                        await self._call.write(req)
+                        written += 1
+                    return
+                except (grpc.aio.AioRpcError, asyncio.InvalidStateError) as e:
+                    # a fresh channel reconnects now instead of after the channel's backoff
+                    await self._drop_channel()
+                    if attempt:
+                        raise ConnectionError(f"gRPC stream to {self.target} failed, "
+                                              f"{len(requests) - written} of {len(requests)} envelopes not sent: {e}") from e
+                    self.resent += len(requests) - written
+
+    async def _drop_channel(self):
+        channel = self.channel
+        self.channel = self.stub = self._call = None
+        if channel is not None:
+            await channel.close()
+
+    async def send(self, envelope: dict):
+        await self._write_all([_to_request(envelope)])
+
+    async def send_batch(self, envelopes: list):
+        await self._write_all([_to_request(envelope) for envelope in envelopes])
+
+    async def send_unary(self, envelope: dict):
+        self._ensure_channel()
+        await self.stub.Send(_to_request(envelope))
+
+    async def close(self):
+        if self._stream_alive():
+            try:
+                await self._call.done_writing()
+            except Exception:
+                pass
+        if self._reader_task is not None:
+            try:
+                await asyncio.wait_for(self._reader_task, timeout=2.0)
+            except Exception:
+                pass
+        await self._drop_channel()
+        self._reader_task = None
+
+
+class GrpcClient:
+    """Per-peer cache of channels/stubs; envelopes go through one open stream per peer."""
+
+    def __init__(self, keepalive_ms: int = 30000, compression: str | None = None, streaming: bool = True):
+        _check_grpc()
+        self._options = channel_options(keepalive_ms)
+        self._compression = _compression(compression)
+        self.streaming = bool(streaming)
+        self._peers = {}  # (host, port) -> _PeerStream
+
+    def _peer(self, host: str, port: int) -> _PeerStream:
+        key = (host, int(port))
+        peer = self._peers.get(key)
+        if peer is None:
+            peer = _PeerStream(host, port, self._options, self._compression)
+            self._peers[key] = peer
+        return peer
+
+    async def send(self, host: str, port: int, envelope: dict):
+        peer = self._peer(host, port)
+        if self.streaming:
+            await peer.send(envelope)
+        else:
+            await peer.send_unary(envelope)
+
+    async def send_batch(self, host: str, port: int, envelopes: list):
+        peer = self._peer(host, port)
+        if self.streaming:
+            await peer.send_batch(envelopes)
+        else:
+            for envelope in envelopes:
+                await peer.send_unary(envelope)
+
+    def stats(self) -> dict:
+        return {p.target: {"streams_opened": p.streams_opened, "resent": p.resent} for p in self._peers.values()}
+
+    async def close(self):
+        peers = list(self._peers.values())
+        self._peers.clear()
+        for p in peers:
+            await p.close()
+
+
+_default_client = None
+
+
 async def send_envelope(host: str, port: int, envelope: dict):
-    if grpc is None:
-        raise RuntimeError(
-            "gRPC transport selected, but grpcio is not installed.\n"
-            "Fix: Activate your venv and run:\n"
-            "  pip install grpcio grpcio-tools\n"
-            "Then generate stubs:\n"
-            "  python -m grpc_tools.protoc -I rpc --python_out=rpc --grpc_python_out=rpc rpc/actor.proto"
-        )
-    if actor_pb2 is None or actor_pb2_grpc is None:
-        raise RuntimeError(
-            "gRPC Python stubs not found (rpc/actor_pb2.py, rpc/actor_pb2_grpc.py).\n"
-            "Generate them with:\n"
-            "  python -m grpc_tools.protoc -I rpc --python_out=rpc --grpc_python_out=rpc rpc/actor.proto"
-        )
-    async with grpc.aio.insecure_channel(f"{host}:{port}") as channel:
-        stub = actor_pb2_grpc.ActorServiceStub(channel)
-        payload_json = json.dumps(envelope.get("payload", {}))
-        req = actor_pb2.Envelope(target=envelope.get("target", ""), type=envelope.get("type", ""), payload_json=payload_json)
-        await stub.Send(req)
+    # unary Send over a cached channel (kept for callers outside ActorSystem)
+    global _default_client
+    if _default_client is None:
+        _default_client = GrpcClient(streaming=False)
+    await _default_client.send(host, port, envelope)
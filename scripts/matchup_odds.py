@@ -0,0 +1,44 @@
+"""What-if series odds from the latest saved matchup matrix (storage/matchups/).
+
+    python scripts/matchup_odds.py BOS:LAL MIA:DEN --best-of 7
+    python scripts/matchup_odds.py --file pairs.txt      # one "A:B" per line
+    python scripts/matchup_odds.py BOS:LAL --home LAL    # force home court
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from actor.matchups import ROOT, latest_matchups
+
+p = argparse.ArgumentParser(description="Verovatnoće serija za proizvoljne parove timova")
+p.add_argument("pairs", nargs="*", help="parovi u obliku A:B")
+p.add_argument("--file", help="fajl sa jednim parom A:B po liniji")
+p.add_argument("--best-of", type=int, default=7)
+p.add_argument("--home", help="tim sa prednošću domaćeg terena (podrazumevano bolje rangiran)")
+p.add_argument("--root", default=str(ROOT))
+args = p.parse_args()
+
+matchups = latest_matchups(args.root)
+if matchups is None:
+    print(f"No matchup matrix in {args.root} (run an evaluation first)")
+    raise SystemExit(1)
+
+raw = list(args.pairs)
+if args.file:
+    raw += [line.strip() for line in Path(args.file).read_text(encoding="utf-8").splitlines() if line.strip()]
+pairs = [tuple(x.split(":", 1)) for x in raw]
+unknown = sorted({t for pair in pairs for t in pair} - set(matchups.teams))
+if unknown:
+    print("Unknown teams:", ", ".join(unknown))
+    raise SystemExit(1)
+
+print(f"Matchup matrix {matchups.version} ({len(matchups.teams)} teams), best-of-{args.best_of}")
+if args.home or len(pairs) <= 20:
+    for a, b in pairs:
+        q = matchups.query(a, b, args.best_of, home_court=args.home)
+        print(f"  {a} vs {b}: P({a} wins series)={q['p_series']:.3f}  per game={q['p_game']:.3f}  home court={q['home_court']}")
+else:
+    odds = matchups.query_many(pairs, args.best_of)
+    for (a, b), p_series in zip(pairs, odds):
+        print(f"  {a} vs {b}: P({a} wins series)={p_series:.3f}")
@@ -1,15 +1,25 @@
-import pandas as pd
+import argparse
 import os
+import pandas as pd
+from create_clean_csv import team_rows
 
-df = pd.read_csv("dataset/nba_games_clean.csv")
+# Jedan prolaz kroz očišćeni CSV u delovima: svaki deo se jednim indeksom (TeamIndex) deli po timovima
+# i dopisuje u dataset/teams/data_<TIM>.csv. (create_clean_csv.py već pravi binarne particije
+# po timovima u dataset/teams_npz; ovaj skript ostaje za one kojima trebaju CSV fajlovi.)
+p = argparse.ArgumentParser(description="Podela očišćenog CSV-a po timovima")
+p.add_argument("--source", default="dataset/nba_games_clean.csv")
+p.add_argument("--out-dir", default="dataset/teams")
+p.add_argument("--chunksize", type=int, default=50000)
+args = p.parse_args()
 
-output_dir = "dataset/teams"
+output_dir = args.out_dir
 os.makedirs(output_dir, exist_ok=True)
 
-teams = pd.unique(df[["home_team", "away_team"]].values.ravel("K"))
-
-for team in teams:
-    team_games = df[(df["home_team"] == team) | (df["away_team"] == team)]
-    team_games.to_csv(f"{output_dir}/data_{team}.csv", index=False)
+written = set()
+for chunk in pd.read_csv(args.source, chunksize=args.chunksize):
+    for team, rows in team_rows(chunk):
+        path = f"{output_dir}/data_{team}.csv"
+        chunk.iloc[rows].to_csv(path, mode="a" if team in written else "w", header=team not in written, index=False)
+        written.add(team)
 
-print(f"Napravljeno {len(teams)} fajlova u folderu {output_dir}")
+print(f"Napravljeno {len(written)} fajlova u folderu {output_dir}")
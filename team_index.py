@@ -0,0 +1,100 @@
+"""Team -> row positions index over a games DataFrame (home_team / away_team).
+
+Built once per DataFrame with a single factorize + stable sort and kept in
+CSR form (an offsets array plus one array of row positions per side), so
+looking up a team's games costs O(games of that team) instead of a boolean
+mask over the whole history. Row positions are iloc positions, ascending,
+i.e. the same rows in the same order as
+
+    df[(df["home_team"] == team) | (df["away_team"] == team)]
+
+team_index(df) caches the index per process for the lifetime of df, so all
+actors of a node that share the training frame share one index.
+"""
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+_EMPTY = np.empty(0, dtype=np.int64)
+_cache = {}  # id(df) -> (weakref to df, TeamIndex)
+
+
+def _csr(codes: np.ndarray, rows: np.ndarray, n_teams: int):
+    # missing team names (code -1) are left out; a stable sort keeps rows ascending inside each team
+    keep = codes >= 0
+    codes, rows = codes[keep], rows[keep]
+    order = np.argsort(codes, kind="stable")
+    offsets = np.zeros(n_teams + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=n_teams), out=offsets[1:])
+    return offsets, rows[order]
+
+
+class TeamIndex:
+    def __init__(self, df: pd.DataFrame, home_col: str = "home_team", away_col: str = "away_team"):
+        n = len(df)
+        codes, teams = pd.factorize(
+            np.concatenate([df[home_col].to_numpy(dtype=object), df[away_col].to_numpy(dtype=object)]), sort=True
+        )
+        codes = codes.astype(np.int64)
+        home_codes, away_codes = codes[:n], codes[n:]
+        rows = np.arange(n, dtype=np.int64)
+        self.n_rows = n
+        self.teams = list(teams)
+        self._pos = {t: i for i, t in enumerate(self.teams)}
+        self._home = _csr(home_codes, rows, len(self.teams))
+        self._away = _csr(away_codes, rows, len(self.teams))
+        # per team the union is both sides merged (a row listing the same team twice counts once)
+        both_rows = np.concatenate([rows, rows])
+        both_codes = np.concatenate([home_codes, np.where(away_codes == home_codes, -1, away_codes)])
+        order = np.argsort(both_rows, kind="stable")
+        self._all = _csr(both_codes[order], both_rows[order], len(self.teams))
+
+    def __contains__(self, team) -> bool:
+        return team in self._pos
+
+    def _lookup(self, csr, team) -> np.ndarray:
+        i = self._pos.get(team)
+        if i is None:
+            return _EMPTY
+        offsets, rows = csr
+        return rows[offsets[i]:offsets[i + 1]]
+
+    def home(self, team) -> np.ndarray:
+        return self._lookup(self._home, team)
+
+    def away(self, team) -> np.ndarray:
+        return self._lookup(self._away, team)
+
+    def rows(self, team) -> np.ndarray:
+        return self._lookup(self._all, team)
+
+    def mean_by_team(self, values: np.ndarray, side: str = "all", default: float = np.nan) -> np.ndarray:
+        """Mean of a per-row array over each team's rows (aligned with self.teams); default for teams without rows."""
+        offsets, rows = {"all": self._all, "home": self._home, "away": self._away}[side]
+        csum = np.concatenate([[0.0], np.cumsum(np.asarray(values, dtype=float)[rows])])
+        counts = np.diff(offsets)
+        sums = csum[offsets[1:]] - csum[offsets[:-1]]
+        return np.where(counts > 0, sums / np.maximum(counts, 1), default)
+
+    def counts(self) -> dict:
+        offsets = self._all[0]
+        return {t: int(offsets[i + 1] - offsets[i]) for i, t in enumerate(self.teams)}
+
+
+def team_index(df: pd.DataFrame) -> TeamIndex:
+    entry = _cache.get(id(df))
+    if entry is not None and entry[0]() is df and entry[1].n_rows == len(df):
+        return entry[1]
+    index = TeamIndex(df)
+    key = id(df)
+    _cache[key] = (weakref.ref(df, lambda _ref, key=key: _cache.pop(key, None)), index)
+    return index
+
+
+def team_frame(df: pd.DataFrame, team, side: str = "all") -> pd.DataFrame:
+    """Games of `team` in df; side is "all", "home" or "away"."""
+    index = team_index(df)
+    rows = {"all": index.rows, "home": index.home, "away": index.away}[side](team)
+    return df.iloc[rows]
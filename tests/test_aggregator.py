@@ -38,3 +38,146 @@ async def test_fedavg_in_aggregatorp2p(event_loop):
     gm = [m for (n, t, m) in sys.sent if t == "GlobalModel"][0]
     assert np.allclose(gm.coef, np.array([[2.0, 4.0]]))
     assert abs(gm.intercept - 1.0) < 1e-6
+
+
+@pytest.mark.asyncio
+async def test_worker_warm_starts_from_global_model(event_loop):
+    import pandas as pd
+    from sklearn.impute import SimpleImputer
+    from actor import compute
+    from actor.aggregator import SetGlobalModel
+    from actor.scheduler import AssignTeam
+    from actor.worker import TeamNodeWorker
+
+    rng = np.random.default_rng(0)
+    n = 600
+    df = pd.DataFrame({"home_team": rng.choice(["A", "B"], n), "away_team": "C",
+                       "f1": rng.normal(size=n), "f2": rng.normal(size=n)})
+    df["home_win"] = (df["f1"] - df["f2"] + rng.normal(size=n) > 0).astype(int)
+    imputer = SimpleImputer().fit(df[["f1", "f2"]])
+    compute.configure_executor("inline")
+    sys = DummySystem()
+    w = TeamNodeWorker("w0", sys, ["f1", "f2"], imputer, "scheduler", train_df=df)
+
+    await w.default_behavior(AssignTeam("A"))
+    cold = [m for (_, t, m) in sys.sent if t == "WorkDone"][-1]
+    share = [m for (_, t, m) in sys.sent if t == "ModelShare"][-1]
+    await w.default_behavior(SetGlobalModel(share.coef, share.intercept))
+    await w.default_behavior(AssignTeam("A"))
+    warm = [m for (_, t, m) in sys.sent if t == "WorkDone"][-1]
+    assert cold.iterations > 0 and warm.iterations < cold.iterations
+    assert np.allclose([m for (_, t, m) in sys.sent if t == "ModelShare"][-1].coef, share.coef, atol=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_streaming_weighted_fedavg_per_cluster(event_loop):
+    from actor.p2p import ModelShare
+    from actor.aggregator import RoundComplete, SetTeamClusters, Aggregator, ModelUpdate
+    sys = DummySystem()
+    agg = AggregatorP2P("agg", sys, strategy="weighted")
+    await agg.default_behavior(SetTeamClusters({"A": 0, "B": 0, "C": 1}))
+    await agg.default_behavior(ModelShare("A", np.array([1.0, 0.0]), 1.0, n_samples=300))
+    await agg.default_behavior(ModelShare("B", np.array([5.0, 4.0]), 5.0, n_samples=100))
+    await agg.default_behavior(ModelShare("C", np.array([2.0, 2.0]), 0.0))  # no count -> weight 1
+    await agg.default_behavior(ModelShare("X", np.array([9.0, 9.0]), 9.0, n_samples=50))  # unmapped
+    assert agg.pending == 4
+    await agg.default_behavior(RoundComplete(1, 1, 0.0))
+    cm = [m for (n, t, m) in sys.sent if t == "SetClusterModels"][0].cluster_models
+    assert np.allclose(cm[0]["coef"], [[2.0, 1.0]]) and cm[0]["intercept"] == pytest.approx(2.0)
+    assert np.allclose(cm[1]["coef"], [[2.0, 2.0]])
+    assert agg.pending == 0
+
+    # provider-mode Aggregator, unweighted by default
+    sys = DummySystem()
+    a = Aggregator("aggregator", sys, team_count=2)
+    await a.default_behavior(ModelUpdate(np.array([1.0]), 0.0, n_samples=10))
+    await a.default_behavior(ModelUpdate(np.array([3.0]), 2.0, n_samples=30))
+    gm = [m for (n, t, m) in sys.sent if t == "GlobalModel"][0]
+    assert np.allclose(gm.coef, [[2.0]]) and gm.intercept == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_shares_before_cluster_mapping_are_kept(event_loop):
+    from actor.p2p import ModelShare
+    from actor.aggregator import RoundComplete, SetTeamClusters
+    for strategy in ("mean", "median"):
+        sys = DummySystem()
+        agg = AggregatorP2P("agg", sys, strategy=strategy)
+        await agg.default_behavior(ModelShare("A", np.array([1.0, 0.0]), 1.0))
+        await agg.default_behavior(ModelShare("C", np.array([2.0, 2.0]), 0.0))
+        # mapping arrives mid-window
+        await agg.default_behavior(SetTeamClusters({"A": 0, "B": 0, "C": 1}))
+        await agg.default_behavior(ModelShare("B", np.array([3.0, 2.0]), 3.0))
+        await agg.default_behavior(RoundComplete(1, 1, 0.0))
+        cm = [m for (n, t, m) in sys.sent if t == "SetClusterModels"][0].cluster_models
+        assert sorted(cm) == [0, 1]
+        assert np.allclose(cm[0]["coef"], [[2.0, 1.0]]) and cm[0]["intercept"] == pytest.approx(2.0)
+        assert np.allclose(cm[1]["coef"], [[2.0, 2.0]])
+
+
+def test_aggregate_robust_strategies_match_numpy_per_cluster():
+    from actor.aggregation import aggregate, ClusterAccumulator
+    rng = np.random.default_rng(0)
+    theta = rng.normal(size=(200, 5))
+    theta[:3] = 1e6  # outliers in cluster 0 of a robust aggregate
+    ids = np.r_[np.zeros(3, dtype=int), rng.integers(0, 7, size=197)]
+    for strategy in ("mean", "median", "trimmed"):
+        keys, out = aggregate(theta, ids, strategy=strategy, trim=0.1)
+        assert list(keys) == sorted(set(ids))
+        for k, row in zip(keys, out):
+            rows = np.sort(theta[ids == k], axis=0)
+            if strategy == "mean":
+                expected = rows.mean(axis=0)
+            elif strategy == "median":
+                expected = np.median(rows, axis=0)
+            else:
+                cut = min(int(0.1 * len(rows)), (len(rows) - 1) // 2)
+                expected = rows[cut:len(rows) - cut].mean(axis=0)
+            assert np.allclose(row, expected)
+    # one update per cluster: trimmed keeps it, median returns it
+    _, single = aggregate(theta[:1], strategy="trimmed", trim=0.4)
+    assert np.allclose(single, theta[:1])
+
+    acc = ClusterAccumulator("median", capacity=2)
+    for i, v in enumerate([1.0, 2.0, 100.0, 3.0, 4.0]):
+        acc.add("a" if i < 3 else "b", np.array([v]), v)
+    out = acc.finalize()
+    assert np.allclose(out["a"][0], [[2.0]]) and out["b"][1] == pytest.approx(3.5)
+    merged = acc.finalize(merged=True)
+    assert list(merged) == [None] and merged[None][1] == pytest.approx(3.0)
+    # keys regrouped at finalize; keys missing from the map are dropped
+    grouped = acc.finalize(key_map={"a": 7})
+    assert list(grouped) == [7] and grouped[7][1] == pytest.approx(2.0)
+    acc = ClusterAccumulator("weighted")
+    acc.add("a", np.array([1.0]), 0.0, weight=3.0)
+    acc.add("b", np.array([5.0]), 4.0, weight=1.0)
+    acc.add("c", np.array([9.0]), 9.0)
+    out = acc.finalize(key_map={"a": "x", "b": "x"})
+    assert list(out) == ["x"] and np.allclose(out["x"][0], [[2.0]]) and out["x"][1] == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_publish_side_effects_per_trigger(event_loop):
+    from actor.p2p import ModelShare
+    from actor.aggregator import AllDone, RoundComplete, SetTeamClusters
+
+    async def sent_types(clustered, trigger):
+        sys = DummySystem()
+        agg = AggregatorP2P("agg", sys, async_mode=True, async_batch=2)
+        if clustered:
+            await agg.default_behavior(SetTeamClusters({"A": 0, "B": 1}))
+        await agg.default_behavior(ModelShare("A", np.array([1.0]), 0.0))
+        if trigger == "async":
+            await agg.default_behavior(ModelShare("B", np.array([3.0]), 1.0))
+        else:
+            await agg.default_behavior(AllDone() if trigger == "final" else RoundComplete(1, 2, 0.0))
+        return sorted((n, t) for (n, t, _) in sys.sent)
+
+    flat = [("crdt", "Increment"), ("evaluator", "GlobalModel"), ("scheduler", "SetGlobalModel")]
+    for trigger in ("final", "round", "async"):
+        assert await sent_types(False, trigger) == flat
+    assert await sent_types(True, "final") == [("evaluator", "GlobalModel"), ("scheduler", "SetClusterModels")]
+    assert await sent_types(True, "round") == [("crdt", "Increment"), ("evaluator", "GlobalModel"),
+                                               ("scheduler", "SetClusterModels")]
+    assert await sent_types(True, "async") == [("crdt", "Increment"), ("evaluator", "GlobalModel"),
+                                               ("scheduler", "SetClusterModels"), ("scheduler", "SetGlobalModel")]
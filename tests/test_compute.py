@@ -0,0 +1,76 @@
+import asyncio
+import numpy as np
+import pytest
+from actor import compute
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["thread", "process"])
+async def test_run_cpu_matches_inline_fit(event_loop, kind):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 4))
+    y = (X @ np.array([1.0, -1.0, 0.5, 0.0]) > 0).astype(float)
+
+    compute.configure_executor("inline")
+    coef_inline, b_inline = await compute.run_cpu(compute.fit_logreg, X, y)
+    compute.configure_executor(kind, 2)
+    try:
+        coef, b = await compute.run_cpu(compute.fit_logreg, X, y)
+        w, _ = await compute.run_cpu(compute.fit_fedprox, X, y, mu=0.1, w_global=coef, b_global=b, epochs=5)
+    finally:
+        compute.configure_executor("inline")
+    assert np.allclose(coef, coef_inline) and b == pytest.approx(b_inline)
+    assert w.shape == (4,)
+
+
+def test_fedprox_newton_converges_to_gd_optimum():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(600, 4))
+    y = (X @ np.array([1.0, 2.0, -1.0, -2.0]) + rng.normal(size=600) > 0).astype(float)
+    w_global, b_global = np.array([0.5, 1.0, -0.5, -1.0]), 0.2
+
+    w, b, iters = compute.fit_fedprox_newton(X, y, 0.05, w_global, b_global, tol=1e-8)
+    w_gd, b_gd = compute.fit_fedprox(X, y, 0.05, w_global, b_global, epochs=5000, lr=0.5)
+    assert 1 <= iters <= 10
+    assert np.allclose(w, w_gd, atol=1e-5) and b == pytest.approx(b_gd, abs=1e-5)
+
+    # separable labels without a proximal term: capped, finite
+    w, b, iters = compute.fit_fedprox_newton(X, (X[:, 0] > 0).astype(float), 0.0, None, None, max_iter=15)
+    assert iters <= 15 and np.all(np.isfinite(w))
+
+    class FM:
+        def take(self, rows):
+            return X[rows], y[rows]
+    w_rows, _, n_iter = compute.fit_fedprox_rows(FM(), np.arange(600), 0.05, w_global, b_global, solver="gd", epochs=7)
+    assert n_iter == 7 and w_rows.shape == (4,)
+
+
+@pytest.mark.asyncio
+async def test_fit_batcher_matches_per_team_newton(event_loop):
+    from feature_store import FeatureMatrix
+    rng = np.random.default_rng(2)
+    counts = [80, 250, 140]
+    X = rng.normal(size=(sum(counts), 4))
+    y = (X @ np.array([1.0, 2.0, -1.0, -2.0]) + rng.normal(size=len(X)) > 0).astype(float)
+    offsets = np.cumsum([0] + counts)
+    rows = [np.arange(offsets[i], offsets[i + 1]) for i in range(3)]
+    w_global, b_global = np.array([0.5, 1.0, -0.5, -1.0]), 0.1
+
+    W, b, iters = compute.fit_fedprox_batch(X, y, counts, [0.0, 0.1, 1.0], w_global, b_global)
+    for i, mu in enumerate([0.0, 0.1, 1.0]):
+        w1, b1, it1 = compute.fit_fedprox_newton(X[rows[i]], y[rows[i]], mu, w_global, b_global)
+        assert np.allclose(W[i], w1) and b[i] == pytest.approx(b1) and iters[i] == it1
+
+    compute.configure_executor("inline")
+    compute.configure_fit_batching(5.0)
+    try:
+        fm = FeatureMatrix(X, y, ["a", "b", "c", "d"])
+        batcher = compute.get_fit_batcher()
+        res = await asyncio.gather(*(batcher.fit(fm, r, 0.1, w_global, b_global) for r in rows))
+        coef, intercept, _ = await batcher.fit_logreg(fm, rows[1])
+    finally:
+        compute.configure_fit_batching(0)
+    assert batcher.stats()["batches"] == 2 and batcher.stats()["teams"] == 4
+    assert np.allclose(res[1][0], W[1])
+    coef_sk, b_sk = compute.fit_logreg(X[rows[1]], y[rows[1]])
+    assert np.allclose(coef, coef_sk, atol=1e-4) and intercept == pytest.approx(b_sk, abs=1e-4)
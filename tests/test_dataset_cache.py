@@ -0,0 +1,55 @@
+import os
+import numpy as np
+import pandas as pd
+import dataset_cache
+
+
+def _write_csv(path, n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    teams = np.array(["BOS", "MIA", "LAL", "CHI"])
+    home = rng.integers(0, 4, n)
+    df = pd.DataFrame({
+        "season": 22000 + np.arange(n) // 50, "date": pd.date_range("2001-01-01", periods=n).strftime("%Y-%m-%d"),
+        "home_team": teams[home], "away_team": teams[(home + 1) % 4], "home_points": rng.integers(80, 120, n),
+        "ft_pct_home": rng.uniform(0.5, 0.9, n).round(3), "fg_pct_home": rng.uniform(0.3, 0.6, n).round(3),
+        "ft_pct_away": rng.uniform(0.5, 0.9, n).round(3), "fg_pct_away": rng.uniform(0.3, 0.6, n).round(3),
+        "home_win": rng.integers(0, 2, n),
+    })
+    df.loc[3, "fg_pct_home"] = np.nan
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_cache_roundtrip_compact_and_invalidated(tmp_path):
+    src = tmp_path / "games.csv"
+    ref = _write_csv(src)
+    games = dataset_cache.load_games(src, root=tmp_path / "cache")
+    assert list(games.columns) == [c for c in dataset_cache.COLUMNS if c in ref.columns or c == "date"]
+    assert "home_points" not in games.columns
+    assert games["season"].dtype == np.int32 and games["home_win"].dtype == np.int8
+    assert games["fg_pct_home"].dtype == np.float64 and str(games["home_team"].dtype) == "category"
+    assert (games["home_team"].astype(str) == ref["home_team"]).all()
+    # bit-identical to parsing the CSV directly (--no-dataset-cache)
+    parsed = pd.read_csv(src)
+    for col in ("ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"):
+        assert np.array_equal(games[col], parsed[col], equal_nan=True)
+    assert games["date"].iloc[1] == pd.Timestamp("2001-01-02")
+
+    # second load maps the cached columns
+    meta_mtime = os.path.getmtime(tmp_path / "cache" / "games" / "meta.json")
+    warm = dataset_cache.load_games(src, root=tmp_path / "cache")
+    assert os.path.getmtime(tmp_path / "cache" / "games" / "meta.json") == meta_mtime
+    assert warm.equals(games)
+
+    # a changed source file rebuilds the cache
+    _write_csv(src, n=120, seed=1)
+    assert len(dataset_cache.load_games(src, root=tmp_path / "cache")) == 120
+
+
+def test_load_falls_back_to_built_meta_when_meta_unreadable(tmp_path, monkeypatch):
+    src = tmp_path / "games.csv"
+    _write_csv(src)
+    # another node won the os.replace race and its meta.json cannot be read yet
+    monkeypatch.setattr(dataset_cache, "_read_meta", lambda path: None)
+    games = dataset_cache.load_games(src, root=tmp_path / "cache")
+    assert len(games) == 200
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import create_clean_csv as etl
+
+
+def _game_csv(n, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    teams = np.array(["BOS", "MIA", "LAL", "CHI", "NYK"])
+    home = rng.integers(0, 5, n)
+    df = pd.DataFrame({
+        "game_id": [f"00{20000000 + start + i}" for i in range(n)],
+        "season_id": 22000 + (start + np.arange(n)) // 40,
+        "game_date": pd.Series(pd.Timestamp("2001-01-01") + pd.to_timedelta((start + np.arange(n)) // 3, unit="D")).dt.strftime("%Y-%m-%d %H:%M:%S"),
+        "team_abbreviation_home": teams[home], "team_abbreviation_away": teams[(home + 2) % 5],
+        "pts_home": rng.integers(80, 120, n).astype(float), "pts_away": rng.integers(80, 120, n).astype(float),
+        "matchup_home": "x",
+    })
+    for c in etl.STAT_COLUMNS:
+        df[c] = rng.uniform(0, 1, n).round(3)
+    return df
+
+
+def _reference(src):
+    # old create_clean_csv.py: whole file in memory
+    df = pd.read_csv(src)
+    df = df[list(etl.SOURCE_DTYPES)[1:]].copy()
+    df["home_win"] = (df["pts_home"] > df["pts_away"]).astype(int)
+    return df.rename(columns=etl.RENAME)[etl.OUT_COLUMNS]
+
+
+def test_chunked_run_matches_full_pass_and_partitions(tmp_path):
+    src, out, teams = tmp_path / "game.csv", tmp_path / "clean.csv", tmp_path / "teams"
+    _game_csv(100).to_csv(src, index=False)
+    res = etl.run(src, out, teams, chunksize=17)
+    assert res["written"] == 100 and not res["incremental"]
+    ref = _reference(src)
+    pd.testing.assert_frame_equal(pd.read_csv(out), ref)
+
+    part = etl.load_team_partition("BOS", teams)
+    expected = ref[(ref["home_team"] == "BOS") | (ref["away_team"] == "BOS")].reset_index(drop=True)
+    assert len(part) == len(expected)
+    assert (part["away_team"] == expected["away_team"]).all()
+    assert np.allclose(part["fg_pct_home"], expected["fg_pct_home"])
+    assert (part["date"] == pd.to_datetime(expected["date"])).all()
+
+
+def test_incremental_appends_only_new_games(tmp_path):
+    src, out, teams = tmp_path / "game.csv", tmp_path / "clean.csv", tmp_path / "teams"
+    first = _game_csv(40)
+    first.to_csv(src, index=False)
+    etl.run(src, out, teams, chunksize=16)
+
+    # new games, including one more game on the last already processed date
+    more = _game_csv(20, start=41, seed=1)
+    pd.concat([first, more]).to_csv(src, index=False)
+    res = etl.run(src, out, teams, chunksize=16, incremental=True)
+    assert res["incremental"] and res["written"] == 20 and res["rows"] == 60
+    pd.testing.assert_frame_equal(pd.read_csv(out), _reference(src))
+
+    # nothing new -> nothing appended
+    assert etl.run(src, out, teams, incremental=True)["written"] == 0
+    counts = sum(len(etl.load_team_partition(t, teams)) for t in ["BOS", "MIA", "LAL", "CHI", "NYK"])
+    assert counts == 2 * 60
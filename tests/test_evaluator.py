@@ -0,0 +1,154 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.impute import SimpleImputer
+from actor import compute, evaluator as evaluator_mod
+from actor.aggregator import GlobalModel
+from actor.evaluator import Evaluator
+
+
+class DummySystem:
+    def __init__(self):
+        self.sent = []
+    def tell(self, actor_name, message):
+        self.sent.append((actor_name, type(message).__name__, message))
+
+
+def _frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"f1": rng.normal(size=n), "f2": rng.normal(size=n)})
+    df["home_win"] = (df["f1"] - df["f2"] + rng.normal(size=n) > 0).astype(int)
+    return df
+
+
+@pytest.mark.asyncio
+async def test_baseline_fitted_once_and_reused_across_restarts(event_loop, tmp_path, monkeypatch):
+    compute.configure_executor("inline")
+    monkeypatch.chdir(tmp_path)
+    fits = []
+    real_fit = evaluator_mod.fit_logreg_model_rows
+    monkeypatch.setattr(evaluator_mod, "fit_logreg_model_rows", lambda fm: fits.append(1) or real_fit(fm))
+
+    train, test = _frame(seed=0), _frame(200, seed=1)
+    imputer = SimpleImputer().fit(train[["f1", "f2"]])
+    root = tmp_path / "baseline"
+
+    def make():
+        return Evaluator("evaluator", DummySystem(), ["f1", "f2"], imputer, test, train_data=train,
+                         persist_path=str(tmp_path / "global_model.json"), baseline_root=root)
+
+    ev = make()
+    for _ in range(3):
+        await ev.default_behavior(GlobalModel(np.array([[1.0, -1.0]]), 0.0))
+    first = json.loads((tmp_path / "global_model.json").read_text())["baseline"]
+    assert len(fits) == 1 and first["accuracy"] > 0.6
+
+    # restart: metrics come from storage, nothing is refitted
+    ev = make()
+    await ev.default_behavior(GlobalModel(np.array([[1.0, -1.0]]), 0.0))
+    assert len(fits) == 1
+    assert json.loads((tmp_path / "global_model.json").read_text())["baseline"] == first
+    model = await ev._baseline_model()
+    fresh = real_fit(evaluator_mod.feature_matrix(train, ["f1", "f2"], imputer))
+    X_test = test[["f1", "f2"]].to_numpy()
+    assert len(fits) == 1 and np.allclose(model.predict_proba(X_test), fresh.predict_proba(X_test))
+
+    # different training data -> new fingerprint -> refit
+    ev = Evaluator("evaluator", DummySystem(), ["f1", "f2"], imputer, test, train_data=_frame(seed=2),
+                   persist_path=str(tmp_path / "global_model.json"), baseline_root=root)
+    await ev.default_behavior(GlobalModel(np.array([[1.0, -1.0]]), 0.0))
+    assert len(fits) == 2 and len(list(root.glob("*.json"))) == 2
+
+
+def test_team_ratings_vectorized_and_cached_per_model(monkeypatch):
+    rng = np.random.default_rng(3)
+    train = _frame(600, seed=3)
+    names = np.array([f"T{i}" for i in range(6)])
+    home = rng.integers(0, 6, len(train))
+    train["home_team"] = names[home]
+    train["away_team"] = names[(home + rng.integers(1, 6, len(train))) % 6]
+    train.loc[train["home_team"] == "T5", "home_team"] = "T4"  # T5 never plays at home
+    imputer = SimpleImputer().fit(train[["f1", "f2"]])
+    ev = Evaluator("evaluator", DummySystem(), ["f1", "f2"], imputer, train, train_data=train, matchups_root=None)
+    model = compute.fit_logreg_model_rows(evaluator_mod.feature_matrix(train, ["f1", "f2"], imputer))
+
+    ratings = ev._team_ratings(model)
+    X = imputer.transform(train[["f1", "f2"]])
+    for t in names:
+        home, away = (train["home_team"] == t).to_numpy(), (train["away_team"] == t).to_numpy()
+        ph = model.predict_proba(X[home])[:, 1] if home.any() else np.array([0.5])
+        pa = model.predict_proba(X[away])[:, 1] if away.any() else np.array([0.5])
+        assert ratings[t] == pytest.approx((np.mean(ph) + (1.0 - np.mean(pa))) / 2.0)
+
+    calls = []
+    monkeypatch.setattr(type(model), "predict_proba", lambda self, X: calls.append(1) or np.full((len(X), 2), 0.5))
+    assert ev._team_ratings(model) is ratings and not calls
+    model.intercept_ = model.intercept_ + 1.0  # new version -> rescored
+    ev._team_ratings(model)
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_eval_request_monte_carlo_reports_and_persists_odds(event_loop, tmp_path, monkeypatch):
+    import sqlite3
+    from actor.evaluator import EvalRequest
+    compute.configure_executor("inline")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "storage").mkdir()
+    rng = np.random.default_rng(4)
+    train = _frame(600, seed=4)
+    names = np.array([f"T{i}" for i in range(8)])
+    home = rng.integers(0, 8, len(train))
+    train["home_team"] = names[home]
+    train["away_team"] = names[(home + rng.integers(1, 8, len(train))) % 8]
+    sys = DummySystem()
+    ev = Evaluator("evaluator", sys, ["f1", "f2"], SimpleImputer().fit(train[["f1", "f2"]]), train, train_data=train,
+                   baseline_root=tmp_path / "baseline")
+
+    await ev.default_behavior(EvalRequest(reply_to="me", round_idx=2, mode="monte_carlo", n_sims=5000, seed=3))
+    odds = [m for (n, t, m) in sys.sent if t == "EvalReport"][0].results
+    assert odds["n_sims"] == 5000 and odds["seed"] == 3 and odds["stages"] == ["QF", "SF", "F"]
+    assert set(odds["title"]) == set(names) and sum(odds["title"].values()) == pytest.approx(1.0)
+    assert ev.db.flush(timeout=5)
+    with sqlite3.connect(tmp_path / "storage" / "results.db") as conn:
+        rows = conn.execute("SELECT team, stage, probability FROM playoff_odds WHERE round_idx = 2").fetchall()
+    assert len(rows) == 8 * 3
+    assert {(t, s): p for t, s, p in rows}[("T0", "F")] == pytest.approx(odds["title"]["T0"])
+
+    await ev.default_behavior(EvalRequest(reply_to="me", round_idx=3, mode="exact"))
+    exact = [m for (n, t, m) in sys.sent if t == "EvalReport"][1].results
+    assert exact["mode"] == "exact" and exact["stages"] == odds["stages"]
+    assert all(abs(exact["title"][t] - odds["title"][t]) < 0.03 for t in names)
+
+
+
+def test_matchup_matrix_home_court_and_queries(tmp_path):
+    from actor.matchups import MatchupMatrix, home_schedule, latest_matchups
+    from actor.playoffs import series_win_prob
+    teams = ["A", "B", "C"]
+    m = MatchupMatrix(teams, home_strength=[0.7, 0.6, 0.5], away_strength=[0.5, 0.4, 0.3], version="v1")
+    assert m.home[0, 1] == pytest.approx(0.7 / (0.7 + 0.4)) and m.home[1, 0] == pytest.approx(0.6 / (0.6 + 0.5))
+    assert list(home_schedule(7)) == [True, True, False, False, True, False, True]
+
+    q = m.query("B", "A", 7)
+    assert q["home_court"] == "A" and q["games"][0] == pytest.approx(1.0 - m.home[0, 1])
+    assert q["games"][2] == pytest.approx(m.home[1, 0])
+    # playing all 7 scheduled games and taking the majority = the series probability
+    outcomes = np.array(np.meshgrid(*[[0, 1]] * 7)).reshape(7, -1).T
+    probs = np.prod(np.where(outcomes == 1, q["games"], 1.0 - np.array(q["games"])), axis=1)
+    assert q["p_series"] == pytest.approx(probs[outcomes.sum(axis=1) >= 4].sum())
+    assert m.query("A", "B", 7)["p_series"] == pytest.approx(1.0 - q["p_series"])
+    assert m.query("B", "A", 7) is q  # LRU hit
+    assert m.query("B", "A", 7, home_court="B")["p_series"] > q["p_series"]
+
+    S = m.series_matrix(7)
+    assert np.allclose(S + S.T, 1.0)
+    assert np.allclose(m.query_many([("B", "A"), ("C", "A"), ("A", "C")]), [S[1, 0], S[2, 0], S[0, 2]])
+    # equal odds in every venue -> the closed-form series probability
+    flat = MatchupMatrix(teams, [0.6, 0.6, 0.6], [0.6, 0.6, 0.6])
+    assert np.allclose(flat.series_matrix(5)[0, 1], series_win_prob(0.5, 5))
+
+    m.save(tmp_path)
+    loaded = latest_matchups(tmp_path)
+    assert loaded.version == "v1" and loaded.teams == teams and np.allclose(loaded.series_matrix(7), S)
@@ -0,0 +1,46 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from feature_store import build_feature_matrix, feature_matrix
+
+FEATURES = ["ft_pct_home", "fg_pct_home", "ft_pct_away", "fg_pct_away"]
+
+
+def _frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(0.3, 0.9, size=(n, 4)), columns=FEATURES)
+    df.iloc[::7, 1] = np.nan
+    df["home_win"] = rng.integers(0, 2, n)
+    return df
+
+
+def test_build_once_and_share_by_mmap(tmp_path):
+    df = _frame()
+    imputer = SimpleImputer(strategy="mean").fit(df[FEATURES])
+    fm = build_feature_matrix(df, FEATURES, imputer, "train", root=tmp_path, float32=True)
+    assert fm.X.dtype == np.float32 and fm.X.flags["C_CONTIGUOUS"]
+    assert np.allclose(fm.X, imputer.transform(df[FEATURES]), atol=1e-6)
+    assert np.array_equal(fm.y, df["home_win"].to_numpy())
+    # registered for df: call sites get the same matrix without re-imputing
+    assert feature_matrix(df, FEATURES, imputer) is fm
+
+    # unchanged inputs -> files are reused, not rewritten
+    x_path = fm.prefix + "_X.npy"
+    mtime = os.path.getmtime(x_path)
+    build_feature_matrix(df.copy(), FEATURES, imputer, "train", root=tmp_path, float32=True)
+    assert os.path.getmtime(x_path) == mtime
+
+    # different inputs under the same name (another --dataset on this host) get their own files
+    other_df = _frame(seed=1)
+    other = build_feature_matrix(other_df, FEATURES, imputer, "train", root=tmp_path, float32=True)
+    assert other.prefix != fm.prefix and os.path.getmtime(x_path) == mtime
+    assert np.allclose(pickle.loads(pickle.dumps(fm)).X, imputer.transform(df[FEATURES]), atol=1e-6)
+    assert np.allclose(pickle.loads(pickle.dumps(other)).X, imputer.transform(other_df[FEATURES]), atol=1e-6)
+
+    # pickles as its path (what a process pool receives) and reopens memory-mapped
+    blob = pickle.dumps(fm)
+    assert len(blob) < 512
+    X, y = pickle.loads(blob).take(np.array([0, 7, 14]))
+    assert isinstance(pickle.loads(blob).X, np.memmap) and np.array_equal(X, fm.X[[0, 7, 14]])
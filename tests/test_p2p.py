@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.impute import SimpleImputer
+from actor import compute
+from actor.p2p import TeamNodeP2P, ModelShare, ShareHeartbeat, ShareRequest
+
+
+class DummySystem:
+    def __init__(self):
+        self.sent = []
+    def tell(self, actor_name, message):
+        self.sent.append((actor_name, type(message).__name__, message))
+
+
+def _frame(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"f1": rng.normal(size=n), "f2": rng.normal(size=n)})
+    df["home_win"] = (df["f1"] - df["f2"] + rng.normal(size=n) > 0).astype(int)
+    return df
+
+
+@pytest.mark.asyncio
+async def test_gossip_async_skips_fit_when_inputs_unchanged(event_loop):
+    compute.configure_executor("inline")
+    df = _frame()
+    sys = DummySystem()
+    node = TeamNodeP2P("A", sys, df, ["f1", "f2"], SimpleImputer().fit(df[["f1", "f2"]]), gossip_async=True,
+                       gossip_resend_every=0)
+    node.peers = ["B"]
+
+    await node._send_periodic_share()
+    await node._send_periodic_share()
+    assert node.fits == 1 and node.skipped_fits == 1
+    assert [t for (_, t, _) in sys.sent] == ["ModelShare", "ShareHeartbeat"]
+
+    # a new peer gets the full (same-version) share, known peers a heartbeat
+    node.peers = ["B", "C"]
+    await node._send_periodic_share()
+    assert [(n, t) for (n, t, _) in sys.sent[2:]] == [("B", "ShareHeartbeat"), ("C", "ModelShare")]
+    assert sys.sent[-1][2].version == 1
+
+    # new data -> refit and a new version
+    node.data = _frame(seed=1)
+    await node._send_periodic_share()
+    assert node.fits == 2 and sys.sent[-1][2].version == 2
+
+
+@pytest.mark.asyncio
+async def test_reporter_counts_heartbeats_without_new_global(event_loop):
+    df = _frame()
+    sys = DummySystem()
+    rep = TeamNodeP2P("R", sys, df, ["f1", "f2"], None, gossip_async=True, gossip_batch=1)
+    rep.is_reporter = True
+
+    await rep.default_behavior(ModelShare("B", np.array([1.0, -1.0]), 0.1, version=1))
+    await rep.default_behavior(ShareHeartbeat("B", 1))
+    await rep.default_behavior(ShareHeartbeat("B", 0))  # version not held: not counted, share requested
+    assert rep._flush_count == 2
+    assert [t for (n, t, _) in sys.sent if n == "evaluator"] == ["GlobalModel"]
+    assert [(n, t) for (n, t, _) in sys.sent if n == "B"] == [("B", "ShareRequest")]
+
+
+@pytest.mark.asyncio
+async def test_lost_first_share_recovered(event_loop):
+    compute.configure_executor("inline")
+    df = _frame()
+    node_sys, rep_sys = DummySystem(), DummySystem()
+    node = TeamNodeP2P("B", node_sys, df, ["f1", "f2"], SimpleImputer().fit(df[["f1", "f2"]]), gossip_async=True,
+                       gossip_resend_every=0)
+    node.peers = ["R"]
+    rep = TeamNodeP2P("R", rep_sys, df, ["f1", "f2"], None, gossip_async=True, gossip_batch=1)
+    rep.is_reporter = True
+
+    await node._send_periodic_share()  # first share is lost (reporter not up yet)
+    await node._send_periodic_share()
+    assert [t for (_, t, _) in node_sys.sent] == ["ModelShare", "ShareHeartbeat"]
+
+    # reporter gets only the heartbeat and asks for the share
+    await rep.default_behavior(node_sys.sent[-1][2])
+    assert rep._flush_count == 0
+    (target, _, request), = rep_sys.sent
+    assert target == "B" and isinstance(request, ShareRequest)
+    await node.default_behavior(request)
+    assert node_sys.sent[-1][1] == "ModelShare"
+    await rep.default_behavior(node_sys.sent[-1][2])
+    assert [t for (n, t, _) in rep_sys.sent if n == "evaluator"] == ["GlobalModel"]
+
+    # without the reporter's help the node still resends the full share every N intervals
+    node_sys.sent.clear()
+    node.gossip_resend_every = 2
+    for _ in range(4):
+        await node._send_periodic_share()
+    assert [t for (_, t, _) in node_sys.sent] == ["ShareHeartbeat", "ModelShare"] * 2
+    # a resent version the reporter already holds counts like a heartbeat
+    await rep.default_behavior(node_sys.sent[-1][2])
+    assert rep._flush_count == 2 and [t for (n, t, _) in rep_sys.sent if n == "evaluator"] == ["GlobalModel"]
+
+
+@pytest.mark.asyncio
+async def test_refit_follows_data_content_and_global_version(event_loop):
+    compute.configure_executor("inline")
+    df = _frame()
+    sys = DummySystem()
+    node = TeamNodeP2P("A", sys, df, ["f1", "f2"], SimpleImputer().fit(df[["f1", "f2"]]), gossip_async=True,
+                       gossip_resend_every=0)
+    node.peers = ["B"]
+    for _ in range(3):
+        await node._send_periodic_share()
+    # gossip-async brings no global model: unchanged data never refits
+    assert node.fits == 1 and node.skipped_fits == 2
+
+    # in-place edit of the same frame object is a change
+    df.loc[0, "f1"] += 5.0
+    await node._send_periodic_share()
+    assert node.fits == 2 and sys.sent[-1][2].version == 2
+    # a new frame object with equal content is not
+    node.data = df.copy()
+    await node._send_periodic_share()
+    assert node.fits == 2
+    # a received global model is
+    node._global_version += 1
+    await node._send_periodic_share()
+    assert node.fits == 3
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_real_version_for_staleness(event_loop):
+    sys = DummySystem()
+    rep = TeamNodeP2P("R", sys, _frame(), ["f1", "f2"], None, gossip_async=True, gossip_batch=2,
+                      gossip_window_ms=0, staleness_alpha=1.0)
+    rep.is_reporter = True
+    await rep.default_behavior(ModelShare("OLD", np.array([0.0]), 0.0, version=1))
+    await rep.default_behavior(ModelShare("NEW", np.array([3.0]), 0.0, version=3))
+    await rep.default_behavior(ShareHeartbeat("OLD", 1))
+    await rep.default_behavior(ModelShare("NEW", np.array([3.0]), 0.0, version=4))
+    # second window: OLD confirmed by heartbeat at v1 (age 3, weight 1/4), NEW at v4 (weight 1)
+    gm = [m for (n, t, m) in sys.sent if n == "evaluator"][-1]
+    assert np.allclose(gm.coef, [[3.0 * 1.0 / 1.25]])
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from math import comb
+
+import numpy as np
+import pytest
+from actor.playoffs import bracket_exact, exact_odds, playoff_odds, round_names, seeded_pairs, series_win_prob, simulate_brackets
+
+
+def _league(n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    teams = [f"T{i:02d}" for i in range(n)]
+    return teams, dict(zip(teams, rng.uniform(0.3, 0.7, n)))
+
+
+def _games(ratings, teams):
+    r = np.array([ratings[t] for t in teams])
+    return r[:, None] / (r[:, None] + r[None, :])
+
+
+def test_single_series_matches_binomial_and_is_reproducible():
+    S = series_win_prob(np.array([[0.5, 0.6], [0.4, 0.5]]), 7)
+    counts = simulate_brackets(S, [(0, 1)], n_sims=400_000, seed=7, chunk=50_000)
+    exact = sum(comb(7, k) * 0.6 ** k * 0.4 ** (7 - k) for k in range(4, 8))
+    assert counts.shape == (1, 2) and counts.sum() == 400_000
+    assert counts[0, 0] / 400_000 == pytest.approx(exact, abs=3e-3)
+    # same seed and chunking -> same result, also when the chunks run on a pool
+    with ThreadPoolExecutor(2) as pool:
+        again = simulate_brackets(S, [(0, 1)], n_sims=400_000, seed=7, chunk=50_000, pool=pool)
+    assert np.array_equal(counts, again)
+
+
+def test_playoff_odds_bracket_structure():
+    teams, ratings = _league()
+    pairs = seeded_pairs(ratings)
+    assert len(pairs) == 4 and pairs[0][0] == max(ratings, key=ratings.get)
+    S = series_win_prob(_games(ratings, teams), 7)
+    odds = playoff_odds(S, teams, pairs, n_sims=20_000, seed=1, chunk=6_000)
+    assert odds["stages"] == ["QF", "SF", "F"] and odds["n_sims"] == 20_000
+    assert set(odds["title"]) == {t for p in pairs for t in p}
+    for stage, winners in zip(odds["stages"], (4, 2, 1)):
+        assert sum(a[stage] for a in odds["advance"].values()) == pytest.approx(winners)
+    assert sum(odds["title"].values()) == pytest.approx(1.0)
+    assert all(a["QF"] >= a["SF"] >= a["F"] for a in odds["advance"].values())
+    assert odds["title"] == playoff_odds(S, teams, pairs, n_sims=20_000, seed=1, chunk=6_000)["title"]
+    with pytest.raises(ValueError):
+        round_names(3)
+
+
+def test_series_win_prob_closed_form():
+    p = np.linspace(0.0, 1.0, 11)
+    for best_of in (1, 3, 5, 7):
+        need = best_of // 2 + 1
+        tail = sum(comb(best_of, k) * p ** k * (1 - p) ** (best_of - k) for k in range(need, best_of + 1))
+        assert np.allclose(series_win_prob(p, best_of), tail)
+    assert series_win_prob(0.5, 7) == pytest.approx(0.5)
+
+
+def test_exact_bracket_matches_enumeration_and_monte_carlo():
+    teams, ratings = _league(16, seed=5)
+    # 4 teams: enumerate the 2 x 2 x 2 series outcomes
+    S = series_win_prob(_games(ratings, teams), 5)
+    title = np.zeros(len(teams))
+    for w1 in (0, 1):
+        for w2 in (2, 3):
+            pa, pb = (S[0, 1] if w1 == 0 else S[1, 0]), (S[2, 3] if w2 == 2 else S[3, 2])
+            title[w1] += pa * pb * S[w1, w2]
+            title[w2] += pa * pb * S[w2, w1]
+    assert np.allclose(bracket_exact(S, [(0, 1), (2, 3)])[-1], title)
+
+    pairs = seeded_pairs(ratings)
+    exact = exact_odds(S, teams, pairs)
+    mc = playoff_odds(S, teams, pairs, n_sims=400_000, seed=11)
+    assert exact["stages"] == mc["stages"] == ["R16", "QF", "SF", "F"]
+    assert sum(exact["title"].values()) == pytest.approx(1.0)
+    for t in exact["title"]:
+        for stage in exact["stages"]:
+            assert mc["advance"][t][stage] == pytest.approx(exact["advance"][t][stage], abs=4e-3)
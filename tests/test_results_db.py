@@ -0,0 +1,51 @@
+import sqlite3
+import time
+
+from actor.results_db import SCHEMA_VERSION, ResultsWriter, results_writer
+
+
+def _odds_row(i):
+    return (1, 1000, "7", f"T{i}", "F", 0.1)
+
+
+def test_migrates_old_database_once_and_uses_wal(tmp_path):
+    path = tmp_path / "results.db"
+    with sqlite3.connect(path) as conn:  # playoffs table from before the stage column
+        conn.execute("CREATE TABLE playoffs (id INTEGER PRIMARY KEY AUTOINCREMENT, round_idx INTEGER, team_a TEXT, team_b TEXT, "
+                     "best_of INTEGER, wins_a INTEGER, wins_b INTEGER, winner TEXT, p_a_win REAL)")
+        conn.execute("INSERT INTO playoffs(round_idx, team_a, team_b, best_of, wins_a, wins_b, winner, p_a_win) VALUES(0,'A','B',7,4,1,'A',0.6)")
+    w = ResultsWriter(path)
+    w.put("playoffs", [(1, "A", "B", 7, 4, 2, "A", "F", 0.6)])
+    assert w.flush(timeout=5)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT stage FROM playoffs ORDER BY id").fetchall() == [(None,), ("F",)]
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"results", "playoffs", "playoff_odds"} <= tables
+    w.close()
+
+
+def test_batches_by_size_and_time(tmp_path):
+    path = tmp_path / "results.db"
+    w = ResultsWriter(path, max_batch=50, max_delay_ms=100)
+    for i in range(120):
+        w.put("playoff_odds", [_odds_row(i)])
+    deadline = time.time() + 5
+    while w.rows < 100 and time.time() < deadline:
+        time.sleep(0.01)
+    assert w.rows >= 100  # two size-triggered batches without any flush()
+    while w.rows < 120 and time.time() < deadline:
+        time.sleep(0.01)
+    assert w.rows == 120 and w.batches <= 4  # the 20 leftover rows go out on the time threshold
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM playoff_odds").fetchone()[0] == 120
+
+    # one put of many rows is one executemany in one transaction
+    before = w.batches
+    w.put("results", [("t", i, "[]", 0.0, 0.5, 0.7, 0.25, None, None, None) for i in range(30)])
+    w.put("playoff_odds", [_odds_row(i) for i in range(10)])
+    assert w.flush(timeout=5) and w.batches == before + 1 and w.errors == 0
+    w.close()
+    assert results_writer(path) is results_writer(str(path)) and results_writer(path) is not w
+    results_writer(path).close()
@@ -34,3 +34,50 @@ async def test_serialize_deserialize_messages(event_loop):
     assert env["type"] == "EvalReport"
     env = sys._serialize("remote", SetGlobalModel(np.array([[1,2,3]]), 0.1))
     assert env["type"] == "SetGlobalModel"
+
+
+def test_binary_codec_roundtrip_is_zero_copy():
+    from actor import wire
+    sys = ActorSystem(host="127.0.0.1", port=0)
+    coef = np.array([0.25, -1.5, 3.0, 7.125])
+    env = sys._serialize("agg", ModelShare("MIA", coef, 0.5, version=3, ts_ms=1))
+    body = wire.encode_binary(env)
+    out = wire.decode_binary(body)
+    assert out["type"] == "ModelShare" and out["payload"]["version"] == 3
+    assert np.array_equal(out["payload"]["coef"], coef)
+    # the decoded array is a view over the received frame, not a copy
+    assert not out["payload"]["coef"].flags.owndata
+    assert np.asarray(out["payload"]["coef"], dtype=float) is out["payload"]["coef"]
+
+    out32 = wire.decode_binary(wire.encode_binary(env, float32=True))
+    assert out32["payload"]["coef"].dtype == np.float32
+    assert np.allclose(out32["payload"]["coef"], coef)
+
+    # JSON stays available and carries the same values
+    assert wire.decode_json(wire.encode_json(env))["payload"]["coef"] == coef.tolist()
+
+
+def test_registry_roundtrip_and_single_definition_per_type():
+    from actor import codec
+    from actor.scheduler import AssignTeam, SetTeamClusters as SchSetTeamClusters
+    from actor.aggregator import SetTeamClusters, SetClusterModels, RoundComplete
+    from actor.crdt import LwwPut
+
+    ActorSystem()  # loads the built-in message modules
+    assert SchSetTeamClusters is SetTeamClusters
+    for t in ("ModelShare", "SetGlobalModel", "SetClusterModels", "GiveMeWork", "HealthPing", "LwwPut", "CrashMe"):
+        assert t in codec.registered_types()
+
+    msgs = [
+        AssignTeam("MIA"),
+        RoundComplete(2, 3, 0.01),
+        LwwPut("leader", "MIA", 7),
+        SetClusterModels({0: {"coef": np.array([[1.0, 2.0]]), "intercept": 0.5}}),
+        ModelShare("BOS", np.array([1.0, 2.0]), 0.1, version=4, ts_ms=9),
+    ]
+    for m in msgs:
+        out = codec.decode(codec.encode("x", m))
+        assert type(out) is type(m)
+    assert out.version == 4 and out.ts_ms == 9 and np.array_equal(out.coef, [1.0, 2.0])
+    assert codec.decode(codec.encode("x", msgs[1])).fedprox_mu == 0.01
+    assert codec.decode(codec.encode("x", msgs[3])).cluster_models[0]["coef"].shape == (1, 2)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from team_index import team_frame, team_index
+
+
+def _games(n=3000, n_teams=12, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"T{i:02d}" for i in range(n_teams)])
+    home = rng.integers(0, n_teams, n)
+    away = (home + rng.integers(1, n_teams, n)) % n_teams
+    df = pd.DataFrame({"home_team": names[home], "away_team": names[away], "x": rng.normal(size=n)})
+    return df[df["x"] > -1.0]  # non-contiguous index, like a season split
+
+
+def test_index_matches_boolean_masks():
+    df = _games()
+    idx = team_index(df)
+    assert team_index(df) is idx
+    assert idx.teams == sorted(set(df["home_team"]) | set(df["away_team"]))
+    for t in idx.teams:
+        assert team_frame(df, t).equals(df[(df["home_team"] == t) | (df["away_team"] == t)])
+        assert team_frame(df, t, "home").equals(df[df["home_team"] == t])
+        assert team_frame(df, t, "away").equals(df[df["away_team"] == t])
+    assert len(team_frame(df, "nobody")) == 0
+    assert sum(idx.counts().values()) == 2 * len(df)
+
+
+def test_mean_by_team_matches_groupby():
+    df = _games()
+    idx = team_index(df)
+    x = df["x"].to_numpy()
+    for side, col in (("home", "home_team"), ("away", "away_team")):
+        expected = df.groupby(col)["x"].mean().reindex(idx.teams, fill_value=0.5).to_numpy()
+        assert np.allclose(idx.mean_by_team(x, side, default=0.5), expected)
+    only_home = df[df["home_team"] != "T03"]
+    means = team_index(only_home).mean_by_team(only_home["x"].to_numpy(), "home", default=0.5)
+    assert means[team_index(only_home).teams.index("T03")] == 0.5
@@ -0,0 +1,236 @@
+import asyncio
+import pytest
+from actor.actor_system import ActorSystem, Actor
+from actor.crdt import LwwGet
+
+
+class Sink(Actor):
+    def __init__(self, name, system):
+        super().__init__(name, system)
+        self.keys = []
+
+    async def default_behavior(self, message):
+        self.keys.append(message.key)
+
+
+async def _wait_for(pred, timeout=2.0):
+    t0 = asyncio.get_running_loop().time()
+    while not pred():
+        if asyncio.get_running_loop().time() - t0 > timeout:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+@pytest.mark.asyncio
+async def test_pooled_connection_reused_and_reconnects(event_loop):
+    recv = ActorSystem(host="127.0.0.1", port=0)
+    await recv.start_network()
+    sink = recv.create_actor("sink", lambda n, s: Sink(n, s))
+
+    send = ActorSystem(host="127.0.0.1", port=0)
+    send.register_peer("sink", recv.host, recv.port)
+    for i in range(20):
+        send.tell("sink", LwwGet(str(i)))
+    assert await _wait_for(lambda: len(sink.keys) == 20)
+    # ordering is preserved on a single connection and only one handshake happened
+    assert sink.keys == [str(i) for i in range(20)]
+    assert send._pool.stats()[f"{recv.host}:{recv.port}"]["connects"] == 1
+
+    # receiver restarts on the same port -> sender reconnects transparently
+    port = recv.port
+    await recv.stop_network()
+    recv2 = ActorSystem(host="127.0.0.1", port=port)
+    await recv2.start_network()
+    sink2 = recv2.create_actor("sink", lambda n, s: Sink(n, s))
+    await asyncio.sleep(0.05)
+    send.tell("sink", LwwGet("after-restart"))
+    assert await _wait_for(lambda: sink2.keys == ["after-restart"])
+
+    recv.stop_actor("sink")
+    recv2.stop_actor("sink")
+    await send.stop_network()
+    await recv2.stop_network()
+    await asyncio.sleep(0.01)
+
+
+class CoefSink(Actor):
+    def __init__(self, name, system):
+        super().__init__(name, system)
+        self.got = []
+
+    async def default_behavior(self, message):
+        self.got.append(message)
+
+
+@pytest.mark.asyncio
+async def test_codec_negotiated_per_peer(event_loop):
+    import numpy as np
+    from actor.p2p import ModelShare
+
+    recv = ActorSystem(host="127.0.0.1", port=0)
+    await recv.start_network()
+    sink = recv.create_actor("agg", lambda n, s: CoefSink(n, s))
+    recv_json = ActorSystem(host="127.0.0.1", port=0, codec="json")
+    await recv_json.start_network()
+    sink_json = recv_json.create_actor("agg", lambda n, s: CoefSink(n, s))
+
+    send = ActorSystem(host="127.0.0.1", port=0)
+    send.register_peer("agg_bin", recv.host, recv.port)
+    send.register_peer("agg_json", recv_json.host, recv_json.port)
+    coef = np.array([1.0, 2.0, 3.0, 4.0])
+    # logical names differ from the remote actor name, so go through the pool directly
+    await send._send_remote(recv.host, recv.port, send._serialize("agg", ModelShare("MIA", coef, 0.1, version=1)))
+    await send._send_remote(recv_json.host, recv_json.port, send._serialize("agg", ModelShare("BOS", coef, 0.2, version=1)))
+    assert await _wait_for(lambda: sink.got and sink_json.got)
+
+    stats = send._pool.stats()
+    assert stats[f"{recv.host}:{recv.port}"]["codec"] == "binary"
+    assert stats[f"{recv_json.host}:{recv_json.port}"]["codec"] == "json"
+    assert np.array_equal(sink.got[0].coef, coef) and np.array_equal(sink_json.got[0].coef, coef)
+
+    recv.stop_actor("agg")
+    recv_json.stop_actor("agg")
+    await send.stop_network()
+    await recv.stop_network()
+    await recv_json.stop_network()
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_grpc_stream_reuses_one_channel_per_peer(event_loop):
+    pytest.importorskip("grpc")
+    recv = ActorSystem(host="127.0.0.1", port=0, transport="grpc", grpc_compression="gzip")
+    await recv.start_network()
+    sink = recv.create_actor("sink", lambda n, s: Sink(n, s))
+
+    send = ActorSystem(host="127.0.0.1", port=0, transport="grpc", grpc_keepalive_ms=10000, grpc_compression="gzip")
+    send.register_peer("sink", recv.host, recv.port)
+    for i in range(50):
+        send.tell("sink", LwwGet(str(i)))
+    assert await _wait_for(lambda: len(sink.keys) == 50, timeout=5.0)
+    assert sink.keys == [str(i) for i in range(50)]
+    assert send._grpc_client.stats() == {f"{recv.host}:{recv.port}": {"streams_opened": 1, "resent": 0}}
+
+    # hot message types travel as typed protobuf bodies and arrive as objects
+    import numpy as np
+    from actor.p2p import ModelShare
+    agg = recv.create_actor("agg", lambda n, s: CoefSink(n, s))
+    send.register_peer("agg", recv.host, recv.port)
+    send.tell("agg", ModelShare("MIA", np.array([0.5, -1.0, 2.0, 4.0]), 0.25, version=2))
+    assert await _wait_for(lambda: agg.got, timeout=5.0)
+    got = agg.got[0]
+    assert isinstance(got, ModelShare) and got.version == 2 and got.intercept == 0.25
+    assert np.array_equal(got.coef, [0.5, -1.0, 2.0, 4.0])
+
+    recv.stop_actor("agg")
+    recv.stop_actor("sink")
+    await send.stop_network()
+    await recv.stop_network()
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_grpc_dead_stream_reported_then_reopened(event_loop):
+    pytest.importorskip("grpc")
+    recv = ActorSystem(host="127.0.0.1", port=0, transport="grpc")
+    await recv.start_network()
+    sink = recv.create_actor("sink", lambda n, s: Sink(n, s))
+    send = ActorSystem(host="127.0.0.1", port=0, transport="grpc")
+    send.register_peer("sink", recv.host, recv.port)
+    send.tell("sink", LwwGet("first"))
+    assert await _wait_for(lambda: sink.keys == ["first"], timeout=5.0)
+
+    # receiver gone: the batch fails on the retry stream and the outbox reports it
+    port = recv.port
+    recv.stop_actor("sink")
+    await recv.stop_network()
+    send.tell("sink", LwwGet("lost"))
+    key = f"grpc://{recv.host}:{port}"
+    assert await _wait_for(lambda: send.outbound_stats()[key]["failures"] == 1, timeout=5.0)
+    assert send.outbound_stats()[key]["dropped"] == 1
+
+    recv2 = ActorSystem(host="127.0.0.1", port=port, transport="grpc")
+    await recv2.start_network()
+    sink2 = recv2.create_actor("sink", lambda n, s: Sink(n, s))
+    send.tell("sink", LwwGet("after-restart"))
+    assert await _wait_for(lambda: sink2.keys == ["after-restart"], timeout=5.0)
+    assert send._grpc_client.stats()[f"{recv.host}:{port}"]["streams_opened"] >= 2
+
+    recv2.stop_actor("sink")
+    await send.stop_network()
+    await recv2.stop_network()
+    await asyncio.sleep(0.01)
+
+
+def test_grpc_typed_bodies_for_hot_types():
+    pytest.importorskip("grpc")
+    import numpy as np
+    from rpc.grpc_transport import _to_request, decode_typed
+    from actor.scheduler import AssignTeam
+    from actor.crdt import LwwPut
+    from actor.aggregator import SetGlobalModel
+
+    sys = ActorSystem()
+    req = _to_request(sys._serialize("w", AssignTeam("MIA")))
+    assert req.WhichOneof("body") == "assign_team" and not req.payload_json
+    assert decode_typed(req).team_name == "MIA"
+
+    req = _to_request(sys._serialize("w", SetGlobalModel(np.array([[1.0, 2.0]]), 0.5)))
+    out = decode_typed(req)
+    assert np.array_equal(out.coef, [1.0, 2.0]) and out.intercept == 0.5
+
+    from actor.scheduler import WorkDone
+    out = decode_typed(_to_request(sys._serialize("s", WorkDone("w1", iterations=7, fit_ms=12.5))))
+    assert (out.worker, out.iterations, out.fit_ms) == ("w1", 7, 12.5)
+
+    from actor.p2p import ModelShare
+    out = decode_typed(_to_request(sys._serialize("a", ModelShare("MIA", np.array([1.0]), 0.5, version=2, n_samples=80))))
+    assert out.n_samples == 80 and out.version == 2
+    assert decode_typed(_to_request(sys._serialize("a", ModelShare("MIA", np.array([1.0]), 0.5)))).n_samples is None
+
+    # rare types keep the JSON fallback
+    req = _to_request(sys._serialize("w", LwwPut("k", "v", 1)))
+    assert req.WhichOneof("body") is None and decode_typed(req) is None
+
+
+@pytest.mark.asyncio
+async def test_outbox_batches_burst_in_order(event_loop):
+    recv = ActorSystem(host="127.0.0.1", port=0)
+    await recv.start_network()
+    sink = recv.create_actor("sink", lambda n, s: Sink(n, s))
+
+    send = ActorSystem(host="127.0.0.1", port=0, batch_max=32)
+    send.register_peer("sink", recv.host, recv.port)
+    for i in range(100):
+        send.tell("sink", LwwGet(str(i)))
+    assert await _wait_for(lambda: len(sink.keys) == 100)
+    assert sink.keys == [str(i) for i in range(100)]
+
+    stats = send.outbound_stats()[f"tcp://{recv.host}:{recv.port}"]
+    assert stats["sent"] == 100 and stats["queue_depth"] == 0 and stats["failures"] == 0
+    # a synchronous burst is drained in a few batches, never more than batch_max each
+    assert stats["batches"] < 100 and stats["max_batch"] <= 32
+
+    recv.stop_actor("sink")
+    await send.stop_network()
+    await recv.stop_network()
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_outbox_stats_count_failed_batches_apart():
+    from actor.outbox import PeerOutbox
+
+    async def flush(envs):
+        if "bad" in envs:
+            raise ConnectionError("Connect call failed")
+
+    box = PeerOutbox("peer", flush, max_delay_ms=0.0)
+    for env in ("a", "b", "bad", "c"):
+        box.put(env)
+        await asyncio.sleep(0)
+    await box.close()
+    stats = box.stats()
+    assert stats["sent"] == 3 and stats["failures"] == 1 and stats["dropped"] == 1
+    assert stats["batches"] == 3 and stats["avg_batch"] == 1.0